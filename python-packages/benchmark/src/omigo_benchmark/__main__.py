@@ -0,0 +1,29 @@
+"""Command line entry point: python3 -m omigo_benchmark --sizes 10000,100000 --output results.json --baseline baseline.json"""
+import argparse
+from omigo_benchmark import runner
+
+def main():
+    parser = argparse.ArgumentParser(description = "Run the omigo benchmarks")
+    parser.add_argument("--sizes", default = ",".join([str(t) for t in runner.DEFAULT_SIZES]), help = "comma separated number of rows")
+    parser.add_argument("--names", default = None, help = "comma separated benchmark names. Default is all")
+    parser.add_argument("--repeats", type = int, default = 3, help = "number of runs per benchmark")
+    parser.add_argument("--seed", type = int, default = 0, help = "seed for the data generators")
+    parser.add_argument("--output", default = None, help = "json file to save the results")
+    parser.add_argument("--baseline", default = None, help = "json file of earlier results to compare against")
+    args = parser.parse_args()
+
+    # run
+    sizes = list([int(float(t)) for t in args.sizes.split(",")])
+    names = args.names.split(",") if (args.names is not None) else None
+    runner.run_benchmarks(sizes = sizes, names = names, num_repeats = args.repeats, seed = args.seed, output_file = args.output) \
+        .show(n = 1000, title = "Results")
+
+    # compare
+    if (args.baseline is not None):
+        if (args.output is None):
+            raise Exception("--baseline needs --output")
+        runner.compare_results(args.baseline, args.output) \
+            .show(n = 1000, title = "Comparison with baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Benchmarks of the core DataFrame operators and hydra file io"""
+import os
+from omigo_core import dataframe, udfs
+from omigo_hydra import hydra
+
+class Benchmark:
+    """A single benchmark. setup_func(xdf, tmp_dir) returns the input of run_func and is not timed"""
+
+    def __init__(self, name, dataset, run_func, setup_func = None):
+        self.name = name
+        self.dataset = dataset
+        self.run_func = run_func
+        self.setup_func = setup_func if (setup_func is not None) else (lambda xdf, tmp_dir: xdf)
+
+# right side of the joins with one row per key
+def __setup_join__(xdf, tmp_dir):
+    keys = xdf.col_as_array_uniq("key")
+    return (xdf, dataframe.new_with_cols(["key", "label"], data_fields = list([[k, "label_{}".format(k)] for k in keys])))
+
+def __setup_save__(xdf, tmp_dir, ext):
+    return (xdf, os.path.join(tmp_dir, "save{}".format(ext)))
+
+def __setup_read__(xdf, tmp_dir, ext):
+    path = os.path.join(tmp_dir, "read{}".format(ext))
+    hydra.save_to_file(xdf, path)
+    return path
+
+# the operators that return lazy row views or columnar data are materialized with to_row_major so that the time
+# includes building the rows
+BENCHMARKS = [
+    Benchmark("select", "wide", lambda xdf: xdf.select(["id", "col_1", "col_10", "col_50", "col_99"]).to_row_major()),
+    Benchmark("filter", "narrow", lambda xdf: xdf.filter(["value"], lambda v: int(v) % 2 == 0).to_row_major()),
+    Benchmark("eq_str", "narrow", lambda xdf: xdf.eq_str("key", "k1").to_row_major()),
+    Benchmark("aggregate", "skewed", lambda xdf: xdf.aggregate("key", ["value", "value"], [udfs.sumint, udfs.get_len])),
+    Benchmark("join", "narrow", lambda t: t[0].inner_join(t[1], "key"), setup_func = __setup_join__),
+    Benchmark("map_join", "narrow", lambda t: t[0].inner_map_join(t[1], "key").to_row_major(), setup_func = __setup_join__),
+    Benchmark("sort", "narrow", lambda xdf: xdf.sort("score")),
+    Benchmark("explode_json", "json", lambda xdf: xdf.explode_json("event", prefix = "event")),
+    Benchmark("window_aggregate", "timestamps", lambda xdf: xdf.window_aggregate("ts", ["value"], [udfs.sumint], 100)),
+    Benchmark("window_aggregate_sliding", "timestamps", lambda xdf: xdf.window_aggregate("ts", ["value"], [udfs.sumint], 10, sliding = True)),
+    Benchmark("distinct", "skewed", lambda xdf: xdf.select(["key"]).distinct()),
+    Benchmark("hydra_save_tsv", "narrow", lambda t: hydra.save_to_file(t[0], t[1]), setup_func = lambda xdf, tmp_dir: __setup_save__(xdf, tmp_dir, ".tsv")),
+    Benchmark("hydra_read_tsv", "narrow", lambda path: hydra.read(path), setup_func = lambda xdf, tmp_dir: __setup_read__(xdf, tmp_dir, ".tsv")),
+    Benchmark("hydra_save_otsv", "narrow", lambda t: hydra.save_to_file(t[0], t[1]), setup_func = lambda xdf, tmp_dir: __setup_save__(xdf, tmp_dir, ".otsv")),
+    Benchmark("hydra_read_otsv", "narrow", lambda path: hydra.read(path).to_row_major(), setup_func = lambda xdf, tmp_dir: __setup_read__(xdf, tmp_dir, ".otsv"))
+]
+
+def get_benchmarks(names = None):
+    if (names is None):
+        return BENCHMARKS
+
+    # validation
+    all_names = list([t.name for t in BENCHMARKS])
+    for name in names:
+        if (name not in all_names):
+            raise Exception("get_benchmarks: unknown benchmark: {}, available: {}".format(name, all_names))
+
+    # return
+    return list(filter(lambda t: t.name in names, BENCHMARKS))
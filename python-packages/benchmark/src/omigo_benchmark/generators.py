@@ -0,0 +1,105 @@
+"""Deterministic synthetic data generators. The same num_rows and seed always generate the same data"""
+import json
+import random
+from omigo_core import dataframe, utils, timefuncs
+
+# 2023-01-01T00:00:00 UTC
+DEFAULT_START_TS = 1672531200
+
+COUNTRIES = ["us", "in", "uk", "de", "fr", "jp", "br", "ca"]
+ACTIONS = ["login", "logout", "read", "write", "delete", "upload", "download"]
+
+# narrow table with uniform keys: id, key, value, score, ts
+def generate_narrow(num_rows, num_keys = 1000, seed = 0):
+    rng = random.Random(seed)
+    data_fields = []
+    for i in range(num_rows):
+        data_fields.append([str(i), "k{}".format(rng.randrange(num_keys)), str(rng.randrange(1000000)), "{:.4f}".format(rng.random()),
+            str(DEFAULT_START_TS + i)])
+
+    # return
+    return dataframe.new_with_cols(["id", "key", "value", "score", "ts"], data_fields = data_fields)
+
+# wide table with num_cols columns alternating between int, float and string values
+def generate_wide(num_rows, num_cols = 100, seed = 0):
+    rng = random.Random(seed)
+    header_fields = ["id"] + list(["col_{}".format(i) for i in range(1, num_cols)])
+    data_fields = []
+    for i in range(num_rows):
+        fields = [str(i)]
+        for j in range(1, num_cols):
+            if (j % 3 == 0):
+                fields.append(str(rng.randrange(100000)))
+            elif (j % 3 == 1):
+                fields.append("{:.3f}".format(rng.random() * 1000))
+            else:
+                fields.append("s{}".format(rng.randrange(1000)))
+        data_fields.append(fields)
+
+    # return
+    return dataframe.new_with_cols(header_fields, data_fields = data_fields)
+
+# keys follow zipf distribution so that few keys have most of the rows: id, key, value
+def generate_skewed(num_rows, num_keys = 1000, skew = 1.2, seed = 0):
+    rng = random.Random(seed)
+    keys = list(["k{}".format(i) for i in range(num_keys)])
+
+    # cumulative weights
+    cum_weights = []
+    total = 0
+    for i in range(num_keys):
+        total = total + 1.0 / ((i + 1) ** skew)
+        cum_weights.append(total)
+
+    # generate
+    key_values = rng.choices(keys, cum_weights = cum_weights, k = num_rows)
+    data_fields = list([[str(i), key_values[i], str(rng.randrange(1000000))] for i in range(num_rows)])
+
+    # return
+    return dataframe.new_with_cols(["id", "key", "value"], data_fields = data_fields)
+
+# url encoded json events with nested maps and a list of primitive values: id, event
+def generate_json(num_rows, num_tags = 3, seed = 0):
+    rng = random.Random(seed)
+    data_fields = []
+    for i in range(num_rows):
+        event = {
+            "ts": DEFAULT_START_TS + i,
+            "action": rng.choice(ACTIONS),
+            "bytes": rng.randrange(100000),
+            "user": {"name": "user{}".format(rng.randrange(10000)), "country": rng.choice(COUNTRIES)},
+            "device": {"os": rng.choice(["linux", "mac", "windows"]), "version": "{}.{}".format(rng.randrange(10), rng.randrange(10))},
+            "tags": list(["t{}".format(rng.randrange(100)) for j in range(num_tags)])
+        }
+        data_fields.append([str(i), utils.url_encode(json.dumps(event))])
+
+    # return
+    return dataframe.new_with_cols(["id", "event"], data_fields = data_fields)
+
+# increasing unique timestamps with random gaps: id, ts, datetime, value
+def generate_timestamps(num_rows, start_ts = DEFAULT_START_TS, max_gap_sec = 5, seed = 0):
+    rng = random.Random(seed)
+    data_fields = []
+    ts = start_ts
+    for i in range(num_rows):
+        ts = ts + rng.randint(1, max_gap_sec)
+        data_fields.append([str(i), str(ts), timefuncs.utctimestamp_to_datetime_str(ts), str(rng.randrange(1000))])
+
+    # return
+    return dataframe.new_with_cols(["id", "ts", "datetime", "value"], data_fields = data_fields)
+
+# map of dataset name to generator
+GENERATORS = {
+    "narrow": generate_narrow,
+    "wide": generate_wide,
+    "skewed": generate_skewed,
+    "json": generate_json,
+    "timestamps": generate_timestamps
+}
+
+def generate(name, num_rows, seed = 0):
+    if (name not in GENERATORS.keys()):
+        raise Exception("generate: unknown dataset: {}, available: {}".format(name, list(GENERATORS.keys())))
+
+    # return
+    return GENERATORS[name](num_rows, seed = seed)
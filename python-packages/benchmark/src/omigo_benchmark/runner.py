@@ -0,0 +1,137 @@
+"""Runs the benchmarks and stores the results as json for comparison across commits"""
+import gc
+import json
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from omigo_core import dataframe, utils
+from omigo_benchmark import benchmarks, generators
+
+DEFAULT_SIZES = [10000, 100000]
+
+# returns the current git commit or empty string if not in a git repo
+def __get_git_commit__():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr = subprocess.DEVNULL).decode("utf-8").strip()
+    except Exception:
+        return ""
+
+def __get_metadata__(seed, num_repeats):
+    return {
+        "git_commit": __get_git_commit__(),
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": int(time.time()),
+        "seed": seed,
+        "num_repeats": num_repeats
+    }
+
+def __time_benchmark__(benchmark, xdf, tmp_dir, num_repeats):
+    timings = []
+    for i in range(num_repeats):
+        # setup is not timed
+        inp = benchmark.setup_func(xdf, tmp_dir)
+        gc.collect()
+
+        # run
+        ts_start = time.perf_counter()
+        benchmark.run_func(inp)
+        timings.append(time.perf_counter() - ts_start)
+
+    # return
+    return timings
+
+# runs the benchmarks for each size and returns the results as DataFrame. The results are also written to output_file as json
+def run_benchmarks(sizes = None, names = None, num_repeats = 3, seed = 0, output_file = None, dmsg = ""):
+    dmsg = utils.extend_inherit_message(dmsg, "run_benchmarks")
+
+    # resolve parameters
+    sizes = sizes if (sizes is not None) else DEFAULT_SIZES
+    selected = benchmarks.get_benchmarks(names)
+
+    # run
+    results = []
+    tmp_dir = tempfile.mkdtemp(prefix = "omigo-benchmark-")
+    try:
+        for num_rows in sizes:
+            # generate each dataset only once per size
+            datasets = {}
+            for benchmark in selected:
+                if (benchmark.dataset not in datasets.keys()):
+                    utils.info("{}: generating dataset: {}, num_rows: {}".format(dmsg, benchmark.dataset, num_rows))
+                    datasets[benchmark.dataset] = generators.generate(benchmark.dataset, num_rows, seed = seed)
+
+                # time
+                timings = __time_benchmark__(benchmark, datasets[benchmark.dataset], tmp_dir, num_repeats)
+                result = {
+                    "name": benchmark.name,
+                    "dataset": benchmark.dataset,
+                    "num_rows": num_rows,
+                    "min_sec": min(timings),
+                    "mean_sec": sum(timings) / len(timings),
+                    "max_sec": max(timings),
+                    "rows_per_sec": num_rows / min(timings) if (min(timings) > 0) else 0
+                }
+                results.append(result)
+                utils.info("{}: name: {}, num_rows: {}, min_sec: {:.4f}".format(dmsg, benchmark.name, num_rows, result["min_sec"]))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors = True)
+
+    # write
+    if (output_file is not None):
+        with open(output_file, "w") as fh:
+            fh.write(json.dumps({"metadata": __get_metadata__(seed, num_repeats), "results": results}, indent = 2))
+        utils.info("{}: results saved to: {}".format(dmsg, output_file))
+
+    # return
+    return __results_to_df__(results)
+
+def __results_to_df__(results):
+    header_fields = ["name", "dataset", "num_rows", "min_sec", "mean_sec", "max_sec", "rows_per_sec"]
+    data_fields = []
+    for result in results:
+        data_fields.append([result["name"], result["dataset"], str(result["num_rows"]), "{:.6f}".format(result["min_sec"]),
+            "{:.6f}".format(result["mean_sec"]), "{:.6f}".format(result["max_sec"]), str(int(result["rows_per_sec"]))])
+
+    # return
+    return dataframe.new_with_cols(header_fields, data_fields = data_fields)
+
+def load_results(input_file):
+    with open(input_file, "r") as fh:
+        return json.loads(fh.read())
+
+# compares min_sec of the benchmarks present in both files. ratio > 1 + threshold is marked as regression
+def compare_results(baseline_file, current_file, threshold = 0.1):
+    baseline = load_results(baseline_file)
+    current = load_results(current_file)
+
+    # index the baseline
+    baseline_map = {}
+    for result in baseline["results"]:
+        baseline_map[(result["name"], result["num_rows"])] = result
+
+    # compare
+    data_fields = []
+    for result in current["results"]:
+        key = (result["name"], result["num_rows"])
+        if (key not in baseline_map.keys()):
+            continue
+
+        # find status
+        baseline_sec = baseline_map[key]["min_sec"]
+        ratio = result["min_sec"] / baseline_sec if (baseline_sec > 0) else 1.0
+        if (ratio > 1 + threshold):
+            status = "regression"
+        elif (ratio < 1 - threshold):
+            status = "improvement"
+        else:
+            status = "same"
+
+        # append
+        data_fields.append([result["name"], str(result["num_rows"]), "{:.6f}".format(baseline_sec), "{:.6f}".format(result["min_sec"]),
+            "{:.3f}".format(ratio), status])
+
+    # return
+    return dataframe.new_with_cols(["name", "num_rows", "baseline_sec", "current_sec", "ratio", "status"], data_fields = data_fields)
@@ -0,0 +1,329 @@
+"""Incremental accumulators for the list based aggregation functions in udfs"""
+import math
+import fractions
+import collections
+from omigo_core import udfs, sketches
+
+class Accumulator:
+    """Base class. add() is called once per value and result() returns the same value as the
+    corresponding udfs function called on the list of all the values. The sliding accumulators
+    also have remove() that removes the oldest value that was added"""
+
+    def add(self, v):
+        raise Exception("Accumulator: add not implemented")
+
+    def result(self):
+        raise Exception("Accumulator: result not implemented")
+
+class LenAccumulator(Accumulator):
+    def __init__(self):
+        self.count = 0
+
+    def add(self, v):
+        self.count = self.count + 1
+
+    def result(self):
+        return str(self.count)
+
+class NonEmptyLenAccumulator(Accumulator):
+    def __init__(self):
+        self.count = 0
+
+    def add(self, v):
+        if (len(v.strip()) > 0):
+            self.count = self.count + 1
+
+    def result(self):
+        return str(self.count)
+
+class SumIntAccumulator(Accumulator):
+    def __init__(self):
+        self.total = 0
+
+    def add(self, v):
+        self.total = self.total + int(float(v))
+
+    def result(self):
+        return self.total
+
+class SumFloatAccumulator(Accumulator):
+    def __init__(self):
+        self.total = 0
+
+    def add(self, v):
+        self.total = self.total + float(v)
+
+    def result(self):
+        return self.total
+
+# keeps the exact sum as a list of non overlapping partial sums (Shewchuk algorithm) so that the result
+# matches statistics.mean. Non finite values are summed separately
+class MeanAccumulator(Accumulator):
+    def __init__(self):
+        self.partials = []
+        self.non_finite_total = None
+        self.count = 0
+
+    def add(self, v):
+        x = float(v)
+        self.count = self.count + 1
+
+        # check for inf and nan
+        if (math.isfinite(x) == False):
+            self.non_finite_total = x if (self.non_finite_total is None) else self.non_finite_total + x
+            return
+
+        # update partials
+        i = 0
+        for y in self.partials:
+            if (abs(x) < abs(y)):
+                x, y = y, x
+            hi = x + y
+            lo = y - (hi - x)
+            if (lo != 0.0):
+                self.partials[i] = lo
+                i = i + 1
+            x = hi
+        self.partials[i:] = [x]
+
+    def result(self):
+        if (self.non_finite_total is not None):
+            return self.non_finite_total / self.count
+        else:
+            return float(sum([fractions.Fraction(p) for p in self.partials], fractions.Fraction(0)) / self.count)
+
+class UniqCountAccumulator(Accumulator):
+    def __init__(self):
+        self.values = set()
+
+    def add(self, v):
+        if (v.strip() != ""):
+            self.values.add(v)
+
+    def result(self):
+        return len(self.values)
+
+# tokens of comma separated values, used by uniq_len and uniq_mkstr
+class UniqTokensAccumulator(Accumulator):
+    def __init__(self):
+        self.values = set()
+
+    def add(self, v):
+        for k in str(v).split(","):
+            if (len(k.strip()) > 0):
+                self.values.add(str(k))
+
+class UniqLenAccumulator(UniqTokensAccumulator):
+    def result(self):
+        return str(len(self.values))
+
+class UniqMkstrAccumulator(UniqTokensAccumulator):
+    def result(self):
+        return ",".join(sorted([str(x) for x in self.values]))
+
+# keeps the first value that is strictly less (or greater) than all the previous ones, using the given parse function
+class CompareAccumulator(Accumulator):
+    def __init__(self, parse_func, is_min):
+        self.parse_func = parse_func
+        self.is_min = is_min
+        self.value = None
+        self.parsed_value = None
+
+    def add(self, v):
+        parsed_v = self.parse_func(v)
+        if (self.value is None or (self.is_min == True and parsed_v < self.parsed_value) or (self.is_min == False and parsed_v > self.parsed_value)):
+            self.value = str(v)
+            self.parsed_value = parsed_v
+
+    def result(self):
+        return self.value
+
+# wrapper over the sketches for the approx functions. is_merge is used for the functions that merge serialized sketches
+class SketchAccumulator(Accumulator):
+    def __init__(self, sketch_class, result_func, is_merge = False, ignore_empty = False):
+        self.sketch_class = sketch_class
+        self.sketch = sketch_class()
+        self.result_func = result_func
+        self.is_merge = is_merge
+        self.ignore_empty = ignore_empty
+
+    def add(self, v):
+        if (self.is_merge == True):
+            self.sketch.merge(self.sketch_class.from_str(v))
+        elif (self.ignore_empty == False or v.strip() != ""):
+            self.sketch.add(v)
+
+    # the result function takes the sketch object
+    def result(self):
+        return self.result_func(self.sketch)
+
+class SlidingLenAccumulator(LenAccumulator):
+    def remove(self, v):
+        self.count = self.count - 1
+
+class SlidingNonEmptyLenAccumulator(NonEmptyLenAccumulator):
+    def remove(self, v):
+        if (len(v.strip()) > 0):
+            self.count = self.count - 1
+
+class SlidingSumIntAccumulator(SumIntAccumulator):
+    def remove(self, v):
+        self.total = self.total - int(float(v))
+
+# exact sum of floats as partial sums so that removal does not accumulate rounding errors. The non finite
+# values are counted separately
+class SlidingExactSumAccumulator(Accumulator):
+    def __init__(self):
+        self.partials = []
+        self.non_finite_counts = {}
+        self.count = 0
+
+    def __add_partial__(self, x):
+        i = 0
+        for y in self.partials:
+            if (abs(x) < abs(y)):
+                x, y = y, x
+            hi = x + y
+            lo = y - (hi - x)
+            if (lo != 0.0):
+                self.partials[i] = lo
+                i = i + 1
+            x = hi
+        self.partials[i:] = [x]
+
+    def __update__(self, v, sign):
+        x = float(v)
+        self.count = self.count + sign
+        if (math.isfinite(x) == False):
+            key = str(x)
+            self.non_finite_counts[key] = self.non_finite_counts.get(key, 0) + sign
+        else:
+            self.__add_partial__(sign * x)
+
+    def add(self, v):
+        self.__update__(v, 1)
+
+    def remove(self, v):
+        self.__update__(v, -1)
+
+    def __get_non_finite_total__(self):
+        total = None
+        for k, c in self.non_finite_counts.items():
+            if (c > 0):
+                total = float(k) if (total is None) else total + float(k)
+        return total
+
+    def __get_fraction_sum__(self):
+        return sum([fractions.Fraction(p) for p in self.partials], fractions.Fraction(0))
+
+class SlidingSumFloatAccumulator(SlidingExactSumAccumulator):
+    def result(self):
+        non_finite_total = self.__get_non_finite_total__()
+        return non_finite_total if (non_finite_total is not None) else float(self.__get_fraction_sum__())
+
+class SlidingMeanAccumulator(SlidingExactSumAccumulator):
+    def result(self):
+        non_finite_total = self.__get_non_finite_total__()
+        return non_finite_total / self.count if (non_finite_total is not None) else float(self.__get_fraction_sum__() / self.count)
+
+# min or max using monotonic deque of (sequence number, parsed value, value). The front is the first of the extreme values
+class SlidingCompareAccumulator(Accumulator):
+    def __init__(self, parse_func, is_min):
+        self.parse_func = parse_func
+        self.is_min = is_min
+        self.values = collections.deque()
+        self.num_added = 0
+        self.num_removed = 0
+
+    def add(self, v):
+        parsed_v = self.parse_func(v)
+        if (self.is_min == True):
+            while (len(self.values) > 0 and self.values[-1][1] > parsed_v):
+                self.values.pop()
+        else:
+            while (len(self.values) > 0 and self.values[-1][1] < parsed_v):
+                self.values.pop()
+        self.values.append((self.num_added, parsed_v, str(v)))
+        self.num_added = self.num_added + 1
+
+    def remove(self, v):
+        if (len(self.values) > 0 and self.values[0][0] == self.num_removed):
+            self.values.popleft()
+        self.num_removed = self.num_removed + 1
+
+    def result(self):
+        return self.values[0][2] if (len(self.values) > 0) else None
+
+def __parse_int__(v):
+    return int(float(v))
+
+def __parse_float__(v):
+    return float(v)
+
+def __parse_str__(v):
+    return str(v)
+
+# map of udfs function to the accumulator factory
+ACCUMULATOR_FACTORIES = {
+    udfs.get_len: LenAccumulator,
+    udfs.get_non_empty_len: NonEmptyLenAccumulator,
+    udfs.sumint: SumIntAccumulator,
+    udfs.sumfloat: SumFloatAccumulator,
+    udfs.mean: MeanAccumulator,
+    udfs.uniq_count: UniqCountAccumulator,
+    udfs.uniq_len: UniqLenAccumulator,
+    udfs.uniq_mkstr: UniqMkstrAccumulator,
+    udfs.minint: lambda: CompareAccumulator(__parse_int__, True),
+    udfs.maxint: lambda: CompareAccumulator(__parse_int__, False),
+    udfs.minfloat: lambda: CompareAccumulator(__parse_float__, True),
+    udfs.maxfloat: lambda: CompareAccumulator(__parse_float__, False),
+    udfs.minstr: lambda: CompareAccumulator(__parse_str__, True),
+    udfs.maxstr: lambda: CompareAccumulator(__parse_str__, False),
+    udfs.hll_sketch: lambda: SketchAccumulator(sketches.HyperLogLog, sketches.HyperLogLog.to_str, ignore_empty = True),
+    udfs.hll_merge: lambda: SketchAccumulator(sketches.HyperLogLog, sketches.HyperLogLog.to_str, is_merge = True),
+    udfs.approx_uniq_count: lambda: SketchAccumulator(sketches.HyperLogLog, sketches.HyperLogLog.estimate, ignore_empty = True),
+    udfs.tdigest_sketch: lambda: SketchAccumulator(sketches.TDigest, sketches.TDigest.to_str),
+    udfs.tdigest_merge: lambda: SketchAccumulator(sketches.TDigest, sketches.TDigest.to_str, is_merge = True),
+    udfs.approx_quantile4: lambda: SketchAccumulator(sketches.TDigest, udfs.__tdigest_quantile4__),
+    udfs.approx_quantile10: lambda: SketchAccumulator(sketches.TDigest, udfs.__tdigest_quantile10__),
+    udfs.cms_sketch: lambda: SketchAccumulator(sketches.CountMinSketch, sketches.CountMinSketch.to_str),
+    udfs.cms_merge: lambda: SketchAccumulator(sketches.CountMinSketch, sketches.CountMinSketch.to_str, is_merge = True),
+    udfs.approx_topk: lambda: SketchAccumulator(sketches.CountMinSketch, udfs.__cms_topk__)
+}
+
+# map of udfs function to the sliding accumulator factory that also supports remove()
+SLIDING_ACCUMULATOR_FACTORIES = {
+    udfs.get_len: SlidingLenAccumulator,
+    udfs.get_non_empty_len: SlidingNonEmptyLenAccumulator,
+    udfs.sumint: SlidingSumIntAccumulator,
+    udfs.sumfloat: SlidingSumFloatAccumulator,
+    udfs.mean: SlidingMeanAccumulator,
+    udfs.minint: lambda: SlidingCompareAccumulator(__parse_int__, True),
+    udfs.maxint: lambda: SlidingCompareAccumulator(__parse_int__, False),
+    udfs.minfloat: lambda: SlidingCompareAccumulator(__parse_float__, True),
+    udfs.maxfloat: lambda: SlidingCompareAccumulator(__parse_float__, False),
+    udfs.minstr: lambda: SlidingCompareAccumulator(__parse_str__, True),
+    udfs.maxstr: lambda: SlidingCompareAccumulator(__parse_str__, False)
+}
+
+# register an accumulator factory for a list based aggregation function
+def register_accumulator(func, factory):
+    ACCUMULATOR_FACTORIES[func] = factory
+
+# returns the factory for the given aggregation function, or None if the function is only available in list form
+def get_accumulator_factory(func):
+    try:
+        return ACCUMULATOR_FACTORIES.get(func)
+    except TypeError:
+        return None
+
+# register a sliding accumulator factory for a list based aggregation function
+def register_sliding_accumulator(func, factory):
+    SLIDING_ACCUMULATOR_FACTORIES[func] = factory
+
+# returns the sliding factory for the given aggregation function, or None if values can not be removed
+def get_sliding_accumulator_factory(func):
+    try:
+        return SLIDING_ACCUMULATOR_FACTORIES.get(func)
+    except TypeError:
+        return None
@@ -0,0 +1,67 @@
+"""Generates specialized row loops for filter and transform.
+
+The generated loop reads the input columns by their constant positions and calls the user function with them directly,
+instead of building a list of values per row and dispatching on the number of columns. The loops only depend on the
+column positions and the calling mode, and are cached on these so that the user function is passed at call time"""
+import functools
+from omigo_core import utils
+
+# returns the source for calling func with the column values
+def __get_call_expr__(indexes, use_array_notation):
+    args = ", ".join(list(["fields[{}]".format(i) for i in indexes]))
+    if (use_array_notation == True):
+        return "func([{}])".format(args)
+    else:
+        return "func({})".format(args)
+
+def __compile__(source, name):
+    utils.trace("codegen: compiling: {}\n{}".format(name, source))
+    namespace = {}
+    exec(compile(source, "<codegen:{}>".format(name), "exec"), namespace) # nosec
+    return namespace[name]
+
+# returns function(data_fields, func, include_cond) that returns the positions of the rows for which the result of func is include_cond
+@functools.lru_cache(maxsize = 1024)
+def compile_filter(indexes, use_array_notation):
+    lines = [
+        "def __compiled_filter__(data_fields, func, include_cond):",
+        "    new_indexes = []",
+        "    append = new_indexes.append",
+        "    pos = 0",
+        "    for fields in data_fields:",
+        "        if ({} == include_cond):".format(__get_call_expr__(indexes, use_array_notation)),
+        "            append(pos)",
+        "        pos = pos + 1",
+        "    return new_indexes"
+    ]
+
+    # return
+    return __compile__("\n".join(lines), "__compiled_filter__")
+
+# returns function(data_fields, func, new_cols) that returns the rows with the results of func appended. The results are converted
+# to the new column values the same way as in transform
+@functools.lru_cache(maxsize = 1024)
+def compile_transform(indexes, use_array_notation, num_new_cols):
+    lines = [
+        "def __compiled_transform__(data_fields, func, new_cols):",
+        "    new_data_fields = []",
+        "    append = new_data_fields.append",
+        "    for fields in data_fields:",
+        "        result = {}".format(__get_call_expr__(indexes, use_array_notation)),
+        "        if (result is None):",
+        "            result = \"\""
+    ]
+
+    # single new column takes the first value of a list
+    if (num_new_cols == 1):
+        lines.append("        append([*fields, str(result[0]) if (isinstance(result, list)) else str(result)])")
+    elif (use_array_notation == False):
+        lines.append("        append([*fields, {}])".format(", ".join(list(["str(result[{}])".format(i) for i in range(num_new_cols)]))))
+    else:
+        lines.append("        if (len(result) != {}):".format(num_new_cols))
+        lines.append("            raise Exception(\"Invalid number of fields in the result array. Expecting: {{}}, Got: {{}}, result: {{}}, new_cols: {{}}\".format({}, len(result), result, new_cols))".format(num_new_cols))
+        lines.append("        append([*fields, *result])")
+
+    # return
+    lines.append("    return new_data_fields")
+    return __compile__("\n".join(lines), "__compiled_transform__")
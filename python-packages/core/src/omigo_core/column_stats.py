@@ -0,0 +1,74 @@
+"""Per column statistics that are computed once and carried over by the DataFrame operations that preserve the column"""
+import numpy as np
+
+# inferred types
+INFERRED_TYPE_INT = "int"
+INFERRED_TYPE_FLOAT = "float"
+INFERRED_TYPE_STR = "str"
+
+class ColumnStats:
+    """Statistics of a single column. min_value and max_value are typed for numeric columns and ignore the empty
+    values for string columns. distinct_count is exact as it comes from the dictionary encoding of the column"""
+
+    inferred_type = None
+    num_rows = None
+    empty_count = None
+    min_value = None
+    max_value = None
+    distinct_count = None
+
+    # constructor
+    def __init__(self, inferred_type, num_rows, empty_count, min_value, max_value, distinct_count):
+        self.inferred_type = inferred_type
+        self.num_rows = num_rows
+        self.empty_count = empty_count
+        self.min_value = min_value
+        self.max_value = max_value
+        self.distinct_count = distinct_count
+
+    def is_int(self):
+        return self.inferred_type == INFERRED_TYPE_INT
+
+    # int values are valid float values too
+    def is_numeric(self):
+        return self.inferred_type in (INFERRED_TYPE_INT, INFERRED_TYPE_FLOAT)
+
+    def to_map(self):
+        return {
+            "inferred_type": self.inferred_type,
+            "num_rows": self.num_rows,
+            "empty_count": self.empty_count,
+            "min_value": self.min_value,
+            "max_value": self.max_value,
+            "distinct_count": self.distinct_count
+        }
+
+    def __repr__(self):
+        return "ColumnStats({})".format(self.to_map())
+
+# get_parsed_func(value_type) returns the column parsed as int or float numpy array, or (codes, dictionary) for str.
+# returns None if the values can not be parsed
+def compute_col_stats(num_rows, get_parsed_func):
+    # empty columns dont have any type
+    if (num_rows == 0):
+        return ColumnStats(INFERRED_TYPE_STR, 0, 0, None, None, 0)
+
+    # check for int first as that is more constrained
+    for inferred_type in [INFERRED_TYPE_INT, INFERRED_TYPE_FLOAT]:
+        arr = get_parsed_func(inferred_type)
+        if (arr is not None):
+            return ColumnStats(inferred_type, num_rows, 0, arr.min().item(), arr.max().item(), len(np.unique(arr)))
+
+    # string column
+    codes, dictionary = get_parsed_func(INFERRED_TYPE_STR)
+    empty_count = 0
+    if ("" in dictionary):
+        empty_count = int(np.count_nonzero(codes == dictionary.index("")))
+
+    # min and max of the non empty values
+    non_empty_values = list(filter(lambda t: t != "", dictionary))
+    min_value = min(non_empty_values) if (len(non_empty_values) > 0) else None
+    max_value = max(non_empty_values) if (len(non_empty_values) > 0) else None
+
+    # return
+    return ColumnStats(INFERRED_TYPE_STR, num_rows, empty_count, min_value, max_value, len(dictionary))
@@ -0,0 +1,195 @@
+"""Columnar storage for DataFrame"""
+import numpy as np
+from omigo_core import utils, rowview
+
+# column types
+COL_TYPE_INT = "int64"
+COL_TYPE_FLOAT = "float64"
+COL_TYPE_STR = "str"
+
+# number of rows to materialize together while iterating the row view
+ROW_VIEW_BLOCK_SIZE = 10000
+
+class Column:
+    """A single column stored as one contiguous array. Numeric values are kept as int64 / float64 only when
+    they can be rendered back to the exact same string, otherwise the values are dictionary encoded"""
+
+    name = None
+    col_type = None
+    values = None
+    dictionary = None
+
+    # constructor
+    def __init__(self, name, col_type, values, dictionary = None):
+        self.name = name
+        self.col_type = col_type
+        self.values = values
+        self.dictionary = dictionary
+
+    def __len__(self):
+        return len(self.values)
+
+    def is_numeric(self):
+        return self.col_type in (COL_TYPE_INT, COL_TYPE_FLOAT)
+
+    # returns the string value at the given position
+    def get(self, i):
+        if (self.col_type == COL_TYPE_STR):
+            return self.dictionary[self.values[i]]
+        else:
+            return str(self.values[i].item())
+
+    # returns the string values for the given row indexes. indexes can be a slice or an int array
+    def get_strings(self, indexes = None):
+        values = self.values if (indexes is None) else self.values[indexes]
+        if (self.col_type == COL_TYPE_STR):
+            dictionary = self.dictionary
+            return list([dictionary[t] for t in values.tolist()])
+        else:
+            return list([str(t) for t in values.tolist()])
+
+    # returns the typed numpy array. for string columns, this is an object array of strings
+    def to_numpy(self):
+        if (self.col_type == COL_TYPE_STR):
+            return np.array(self.dictionary, dtype = object)[self.values]
+        else:
+            return self.values
+
+    def take(self, indexes):
+        return Column(self.name, self.col_type, self.values[indexes], dictionary = self.dictionary)
+
+    def rename(self, name):
+        return Column(name, self.col_type, self.values, dictionary = self.dictionary)
+
+    def size_in_bytes(self):
+        total = self.values.nbytes
+        if (self.dictionary is not None):
+            total = total + sum(list([len(t) for t in self.dictionary]))
+        return total
+
+def __encode_numeric__(values, dtype):
+    # empty values can not be typed
+    if (len(values) == 0):
+        return None
+
+    # parse. numpy accepts some forms like leading spaces that dont round trip, so validate against the original strings
+    try:
+        arr = np.array(values).astype(dtype)
+    except (ValueError, OverflowError, TypeError):
+        return None
+
+    # check that every value renders back to the same string
+    for v1, v2 in zip(arr.tolist(), values):
+        if (str(v1) != v2):
+            return None
+
+    # return
+    return arr
+
+def encode_dictionary(values):
+    # assign a code to each distinct value in the order of first occurrence
+    dictionary_map = {}
+    codes = np.fromiter([dictionary_map.setdefault(v, len(dictionary_map)) for v in values], dtype = np.int32, count = len(values))
+
+    # return
+    return codes, list(dictionary_map.keys())
+
+def encode_column(name, values):
+    # try int
+    arr = __encode_numeric__(values, np.int64)
+    if (arr is not None):
+        return Column(name, COL_TYPE_INT, arr)
+
+    # try float
+    arr = __encode_numeric__(values, np.float64)
+    if (arr is not None):
+        return Column(name, COL_TYPE_FLOAT, arr)
+
+    # fallback to dictionary encoded strings
+    codes, dictionary = encode_dictionary(values)
+    return Column(name, COL_TYPE_STR, codes, dictionary = dictionary)
+
+class ColumnarRowView:
+    """Read only list like view over the columns that materializes the rows as list of strings on access.
+    This keeps all the row oriented methods of DataFrame working without converting back to rows"""
+
+    columns = None
+    indexes = None
+
+    # constructor. indexes is an optional int array of the row positions visible in this view
+    def __init__(self, columns, indexes = None):
+        self.columns = columns
+        self.indexes = indexes
+
+    def __len__(self):
+        if (self.indexes is not None):
+            return len(self.indexes)
+        elif (len(self.columns) > 0):
+            return len(self.columns[0])
+        else:
+            return 0
+
+    def __get_row__(self, i):
+        pos = int(self.indexes[i]) if (self.indexes is not None) else i
+        return list([c.get(pos) for c in self.columns])
+
+    def __getitem__(self, i):
+        # slices return another view without copying the columns
+        if (isinstance(i, slice)):
+            indexes = np.arange(len(self), dtype = np.int64)[i]
+            if (self.indexes is not None):
+                indexes = self.indexes[indexes]
+            return ColumnarRowView(self.columns, indexes = indexes)
+
+        # validation
+        n = len(self)
+        if (i < 0):
+            i = i + n
+        if (i < 0 or i >= n):
+            raise IndexError("ColumnarRowView: index out of range: {}".format(i))
+
+        # return
+        return self.__get_row__(i)
+
+    def __iter__(self):
+        n = len(self)
+        for start in range(0, n, ROW_VIEW_BLOCK_SIZE):
+            end = min(start + ROW_VIEW_BLOCK_SIZE, n)
+            block = slice(start, end) if (self.indexes is None) else self.indexes[start:end]
+            col_values = list([c.get_strings(block) for c in self.columns])
+            for fields in zip(*col_values):
+                yield list(fields)
+
+    def __add__(self, that):
+        return list(self) + list(that)
+
+    def __radd__(self, that):
+        return list(that) + list(self)
+
+    # returns the columns restricted to the visible rows
+    def get_columns(self):
+        if (self.indexes is None):
+            return self.columns
+        else:
+            return list([c.take(self.indexes) for c in self.columns])
+
+    def size_in_bytes(self):
+        return sum(list([c.size_in_bytes() for c in self.get_columns()]))
+
+def from_rows(header_fields, data_fields, dmsg = ""):
+    dmsg = utils.extend_inherit_message(dmsg, "from_rows")
+
+    # transpose the rows
+    columns = []
+    for i in range(len(header_fields)):
+        values = rowview.get_col_values(data_fields, i)
+        columns.append(encode_column(header_fields[i], values))
+
+        # debug
+        utils.trace("{}: column: {}, type: {}".format(dmsg, header_fields[i], columns[-1].col_type))
+
+    # return
+    return ColumnarRowView(columns)
+
+def is_columnar(data_fields):
+    return isinstance(data_fields, ColumnarRowView)
@@ -4,7 +4,7 @@ import math
 import pandas as pd
 import random
 import json
-from omigo_core import utils, tsvutils, udfs 
+from omigo_core import utils, tsvutils, udfs, columnar, lazy, accumulators, column_stats, instrumentation, profiler, json_flatten, sketches, sliding_window, rowview, codegen, expressions, hash_index
 import sys
 import time
 import numpy as np
@@ -19,12 +19,18 @@ class DataFrame:
     header_index_map = None
     header_fields = None
     data_fields = None
+    parsed_cols_cache = None
+    col_stats_cache = None
+    indexes = None
 
     # constructor
     def __init__(self, header_fields, data_fields):
         # initialize header and data
         self.header_fields = header_fields
         self.data_fields = data_fields
+        self.parsed_cols_cache = {}
+        self.col_stats_cache = {}
+        self.indexes = {}
 
         # create map of name->index and index->name
         # self.header_fields = list(filter(lambda t: t != "", self.header.split("\t"))) if (self.header != "") else []
@@ -63,6 +69,10 @@ class DataFrame:
                 if (len(data_fields[0]) != 1):
                     raise Exception("Header length: {} is not matching with data length: {}".format(len(self.header_fields), len(self.data_fields[0])))
 
+        # the rows of a view can be changed in place after copy on write
+        if (rowview.is_view(self.data_fields)):
+            self.data_fields.add_write_listener(self.__clear_caches__)
+
     # debugging
     def to_string(self):
         return "Header: {}, Data: {}".format(str(self.header_fields), str(len(self.data_fields)))
@@ -101,40 +111,39 @@ class DataFrame:
         # new_header = "\t".join(matching_cols)
         new_header_fields = matching_cols
 
-        # create new data
-        counter = 0
-        new_data_fields = []
-        for fields in self.data_fields:
-            # report progress
-            counter = counter + 1
-            utils.report_progress("select: [1/1] selecting columns", dmsg, counter, self.num_rows())
-
-            # get fields
-            # fields = line.split("\t")
-            new_fields = []
-
-            # validation
-            for i in indexes:
-                if (i >= len(fields)):
-                    raise Exception("Invalid index: col_or_cols: {}, matching_cols: {}, indexes: {}, line: {}, fields: {}, len(fields): {}, len(self.header_fields): {}, self.get_header_map(): {}".format(
-                        col_or_cols, matching_cols, indexes, line, fields, len(fields), len(self.header_fields), self.header_map))
-
-                # append to new_fields
-                new_fields.append(fields[i])
+        # columnar data only needs to pick the columns
+        if (self.is_columnar() == True):
+            new_columns = list([self.data_fields.columns[i] for i in indexes])
+            return self.__carry_col_stats__(DataFrame(new_header_fields, columnar.ColumnarRowView(new_columns, indexes = self.data_fields.indexes)),
+                dict([(c, c) for c in matching_cols]), True)
 
-            # append to new data
-            new_data_fields.append(new_fields)
+        # row major data is shared with a view that picks the columns
+        new_data_fields = rowview.create_view(self.data_fields, col_indexes = indexes)
 
         # return
-        return DataFrame(new_header_fields, new_data_fields)
+        return self.__carry_col_stats__(DataFrame(new_header_fields, new_data_fields), dict([(c, c) for c in matching_cols]), True)
 
     def values_not_in(self, col, values, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "values_not_in")
-        return self.filter([col], lambda x: x not in values, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+
+        # use hash index if available
+        row_ids = self.__lookup_index__(col, values)
+        if (row_ids is not None):
+            return self.__exclude_rows__(row_ids)
+
+        # return
+        return self.__vectorized_filter__(col, "str", None, lambda x: x not in values, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def values_in(self, col, values, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "values_in")
-        return self.filter([col], lambda x: x in values, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+
+        # use hash index if available
+        row_ids = self.__lookup_index__(col, values)
+        if (row_ids is not None):
+            return self.__take_rows__(row_ids)
+
+        # return
+        return self.__vectorized_filter__(col, "str", None, lambda x: x in values, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def not_match(self, col, pattern, ignore_if_missing = False, dmsg = ""):
         utils.warn("Please use not_regex_match instead")
@@ -159,31 +168,45 @@ class DataFrame:
 
     def eq(self, col, value, ignore_if_missing = False, dmsg = ""):
         utils.warn("This api can have side effects because of implicit data types conversion in python. Use eq_int, eq_str or eq_float")
+
+        # use hash index if available
+        row_ids = self.__lookup_index__(col, [value])
+        if (row_ids is not None):
+            return self.__take_rows__(row_ids)
+
+        # return
         return self.filter([col], lambda x: x == value, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def eq_int(self, col, value, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "eq_int")
-        return self.filter([col], lambda x: int(float(x)) == value, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "float_to_int", lambda arr: arr == value, lambda x: int(float(x)) == value, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def eq_float(self, col, value, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "eq_float")
-        return self.filter([col], lambda x: float(x) == value, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "float", lambda arr: arr == value, lambda x: float(x) == value, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def eq_str(self, col, value, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "eq_str")
-        return self.filter([col], lambda x: str(x) == str(value), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+
+        # use hash index if available
+        row_ids = self.__lookup_index__(col, [str(value)])
+        if (row_ids is not None):
+            return self.__take_rows__(row_ids)
+
+        # return
+        return self.__vectorized_filter__(col, "str", None, lambda x: str(x) == str(value), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def not_eq_int(self, col, value, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "not_eq_int")
-        return self.filter([col], lambda x: int(x) != value, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "int", lambda arr: arr != value, lambda x: int(x) != value, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def not_eq_float(self, col, value, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "not_eq_float")
-        return self.filter([col], lambda x: float(x) != value, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "float", lambda arr: arr != value, lambda x: float(x) != value, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def not_eq_str(self, col, value, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "not_eq_str")
-        return self.filter([col], lambda x: str(x) != str(value), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "str", None, lambda x: str(x) != str(value), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def is_nonzero(self, col, ignore_if_missing = False, dmsg = ""):
         utils.warn("Deprecated. Use is_nonzero_float() instead")
@@ -192,27 +215,27 @@ class DataFrame:
 
     def is_nonzero_int(self, col, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "is_nonzero_int")
-        return self.filter([col], lambda x: int(x) != 0, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "int", lambda arr: arr != 0, lambda x: int(x) != 0, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def is_nonzero_float(self, col, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "is_nonzero_float")
-        return self.filter([col], lambda x: float(x) != 0, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "float", lambda arr: arr != 0, lambda x: float(x) != 0, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def lt_str(self, col, value, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "lt_str")
-        return self.filter([col], lambda x: x < value, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "str", None, lambda x: x < value, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def le_str(self, col, value, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "le_str")
-        return self.filter([col], lambda x: x <= value, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "str", None, lambda x: x <= value, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def gt_str(self, col, value, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "gt_str")
-        return self.filter([col], lambda x: x > value, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "str", None, lambda x: x > value, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def ge_str(self, col, value, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "ge_str")
-        return self.filter([col], lambda x: x >= value, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "str", None, lambda x: x >= value, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def gt(self, col, value, ignore_if_missing = False, dmsg = ""):
         utils.warn("Deprecated. Use gt_float() instead")
@@ -221,11 +244,11 @@ class DataFrame:
 
     def gt_int(self, col, value, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "gt_int")
-        return self.filter([col], lambda x: int(float(x)) > int(float(value)), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "float_to_int", lambda arr: arr > int(float(value)), lambda x: int(float(x)) > int(float(value)), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def gt_float(self, col, value, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "gt_float")
-        return self.filter([col], lambda x: float(x) > float(value), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "float", lambda arr: arr > float(value), lambda x: float(x) > float(value), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def ge(self, col, value, ignore_if_missing = False, dmsg = ""):
         utils.warn("Deprecated. Use ge_float() instead")
@@ -234,11 +257,11 @@ class DataFrame:
 
     def ge_int(self, col, value, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "ge_int")
-        return self.filter([col], lambda x: int(float(x)) >= int(float(value)), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "float_to_int", lambda arr: arr >= int(float(value)), lambda x: int(float(x)) >= int(float(value)), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def ge_float(self, col, value, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "ge_float")
-        return self.filter([col], lambda x: float(x) >= float(value), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "float", lambda arr: arr >= float(value), lambda x: float(x) >= float(value), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def lt(self, col, value, ignore_if_missing = False, dmsg = ""):
         utils.warn("Deprecated. Use lt_float() instead")
@@ -247,40 +270,40 @@ class DataFrame:
 
     def lt_int(self, col, value, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "lt_int")
-        return self.filter([col], lambda x: int(float(x)) < int(float(value)), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "float_to_int", lambda arr: arr < int(float(value)), lambda x: int(float(x)) < int(float(value)), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def lt_float(self, col, value, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "lt_float")
-        return self.filter([col], lambda x: float(x) < float(value), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "float", lambda arr: arr < float(value), lambda x: float(x) < float(value), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def le(self, col, value, ignore_if_missing = False, dmsg = ""):
         utils.warn("Deprecated. Use le_float() instead")
         dmsg = utils.extend_inherit_message(dmsg, "le")
-        return self.filter([col], lambda x: float(x) <= float(value), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "float", lambda arr: arr <= float(value), lambda x: float(x) <= float(value), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def le_int(self, col, value, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "le_int")
-        return self.filter([col], lambda x: int(float(x)) <= int(float(value)), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "float_to_int", lambda arr: arr <= int(float(value)), lambda x: int(float(x)) <= int(float(value)), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def le_float(self, col, value, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "le_float")
-        return self.filter([col], lambda x: float(x) <= float(value), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "float", lambda arr: arr <= float(value), lambda x: float(x) <= float(value), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def startswith(self, col, prefix, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "startswith")
-        return self.filter([col], lambda x: str(x).startswith(prefix), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "str", None, lambda x: str(x).startswith(prefix), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def not_startswith(self, col, prefix, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "not_startswith")
-        return self.exclude_filter([col], lambda x: str(x).startswith(prefix), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "str", None, lambda x: str(x).startswith(prefix), include_cond = False, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def endswith(self, col, suffix, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "endswith")
-        return self.filter([col], lambda x: str(x).endswith(suffix), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "str", None, lambda x: str(x).endswith(suffix), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def not_endswith(self, col, suffix, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "not_endswith")
-        return self.exclude_filter([col], lambda x: str(x).endswith(suffix), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+        return self.__vectorized_filter__(col, "str", None, lambda x: str(x).endswith(suffix), include_cond = False, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
     def is_empty_str(self, col, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "is_empty_str")
@@ -294,7 +317,8 @@ class DataFrame:
         dmsg = utils.extend_inherit_message(dmsg, "replace_str_inline")
         return self.transform_inline(cols, lambda x: x.replace(old_str, new_str), ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
-    def group_count(self, cols, prefix = "group", collapse = True, precision = 6, dmsg = ""):
+    # topk returns only the approximate topk groups using count-min sketch with constant memory
+    def group_count(self, cols, prefix = "group", collapse = True, precision = 6, topk = None, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "group_count")
 
         # check empty
@@ -312,6 +336,27 @@ class DataFrame:
         if (new_count_col in cols or new_ratio_col in cols):
             raise Exception("Use a different prefix than: {}".format(prefix))
 
+        # approximate topk groups
+        if (topk is not None):
+            # validation
+            if (collapse == False):
+                raise Exception("{}: topk can not be used with collapse = False".format(dmsg))
+
+            # the group key is tab separated as the values can not have tabs
+            indexes = self.__get_col_indexes__(cols)
+            cms = sketches.CountMinSketch(num_heavy_hitters = 2 * topk)
+            for fields in instrumentation.track(self.data_fields, "group_count topk", dmsg):
+                cms.add("\t".join([fields[i] for i in indexes]))
+
+            # create output
+            new_data_fields = []
+            for key, count in cms.topk(topk):
+                new_data_fields.append(key.split("\t") + [str(count), str(count / self.num_rows())])
+
+            # return
+            return DataFrame(cols + [new_count_col, new_ratio_col], new_data_fields) \
+                .apply_precision(new_ratio_col, precision, dmsg = dmsg)
+
         # call aggregate with collapse=False
         return self \
             .aggregate(cols, [cols[0]], [udfs.get_len], collapse = collapse, dmsg = dmsg) \
@@ -339,10 +384,10 @@ class DataFrame:
     # TODO: use skip_rows for better name
     def skip(self, count):
         utils.warn_once("use skip_rows instead coz of better name")
-        return self.skip(count)
+        return self.skip_rows(count)
 
     def skip_rows(self, count):
-        return DataFrame(self.header, self.data[count:])
+        return DataFrame(self.header_fields, self.__slice_rows__(slice(count, None)))
 
     def last(self, count):
         # check boundary conditions
@@ -350,14 +395,21 @@ class DataFrame:
             count = self.num_rows()
 
         # return
-        return DataFrame(self.header_fields, self.data_fields[-count:])
+        return DataFrame(self.header_fields, self.__slice_rows__(slice(-count, None)))
 
     def take(self, count, dmsg = ""):
         # return result
         if (count > self.num_rows()):
             count = self.num_rows()
 
-        return DataFrame(self.header_fields, self.data_fields[0:count])
+        return DataFrame(self.header_fields, self.__slice_rows__(slice(0, count)))
+
+    # row major data is shared with a view. The views and columnar data already return views for slices
+    def __slice_rows__(self, xslice):
+        if (isinstance(self.data_fields, list)):
+            return rowview.RowView(self.data_fields, row_indexes = range(len(self.data_fields))[xslice])
+        else:
+            return self.data_fields[xslice]
 
     def distinct(self, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "distinct")
@@ -367,12 +419,7 @@ class DataFrame:
         key_map = {}
 
         # iterate
-        counter = 0
-        for fields in self.data_fields:
-            # report progress
-            counter = counter + 1
-            utils.report_progress("[1/1] calling function", dmsg, counter, self.num_rows())
-
+        for fields in instrumentation.track(self.data_fields, "[1/1] calling function", dmsg):
             # check if the line doesnt exist already
             line = "\t".join(fields)
             if (line not in key_map.keys()):
@@ -447,12 +494,7 @@ class DataFrame:
         fill_flags = list([0 for i in range(self.num_cols())])
 
         # iterate and add
-        counter = 0
-        for fields in self.data_fields:
-            # report progress
-            counter = counter + 1
-            utils.report_progress("[1/1] calling function", dmsg, counter, self.num_rows())
-
+        for fields in instrumentation.track(self.data_fields, "[1/1] calling function", dmsg):
             # parse
             # fields = line.split("\t")
             for i in range(self.num_cols()):
@@ -497,7 +539,12 @@ class DataFrame:
         return DataFrame(self.header_fields, new_data_fields)
  
     # TODO: the select_cols is not implemented properly
-    def window_aggregate(self, win_col, agg_cols, agg_funcs, winsize, select_cols = None, sliding = False, collapse = True, suffix = "", precision = 2, dmsg = ""):
+    # time_based = True takes winsize in seconds. The sliding windows end at each value of win_col and cover the previous winsize seconds,
+    # and the other windows are aligned to multiples of winsize seconds. win_col can be timestamp in seconds or datetime string
+    def window_aggregate(self, win_col, agg_cols, agg_funcs, winsize, select_cols = None, sliding = False, collapse = True, suffix = "", precision = 2,
+        time_based = False, dmsg = ""):
+        dmsg = utils.extend_inherit_message(dmsg, "window_aggregate")
+
         # check empty
         if (self.has_empty_header()):
             raise Exception("window_aggregate: empty header tsv")
@@ -511,6 +558,26 @@ class DataFrame:
         if (len(self.col_as_array(win_col)) != len(self.col_as_array_uniq(win_col))):
             utils.warn("The windowing column has non unique values: total: {}, uniq: {}. The results may not be correct.".format(len(self.col_as_array(win_col)),  len(self.col_as_array_uniq(win_col))))
 
+        # sliding and time based windows are computed in a single sweep without creating a row per window
+        if (collapse == True and (sliding == True or time_based == True)):
+            # validation
+            for agg_col in agg_cols:
+                if (agg_col not in self.header_map.keys()):
+                    raise Exception("Column not found: {}, header: {}".format(agg_col, self.header_fields))
+
+            # aggregate
+            results = sliding_window.aggregate(self.data_fields, self.__get_col_indexes__(select_cols), self.header_map[win_col],
+                list([self.header_map[agg_col] for agg_col in agg_cols]), agg_funcs, winsize, sliding, time_based, dmsg = dmsg)
+
+            # create output
+            new_header_fields = select_cols + [win_col] + list([agg_cols[j] + ":" + get_func_name(agg_funcs[j]) for j in range(len(agg_cols))])
+            new_data_fields = []
+            for (group_key, namex, namey, agg_values) in results:
+                new_data_fields.append(list(group_key) + [namex + " - " + namey] + agg_values)
+
+            # return
+            return DataFrame(new_header_fields, new_data_fields)
+
         # this takes unique values for agg column, split them into windows and then run the loop
         win_col_values = sorted(list(set(self.col_as_array(win_col))))
 
@@ -552,17 +619,12 @@ class DataFrame:
         # transform and normalize the value of win_col
         suffix2 = suffix if (suffix != "") else "window_aggregate"
         new_win_col = win_col + ":" + suffix2
-        new_header = self.header + "\t" + new_win_col
+        new_header_fields = self.header_fields + [new_win_col]
 
         new_data_fields = []
 
         # iterate over data
-        counter = 0
-        for fields in self.data_fields:
-            # report progress
-            counter = counter + 1
-            utils.report_progress("window_aggregate: [1/1] calling function", dmsg, counter, self.num_rows())
-
+        for fields in instrumentation.track(self.data_fields, "window_aggregate: [1/1] calling function", dmsg):
             # parse data
             win_value = fields[self.header_map[win_col]]
             win_indexes = win_mapping[win_value]
@@ -613,12 +675,7 @@ class DataFrame:
 
         # group all the values in the key
         grouped = {}
-        counter = 0
-        for fields in self.data_fields:
-            # report progress
-            counter = counter + 1
-            utils.report_progress("group_by_key: [1/3] grouping: progress", dmsg, counter, self.num_rows())
-
+        for fields in instrumentation.track(self.data_fields, "group_by_key: [1/3] grouping: progress", dmsg):
             # create grouping key
             keys = []
             values_map = {}
@@ -636,12 +693,7 @@ class DataFrame:
 
         # apply the agg func
         grouped_agg = {}
-        counter = 0
-        for k, vs in grouped.items():
-            # report progress
-            counter = counter + 1
-            utils.report_progress("group_by_key: [2/3] grouping func: progress", dmsg, counter, len(grouped))
-
+        for k, vs in instrumentation.track(grouped.items(), "group_by_key: [2/3] grouping func: progress", dmsg):
             # get fields
             vs_map = agg_func(vs)
             grouped_agg[k] = vs_map
@@ -685,12 +737,7 @@ class DataFrame:
 
         # create data
         new_data_fields = []
-        counter = 0
-        for fields in self.data_fields:
-            # report progress
-            counter = counter + 1
-            utils.report_progress("group_by_key: [3/3] generating data", dmsg, counter, self.num_rows())
-
+        for fields in instrumentation.track(self.data_fields, "group_by_key: [3/3] generating data", dmsg):
             # create grouping key
             keys = []
             for g in grouping_cols:
@@ -831,6 +878,32 @@ class DataFrame:
         if (self.has_empty_header()):
             raise Exception("aggregate: empty header tsv")
 
+        # expressions are added as temporary columns using their names
+        if (any([expressions.is_expr(t) for t in agg_cols])):
+            xdf = self
+            expr_cols = []
+            new_agg_cols = []
+            for agg_col in agg_cols:
+                if (expressions.is_expr(agg_col)):
+                    # plain columns are used as is. The name of the others must not clash with existing columns
+                    name = agg_col.get_name()
+                    if (name not in expr_cols and isinstance(agg_col, expressions.Col) == False):
+                        xdf = xdf.__add_expr_col__(agg_col, name, dmsg = dmsg)
+                        expr_cols.append(name)
+                    new_agg_cols.append(name)
+                else:
+                    new_agg_cols.append(agg_col)
+
+            # the temporary columns are part of the non collapsed output
+            result = xdf.aggregate(grouping_col_or_cols, new_agg_cols, agg_funcs, collapse = collapse, precision = precision, use_rolling = use_rolling,
+                use_string_datatype = use_string_datatype, string_datatype_cols = string_datatype_cols, dmsg = dmsg)
+            if (collapse == False and len(expr_cols) > 0):
+                indexes = list([i for i in range(len(result.header_fields)) if (result.header_fields[i] not in expr_cols)])
+                return DataFrame(list([result.header_fields[i] for i in indexes]), rowview.create_view(result.data_fields, col_indexes = indexes))
+
+            # return
+            return result
+
         # check for usage of builtin functions
         for agg_func in agg_funcs:
             # raise warning if builtin functions are used
@@ -890,91 +963,65 @@ class DataFrame:
             if (use_string_datatype == True and string_datatype_cols is not None and agg_col in string_datatype_cols):
                 str_agg_col_indexes.append(agg_index)
 
-        # create a map to store array of values
-        value_map_arr = [{} for i in range(len(agg_col_indexes))]
+        # create new header. this also validates that new cols dont exist already
+        new_header_fields = utils.merge_arrays([self.header_fields, new_cols])
+        DataFrame(new_header_fields, [])
 
-        # iterate over the data
-        counter = 0
-        for fields in self.data_fields:
-            # report progress
-            counter = counter + 1
-            utils.report_progress("[1/2] building groups", dmsg, counter, self.num_rows())
+        # use incremental accumulators wherever available, and list of values for the rest
+        factories = list([accumulators.get_accumulator_factory(agg_func) for agg_func in agg_funcs])
 
-            # new col values
-            col_values = []
-            for i in indexes:
-                col_values.append(fields[i])
+        # map of group key to the list of accumulators
+        groups_map = {}
 
+        # iterate over the data
+        for fields in instrumentation.track(self.data_fields, "[1/1] building groups", dmsg):
             # generate hash key
-            cols_key = "\t".join(col_values)
+            cols_key = tuple([fields[i] for i in indexes])
+
+            # create accumulators for the new group
+            accs = groups_map.get(cols_key)
+            if (accs is None):
+                accs = list([factory() if (factory is not None) else [] for factory in factories])
+                groups_map[cols_key] = accs
 
             # for each possible aggregation, do this
             for j in range(len(agg_col_indexes)):
-                if (cols_key not in value_map_arr[j].keys()):
-                    value_map_arr[j][cols_key] = []
-
-                # append
-                value_map_arr[j][cols_key].append(str(fields[agg_col_indexes[j]]))
+                if (factories[j] is not None):
+                    accs[j].add(fields[agg_col_indexes[j]])
+                else:
+                    accs[j].append(str(fields[agg_col_indexes[j]]))
 
         # compute the aggregation
-        value_func_map_arr = [{} for i in range(len(agg_col_indexes))]
-
-        # for each possible index, do aggregation
-        for j in range(len(agg_col_indexes)):
-            for k, vs in value_map_arr[j].items():
-                agg_value = agg_funcs[j](vs)
-                value_func_map_arr[j][k] = agg_value if (agg_value) is not None else ""
-
-        # create new header and data
-        new_header_fields = utils.merge_arrays([self.header_fields, new_cols])
-        new_data_fields = []
-
-        # for each output line, attach the new aggregate value
-        counter = 0
-        cols_key_map = {}
-        for fields in self.data_fields:
-            # report progress
-            counter = counter + 1
-            utils.report_progress("[2/2] calling function", dmsg, counter, self.num_rows())
-
-            # data processing
-            col_values = []
-            for i in indexes:
-                col_values.append(fields[i])
-
-            # generate hash keys
-            cols_key = "\t".join(col_values)
-
-            # append the aggregated values
+        agg_values_map = {}
+        for cols_key, accs in groups_map.items():
             agg_values = []
             for j in range(len(agg_col_indexes)):
-                agg_values.append(str(value_func_map_arr[j][cols_key]))
-
-            # check for different flags
-            if (collapse == False or cols_key not in cols_key_map.keys()):
-                new_fields = utils.merge_arrays([fields, agg_values])
-                new_data_fields.append(new_fields)
-                cols_key_map[cols_key] = 1
+                agg_value = accs[j].result() if (factories[j] is not None) else agg_funcs[j](accs[j])
+                agg_values.append(str(agg_value) if (agg_value is not None) else "")
+            agg_values_map[cols_key] = agg_values
 
-        # create result
-        result_xtsv = DataFrame(new_header_fields, new_data_fields)
+        # release memory
+        groups_map = None
 
-        # check collapse flag
+        # collapsed output has one row per group in the order of first occurrence
         if (collapse == True):
-            # uniq cols
-            uniq_cols = []
-            for col in grouping_cols:
-                uniq_cols.append(col)
-            for new_col in new_cols:
-                uniq_cols.append(new_col)
+            new_data_fields = []
+            for cols_key, agg_values in agg_values_map.items():
+                new_data_fields.append(utils.merge_arrays([cols_key, agg_values]))
 
-            # create result
-            result_xtsv = result_xtsv.select(uniq_cols)
+            # return
+            return DataFrame(utils.merge_arrays([grouping_cols, new_cols]), new_data_fields)
+
+        # for each output line, attach the new aggregate value
+        new_data_fields = []
+        for fields in self.data_fields:
+            cols_key = tuple([fields[i] for i in indexes])
+            new_data_fields.append(utils.merge_arrays([fields, agg_values_map[cols_key]]))
 
         # return
-        return result_xtsv
+        return DataFrame(new_header_fields, new_data_fields)
 
-    def filter(self, cols, func, include_cond = True, use_array_notation = False, ignore_if_missing = False, dmsg = ""):
+    def filter(self, cols, func = None, include_cond = True, use_array_notation = False, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "filter")
 
         # check empty
@@ -982,6 +1029,21 @@ class DataFrame:
             utils.raise_exception_or_warn("filter: empty header tsv", ignore_if_missing)
             return self
 
+        # expressions are evaluated a column at a time. Equality on a column uses the hash index if available
+        if (expressions.is_expr(cols)):
+            lookup = expressions.get_lookup(cols)
+            row_ids = self.__lookup_index__(lookup[0], lookup[1]) if (lookup is not None) else None
+            if (row_ids is not None):
+                return self.__take_rows__(row_ids) if (include_cond == True) else self.__exclude_rows__(row_ids)
+
+            # evaluate
+            mask = cols.evaluate_mask(self)
+            return self.__select_rows_by_mask__(mask if (include_cond == True) else np.logical_not(mask))
+
+        # validation
+        if (func is None):
+            raise Exception("filter: func is required when cols is not an expression: {}".format(cols))
+
         # TODO: Filter should not use regex. Need to add warning as the order of fields matter
         cols = self.__get_matching_cols__(cols, ignore_if_missing = ignore_if_missing)
         indexes = self.__get_col_indexes__(cols)
@@ -994,65 +1056,20 @@ class DataFrame:
             utils.raise_exception_or_warn("filter: no matching cols", ignore_if_missing)
             return self
 
-        # new data
-        new_data_fields = []
-        counter = 0
-        for fields in self.data_fields:
-            # report progress
-            counter = counter + 1
-            utils.report_progress("[1/1] calling function", dmsg, counter, self.num_rows())
-
-            # create col values
-            col_values = []
-            for index in indexes:
-                col_values.append(fields[index])
-
-            # use_array_notation
-            if (use_array_notation == False):
-                # switch case for different number of inputs
-                if (num_cols == 1):
-                    result = func(col_values[0])
-                elif (num_cols == 2):
-                    result = func(col_values[0], col_values[1])
-                elif (num_cols == 3):
-                    result = func(col_values[0], col_values[1], col_values[2])
-                elif (num_cols == 4):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3])
-                elif (num_cols == 5):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4])
-                elif (num_cols == 6):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5])
-                elif (num_cols == 7):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5], col_values[6])
-                elif (num_cols == 8):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5], col_values[6], col_values[7])
-                elif (num_cols == 9):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5], col_values[6], col_values[7], col_values[8])
-                elif (num_cols == 10):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5], col_values[6], col_values[7], col_values[8], col_values[9])
-                elif (num_cols == 11):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5], col_values[6], col_values[7], col_values[8], col_values[9], col_values[10])
-                elif (num_cols == 12):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5], col_values[6], col_values[7], col_values[8], col_values[9], col_values[10], col_values[11])
-                elif (num_cols == 13):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5], col_values[6], col_values[7], col_values[8], col_values[9], col_values[10], col_values[11], col_values[12])
-                elif (num_cols == 14):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5], col_values[6], col_values[7], col_values[8], col_values[9], col_values[10], col_values[11], col_values[12], col_values[13])
-                elif (num_cols == 15):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5], col_values[6], col_values[7], col_values[8], col_values[9], col_values[10], col_values[11], col_values[12], col_values[13], col_values[14])
-                else:
-                    raise Exception("Number of columns is not supported beyond 10: {}".format(str(cols)))
-            else:
-                result = func(col_values)
+        # views are read directly from the parent rows
+        data_fields = self.data_fields
+        if (self.is_view() == True):
+            indexes = data_fields.get_parent_col_indexes(indexes)
+            data_fields = data_fields.iter_parent_rows()
 
-            # create result
-            if (result == include_cond):
-                new_data_fields.append(fields)
+        # call the generated loop for these column positions
+        filter_func = codegen.compile_filter(tuple(indexes), use_array_notation)
+        new_indexes = filter_func(instrumentation.track(data_fields, "[1/1] calling function", dmsg, total = self.num_rows()), func, include_cond)
 
         # return
-        return DataFrame(self.header_fields, new_data_fields)
+        return self.__take_rows__(new_indexes)
 
-    def exclude_filter(self, cols, func, ignore_if_missing = False, dmsg = ""):
+    def exclude_filter(self, cols, func = None, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "exclude_filter")
         return self.filter(cols, func, include_cond = False, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
@@ -1158,13 +1175,22 @@ class DataFrame:
         dmsg = utils.extend_inherit_message(dmsg, "all_col_with_cond_exists_exclude_filter")
         return self.__all_col_with_cond_exists_filter__(cols, func, exclude_flag = True, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
 
-    def transform(self, cols, func, new_col_or_cols, use_array_notation = False, dmsg = ""):
+    # cols can also be an expression, in which case the second parameter is the new column: transform(expr, new_col)
+    def transform(self, cols, func, new_col_or_cols = None, use_array_notation = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "transform")
 
         # check empty
         if (self.has_empty_header()):
             raise Exception("transform: empty header tsv")
 
+        # expressions are evaluated a column at a time
+        if (expressions.is_expr(cols)):
+            return self.__add_expr_col__(cols, func, dmsg = dmsg)
+
+        # validation
+        if (new_col_or_cols is None):
+            raise Exception("transform: new_col_or_cols is required when cols is not an expression: {}".format(cols))
+
         # resolve to matching_cols
         matching_cols = self.__get_matching_cols__(cols)
 
@@ -1198,117 +1224,16 @@ class DataFrame:
             return self.add_empty_cols_if_missing(new_cols)
 
         # get the indexes
-        num_cols = len(matching_cols)
         indexes = []
         for col in matching_cols:
             indexes.append(self.header_map[col])
 
-        # create new header and data
+        # create new header
         new_header_fields = utils.merge_arrays([self.header_fields, new_cols])
-        new_data_fields = []
-        counter = 0
 
-        # iterate over data
-        for fields in self.data_fields:
-            counter = counter + 1
-            utils.report_progress("[1/1] calling function", dmsg, counter, self.num_rows())
-
-            # get fields
-            col_values = []
-
-            # get the fields in cols
-            for index in indexes:
-                col_values.append(fields[index])
-
-            # check which notation is used to do the function call
-            if (use_array_notation == False):
-                if (num_cols == 1):
-                    # TODO: this if condition is not able to do error check when number of output columns doesnt match number of input cols
-                    result = func(col_values[0])
-                elif (num_cols == 2):
-                    result = func(col_values[0], col_values[1])
-                elif (num_cols == 3):
-                    result = func(col_values[0], col_values[1], col_values[2])
-                elif (num_cols == 4):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3])
-                elif (num_cols == 5):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4])
-                elif (num_cols == 6):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5])
-                elif (num_cols == 7):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5], col_values[6])
-                elif (num_cols == 8):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5], col_values[6], col_values[7])
-                elif (num_cols == 9):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5], col_values[6], col_values[7], col_values[8])
-                elif (num_cols == 10):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5], col_values[6], col_values[7], col_values[8], col_values[9])
-                elif (num_cols == 11):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5], col_values[6], col_values[7], col_values[8], col_values[9], col_values[10])
-                elif (num_cols == 12):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5], col_values[6], col_values[7], col_values[8], col_values[9], col_values[10], col_values[11])
-                elif (num_cols == 13):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5], col_values[6], col_values[7], col_values[8], col_values[9], col_values[10], col_values[11], col_values[12])
-                elif (num_cols == 14):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5], col_values[6], col_values[7], col_values[8], col_values[9], col_values[10], col_values[11], col_values[12], col_values[13])
-                elif (num_cols == 15):
-                    result = func(col_values[0], col_values[1], col_values[2], col_values[3], col_values[4], col_values[5], col_values[6], col_values[7], col_values[8], col_values[9], col_values[10], col_values[11], col_values[12], col_values[13], col_values[14])
-                else:
-                    raise Exception("Number of columns is not supported beyond 15. Probably try to use use_array_notation approach: {}".format(str(cols)))
-            else:
-                result = func(col_values)
-
-            # if result is None, convert to empty string
-            if (result is None):
-                result = ""
-
-            # create new line and append to data. Do validation
-            result_arr = []
-            if (use_array_notation == False):
-                if (num_new_cols == 1):
-                    if (isinstance(result, list)):
-                        result_arr.append(str(result[0]))
-                    else:
-                        result_arr.append(str(result))
-                if (num_new_cols >= 2):
-                    result_arr.append(str(result[0]))
-                    result_arr.append(str(result[1]))
-                if (num_new_cols >= 3):
-                    result_arr.append(str(result[2]))
-                if (num_new_cols >= 4):
-                    result_arr.append(str(result[3]))
-                if (num_new_cols >= 5):
-                    result_arr.append(str(result[4]))
-                if (num_new_cols >= 6):
-                    result_arr.append(str(result[5]))
-                if (num_new_cols >= 7):
-                    result_arr.append(str(result[6]))
-                if (num_new_cols >= 8):
-                    result_arr.append(str(result[7]))
-                if (num_new_cols >= 9):
-                    result_arr.append(str(result[8]))
-                if (num_new_cols >= 10):
-                    result_arr.append(str(result[9]))
-                if (num_new_cols >= 11):
-                    raise Exception("Number of new columns is not supported beyond 10. Probably try to use use_array_notation approach: {}".format(str(new_cols)))
-            else:
-                # check how many columns to expect.
-                if (num_new_cols == 1):
-                    if (isinstance(result, str)):
-                        result_arr.append(str(result))
-                    elif (isinstance(result, list)):
-                        result_arr.append(str(result[0]))
-                    else:
-                        result_arr.append(str(result))
-                else:
-                    if (len(result) != num_new_cols):
-                        raise Exception("Invalid number of fields in the result array. Expecting: {}, Got: {}, result: {}, new_cols: {}".format(num_new_cols, len(result), result, new_cols))
-                    for r in result:
-                        result_arr.append(r)
-
-            # create new line
-            new_fields = utils.merge_arrays([fields, result_arr])
-            new_data_fields.append(new_fields)
+        # call the generated loop for these column positions
+        transform_func = codegen.compile_transform(tuple(indexes), use_array_notation, num_new_cols)
+        new_data_fields = transform_func(instrumentation.track(self.data_fields, "[1/1] calling function", dmsg), func, new_cols)
 
         # return
         return DataFrame(new_header_fields, new_data_fields)
@@ -1336,10 +1261,7 @@ class DataFrame:
 
         # create new data
         new_data_fields = []
-        counter = 0
-        for fields in self.data_fields:
-            counter = counter + 1
-            utils.report_progress("[1/1] calling function", dmsg, counter, self.num_rows())
+        for fields in instrumentation.track(self.data_fields, "[1/1] calling function", dmsg):
 
             # create new fields
             new_fields = []
@@ -1411,7 +1333,7 @@ class DataFrame:
         new_header_fields = list([new_col if (h == col) else h for h in self.header_fields])
 
         # return 
-        return DataFrame(new_header_fields, self.data_fields)
+        return self.__carry_col_stats__(DataFrame(new_header_fields, self.data_fields), dict([(h, new_col if (h == col) else h) for h in self.header_fields]), True)
 
     def get_header_fields(self):
         return self.header_fields
@@ -1434,10 +1356,66 @@ class DataFrame:
 
     def size_in_bytes(self):
         total = sum(list([len(t) for t in self.header_fields]))
+
+        # columnar data knows its size without materializing the rows
+        if (self.is_columnar() == True):
+            return total + self.data_fields.size_in_bytes()
+
         for fields in self.data_fields:
             total = total + sum(list([len(t) for t in fields]))
         return total
 
+    # convert to column major storage. row oriented methods keep working through a lazy row view
+    def to_columnar(self, dmsg = ""):
+        dmsg = utils.extend_inherit_message(dmsg, "to_columnar")
+
+        # check if already columnar
+        if (self.is_columnar() == True):
+            return self
+
+        # return
+        new_df = DataFrame(self.header_fields, columnar.from_rows(self.header_fields, self.data_fields, dmsg = dmsg))
+        return self.__carry_col_stats__(new_df, dict([(c, c) for c in self.header_fields]), True)
+
+    # convert back to row major storage. This also materializes the row views
+    def to_row_major(self, dmsg = ""):
+        dmsg = utils.extend_inherit_message(dmsg, "to_row_major")
+
+        # check if already row major
+        if (self.is_columnar() == False and self.is_view() == False):
+            return self
+
+        # return
+        return self.__carry_col_stats__(DataFrame(self.header_fields, list(self.data_fields)), dict([(c, c) for c in self.header_fields]), True)
+
+    # returns a lazy version of this dataframe. the method chain is executed on collect()
+    def lazy(self):
+        return lazy.LazyDataFrame(source_df = self)
+
+    def is_columnar(self):
+        return columnar.is_columnar(self.data_fields)
+
+    # returns true if the rows are a view over the rows of another dataframe
+    def is_view(self):
+        return rowview.is_view(self.data_fields)
+
+    # returns the Column object for the given column name. only valid for columnar dataframes
+    def get_columnar_column(self, col, dmsg = ""):
+        dmsg = utils.extend_inherit_message(dmsg, "get_columnar_column")
+
+        # validation
+        if (self.is_columnar() == False):
+            raise Exception("{}: dataframe is not columnar. Use to_columnar()".format(dmsg))
+
+        if (col not in self.header_map.keys()):
+            raise Exception("{}: column not found: {}, {}".format(dmsg, col, self.header_fields))
+
+        # return
+        column = self.data_fields.columns[self.header_map[col]]
+        if (self.data_fields.indexes is not None):
+            column = column.take(self.data_fields.indexes)
+        return column
+
     def size_in_mb(self):
         return int(self.size_in_bytes() / 1e6)
 
@@ -1546,9 +1524,8 @@ class DataFrame:
         # create new data
         new_data_fields = []
         counter = start - 1 
-        for fields in self.data_fields:
+        for fields in instrumentation.track(self.data_fields, "add_seq_num: [1/1] adding new column", dmsg):
             counter = counter + 1
-            utils.report_progress("add_seq_num: [1/1] adding new column", dmsg, counter, self.num_rows())
             new_data_fields.append([str(counter)] + fields)
 
         # return
@@ -1657,7 +1634,7 @@ class DataFrame:
         # determine which columns are numeric type
         for k in self.header_map.keys():
             col_widths[k] = min(len(k), max_col_width)
-            is_numeric_type_map[k] = True
+            is_numeric_type_map[k] = self.get_col_stats(k).is_numeric()
 
         # determine width
         for fields in self.data_fields:
@@ -1666,10 +1643,6 @@ class DataFrame:
                 k = self.header_index_map[i]
                 value = fields[i]
                 col_widths[k] = min(max_col_width, max(col_widths[k], len(str(value))))
-                try:
-                    vfloat = float(value)
-                except ValueError:
-                    is_numeric_type_map[k] = False
 
         # combine header and lines
         all_data_fields = [self.header_fields]
@@ -1778,6 +1751,16 @@ class DataFrame:
         if (len(value_cols) > 1):
             raise Exception("cols_as_map: using value_cols as more than 1 column is deprecated: {}".format(value_cols)) 
 
+        # use hash index if available. The keys are in the order of first occurrence same as the scan
+        index = self.__get_index__(key_cols)
+        if (index is not None and len(value_cols) == 1):
+            if (index.is_unique() == False):
+                raise Exception("keys is not unique: {}".format([index.get_first_duplicate_key()]))
+            value_index = self.header_map[value_cols[0]]
+            data_fields = self.data_fields
+            row_ids = index.get_first_row_ids().tolist()
+            return dict([(index.keys[i], str(data_fields[row_ids[i]][value_index])) for i in range(len(row_ids))])
+
         # create map
         mp = {}
         for fields in self.data_fields:
@@ -1819,6 +1802,24 @@ class DataFrame:
         # return
         return tuple(values)
 
+    # returns numpy array of sort keys for the column. string values are replaced by their rank
+    def __get_sort_key_array__(self, col, all_numeric, reverse):
+        if (all_numeric == True):
+            sort_key = self.__get_parsed_col__(col, "float")
+
+            # raise the same error as float() for values that are not numeric
+            if (sort_key is None):
+                index = self.header_map[col]
+                sort_key = np.array(list([float(fields[index]) for fields in self.data_fields]))
+        else:
+            (codes, dictionary) = self.__get_parsed_col__(col, "str")
+            ranks = np.empty(len(dictionary), dtype = np.int64)
+            ranks[sorted(range(len(dictionary)), key = lambda i: dictionary[i])] = np.arange(len(dictionary), dtype = np.int64)
+            sort_key = ranks[codes]
+
+        # negate for reverse order. stable sort keeps the original order for the same values as sorted() does
+        return np.negative(sort_key) if (reverse == True) else sort_key
+
     # TODO: this api needs to remove the auto detection of all_numeric flag
     def sort(self, cols, reverse = False, reorder = False, all_numeric = None, ignore_if_missing = False, dmsg = ""):
         # check empty
@@ -1828,38 +1829,47 @@ class DataFrame:
 
         # find matching cols just to validate the presence of columns
         matching_cols = self.__get_matching_cols__(cols)
-        indexes = self.__get_col_indexes__(matching_cols)
 
         # check if there were any matching cols
         if (len(matching_cols) == 0):
             utils.raise_exception_or_warn("sort: no matching cols found.", ignore_if_missing)
             return self
 
-        # check if all are numeric or not
+        # check if all are numeric or not. the parsed values are reused as sort keys
         if (all_numeric is None):
-            has_alpha = False
+            all_numeric = True
             for col in matching_cols:
                 # check for data type for doing automatic numeric or string sorting
-                if (self.__has_all_float_values__(col) == False):
-                    has_alpha = True
+                if (self.get_col_stats(col).is_numeric() == False):
+                    all_numeric = False
                     break
 
-            # if any string column was found, then use string sorting else numeric
-            if (has_alpha == True):
-                all_numeric = False
-            else:
-                all_numeric = True
+        # extract the typed keys once and sort the row indexes. NaN values are at the end in both directions, same as
+        # external_sort.get_sort_key_func
+        dmsg = utils.extend_inherit_message(dmsg, "sort")
+        sort_keys = list([self.__get_sort_key_array__(col, all_numeric, reverse) for col in matching_cols])
+        if (len(sort_keys) == 1):
+            sorted_indexes = np.argsort(sort_keys[0], kind = "stable")
+        else:
+            sorted_indexes = np.lexsort(list(reversed(sort_keys)))
+
+        # columnar data only needs the row indexes
+        if (self.is_columnar() == True):
+            if (self.data_fields.indexes is not None):
+                sorted_indexes = self.data_fields.indexes[sorted_indexes]
+            new_data_fields = columnar.ColumnarRowView(self.data_fields.columns, indexes = sorted_indexes)
+        else:
+            new_data_fields = list([self.data_fields[i] for i in sorted_indexes.tolist()])
 
-        # sort
-        new_data_fields = sorted(self.data_fields, key = lambda fields: self.__sort_helper__(fields, indexes, all_numeric = all_numeric), reverse = reverse)
+        # the rows are only permuted so the stats are still valid
+        new_df = self.__carry_col_stats__(DataFrame(self.header_fields, new_data_fields), dict([(h, h) for h in self.header_fields]), False)
 
         # check if need to reorder the fields
-        dmsg = utils.extend_inherit_message(dmsg, "sort")
         if (reorder == True):
-            return DataFrame(self.header_fields, new_data_fields) \
+            return new_df \
                 .reorder(matching_cols, dmsg = dmsg)
         else:
-            return DataFrame(self.header_fields, new_data_fields)
+            return new_df
 
     def reverse_sort(self, cols, reorder = False, all_numeric = None, ignore_if_missing = False, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "reverse_sort")
@@ -1970,10 +1980,11 @@ class DataFrame:
                 if (no_infer_cols is not None and col in no_infer_cols):
                     continue
 
-                # determine the inferred data type. Check for int first as that is more constrained
-                if (self.__has_all_int_values__(col)):
+                # determine the inferred data type
+                col_stats = self.get_col_stats(col)
+                if (col_stats.is_int()):
                     int_cols.append(col)
-                elif (self.__has_all_float_values__(col)):
+                elif (col_stats.is_numeric()):
                     float_cols.append(col)
 
         # iterate over data
@@ -2155,6 +2166,13 @@ class DataFrame:
             .drop_cols(temp_col)
 
     def add_const(self, col, value, dmsg = ""):
+        # expressions are evaluated a column at a time
+        if (expressions.is_expr(value)):
+            if (self.has_empty_header()):
+                raise Exception("add_const: empty header tsv with expression: {}".format(value))
+            dmsg = utils.extend_inherit_message(dmsg, "add_const")
+            return self.__add_expr_col__(value, col, dmsg = dmsg)
+
         # check empty
         if (self.has_empty_header()):
             # checking empty value
@@ -2235,12 +2253,7 @@ class DataFrame:
         new_data_fields = []
 
         # iterate and add
-        counter = 0
-        for fields in self.data_fields:
-            # report progress
-            counter = counter + 1
-            utils.report_progress("[1/1] calling function", dmsg, counter, self.num_rows())
-
+        for fields in instrumentation.track(self.data_fields, "[1/1] calling function", dmsg):
             # create new fields 
             new_fields = fields + empty_row_fields
             new_data_fields.append(new_fields)
@@ -2589,12 +2602,7 @@ class DataFrame:
 
         # create variables for data
         new_data_fields = []
-        counter = 0
-        for fields in self.data_fields:
-            # report progress
-            counter = counter + 1
-            utils.report_progress("sample: [1/1] calling function", dmsg, counter, self.num_rows())
-
+        for fields in instrumentation.track(self.data_fields, "sample: [1/1] calling function", dmsg):
             # this random number is only for basic sampling and not for doing anything sensitive.
             if (random.random() <= sampling_ratio):  # nosec
                 new_data_fields.append(fields)
@@ -2745,12 +2753,7 @@ class DataFrame:
 
         # resample
         new_data_fields = []
-        counter = 0
-        for fields in self.data_fields:
-            # report progress
-            counter = counter + 1
-            utils.report_progress("sample_class: [1/1] calling function", dmsg, counter, self.num_rows())
-
+        for fields in instrumentation.track(self.data_fields, "sample_class: [1/1] calling function", dmsg):
             # get fields
             cv = fields[self.header_map[col]]
 
@@ -2996,12 +2999,7 @@ class DataFrame:
 
         # create new data
         new_data_fields = []
-        counter = 0
-        for fields in self.data_fields:
-            # report progress
-            counter = counter + 1
-            utils.report_progress("sample_group_by_key: [1/1] calling function", dmsg, counter, self.num_rows())
-
+        for fields in instrumentation.track(self.data_fields, "sample_group_by_key: [1/1] calling function", dmsg):
             # generate keys
             keys = []
             for g in grouping_cols:
@@ -3111,13 +3109,17 @@ class DataFrame:
         utils.warn("Use the other methods: inner_join, left_join, right_join, outer_join versions of this api and not this one directly")
         return self.__join__(*args, **kwargs)
 
-    # primary join method. Use the other inner, left, right versions and not this directly. TODO: not efficient
+    # primary join method. Use the other inner, left, right versions and not this directly. Uses sort merge join if both sides are
+    # already sorted on the join keys, else a hash join where the hash table is built on the smaller side
     def __join__(self, that, lkeys, rkeys = None, join_type = "inner", lsuffix = None, rsuffix = None, default_val = "", def_val_map = None, num_par = 0, dmsg = ""):
         dmsg = utils.extend_inherit_message(dmsg, "__join__")
 
-        utils.warn_once("{}: this method is not fully tested and also is very inefficient. Dont use for more than 10000 rows data".format(dmsg))
         utils.warn_once("{}: split_threshold parameter is replaced with num_par".format(dmsg))
 
+        # validation
+        if (join_type not in ("inner", "left", "left_outer", "right", "right_outer", "outer", "full_outer")):
+            raise Exception("Unknown join type: {}".format(join_type))
+
         # matching
         lkeys = self.__get_matching_cols__(lkeys)
         rkeys = that.__get_matching_cols__(rkeys) if (rkeys is not None) else that.__get_matching_cols__(lkeys)
@@ -3177,79 +3179,13 @@ class DataFrame:
             # merge
             return merge(results)
 
-        # create a hashmap of left key values
-        lvkeys = {}
-        counter = 0
-        for fields in self.data_fields:
-            # report progress
-            counter = counter + 1
-            utils.report_progress("[1/3] building map for left side", dmsg, counter, self.num_rows())
-
-            # parse data
-            lvals1 = list([fields[i] for i in lkey_indexes])
-            lvals2 = list([fields[i] for i in lvalue_indexes])
-
-            # generate hash key
-            lvals1_str = "\t".join(lvals1)
-
-            # left side values need to be unique
-            if (lvals1_str in lvkeys.keys()):
-                utils.trace("left side values are not unique: lvals1: {}, lvals2: {}, lvkeys[lvals1_str]: {}".format(lvals1, lvals2, lvkeys[lvals1_str]))
-
-            # check if the key already exists, else create an array
-            if (lvals1_str not in lvkeys.keys()):
-                lvkeys[lvals1_str] = []
-
-            # append the value
-            lvkeys[lvals1_str].append(lvals2)
-
-        # create a hashmap of right key values
-        rvkeys = {}
-        counter = 0
-        for fields in that.get_data_fields():
-            # report progress
-            counter = counter + 1
-            utils.report_progress("[2/3] building map for right side", dmsg, counter, len(that.get_data_fields()))
-
-            # parse data
-            rvals1 = list([fields[i] for i in rkey_indexes])
-            rvals2 = list([fields[i] for i in rvalue_indexes])
-
-            # generate hash key
-            rvals1_str = "\t".join(rvals1)
-
-            # right side values are not unique
-            if (rvals1_str in rvkeys.keys()):
-                utils.trace("right side values are not unique")
-
-            # check if the key already exists, else create an array
-            if (rvals1_str not in rvkeys.keys()):
-                rvkeys[rvals1_str] = []
-
-            # append the value
-            rvkeys[rvals1_str].append(rvals2)
-
-        # create a map of combined keys
-        common_keys = {}
-        for lvkey in lvkeys.keys():
-            if (lvkey in rvkeys.keys()):
-                common_keys[lvkey] = 1
-
         # for each type of join, merge the values
         new_header_fields = []
-        new_header_copy_fields_map = {} 
 
         # create the keys
         for lkey in lkeys:
             new_header_fields.append(lkey)
 
-        # print message for rkeys that are ignored
-        for rkey_index in range(len(rkeys)):
-            rkey = rkeys[rkey_index]
-            if (rkey not in new_header_fields):
-                utils.debug_once("rkey has a different name: {}".format(rkey))
-                new_header_copy_fields_map[lkeys[rkey_index]] = rkey
-
         # add the left side columns
         for i in range(len(self.header_fields)):
             if (self.header_fields[i] not in lkeys):
@@ -3269,9 +3205,15 @@ class DataFrame:
                     else:
                         raise Exception("Duplicate key names found. Use lsuffix or rsuffix: {}".format(that.get_header_fields()[i]))
 
-        new_header_fields.append("__join_keys_matched__")
-        # construct new_header
-        new_header = "\t".join(new_header_fields)
+        # rkeys with a different name are added as new columns with the key values from the right side
+        rkey_copy_positions = []
+        for rkey_index in range(len(rkeys)):
+            if (rkeys[rkey_index] not in lkeys):
+                utils.debug_once("rkey has a different name: {}".format(rkeys[rkey_index]))
+                rkey_copy_positions.append(rkey_index)
+                if (rkeys[rkey_index] in new_header_fields):
+                    raise Exception("New column: {} already exists in {}".format(rkeys[rkey_index], str(new_header_fields)))
+                new_header_fields.append(rkeys[rkey_index])
 
         # define the default lvalues
         default_lvals = []
@@ -3291,83 +3233,137 @@ class DataFrame:
                 else:
                     default_rvals.append(default_val)
 
-        # generate output by doing join
-        new_data_fields = []
-
-        # iterate over left side
-        counter = 0
-        for lvkey in lvkeys.keys():
-            # report progress
-            counter = counter + 1
-            utils.report_progress("[3/3] join the two groups", dmsg, counter, self.num_rows())
-
-            # get the values
-            lvals2_arr = lvkeys[lvkey]
-            rvals2_arr = [default_rvals]
-            keys_matched = 0
-            if (lvkey in rvkeys.keys()):
-                  rvals2_arr = rvkeys[lvkey]
-                  keys_matched = 1
+        # flags for the unmatched rows to be included
+        include_left_unmatched = join_type in ("left", "left_outer", "outer", "full_outer")
+        include_right_unmatched = join_type in ("right", "right_outer", "outer", "full_outer")
 
-            # do a MxN merge of left side values and right side values
-            for lvals2 in lvals2_arr:
-                for rvals2 in rvals2_arr:
-                    # construct the new line
-                    new_fields = utils.merge_arrays([[lvkey], lvals2, rvals2, [str(keys_matched)]])
-
-                    # take care of different join types
-                    if (join_type == "inner"):
-                        if (lvkey in common_keys.keys()):
-                            new_data_fields.append(new_fields)
-                    elif (join_type == "left_outer" or join_type == "left"):
-                            new_data_fields.append(new_fields)
-                    elif (join_type == "right_outer" or join_type == "right"):
-                        if (lvkey in common_keys.keys()):
-                            new_data_fields.append(new_fields)
-                    elif (join_type == "full_outer" or join_type == "outer"):
-                        new_data_fields.append(new_fields)
-                    else:
-                        raise Exception("Unknown join type: {} ".format(join_type))
-
-        # iterate over right side
-        for rvkey in rvkeys.keys():
-            # get the values
-            rvals2_arr = rvkeys[rvkey]
-            lvals2_arr = [default_lvals]
-            if (rvkey in lvkeys.keys()):
-                lvals2_arr = lvkeys[rvkey]
-
-            # MxN loop for multiple rows on left and right side
-            for lvals2 in lvals2_arr:
-                for rvals2 in rvals2_arr:
-                    # construct the new line
-                    new_line = "\t".join(utils.merge_arrays([[rvkey], lvals2, rvals2, [str(keys_matched)]]))
-
-                    # take care of different join types
-                    if (join_type == "inner"):
-                        pass
-                    elif (join_type == "left_outer" or join_type == "left"):
-                        pass
-                    elif (join_type == "right_outer" or join_type == "right"):
-                        if (rvkey not in common_keys.keys()):
-                            new_data_fields.append(new_fields)
-                    elif (join_type == "full_outer" or join_type == "outer"):
-                        if (rvkey not in common_keys.keys()):
-                            new_data_fields.append(new_fields)
-                    else:
-                        raise Exception("Unknown join type: {}".format(join_type))
+        # empty values for the rkey copy columns when the right side is missing
+        default_rkey_copy_vals = list(["" for i in rkey_copy_positions])
 
-        # return
-        result = DataFrame(new_header_fields, new_data_fields)
-        for lkey in new_header_copy_fields_map.keys():
-            result = result.transform([lkey, "__join_keys_matched__"], lambda t1, t2: t1 if (t2 == "1") else "", new_header_copy_fields_map[lkey], dmsg = dmsg)
-            
-        # remove the temporary column
-        result = result \
-            .drop_cols("__join_keys_matched__", dmsg = dmsg)
+        # generate output by doing join. All the strategies give the same order: the left rows in their order, each
+        # with the matching right rows in their order, and then the unmatched right rows in their order
+        new_data_fields = []
+        right_unmatched_data_fields = []
+        ldata_fields = self.data_fields
+        rdata_fields = that.get_data_fields()
+
+        # check if sort merge join can be used
+        if (__is_sorted_on_keys__(ldata_fields, lkey_indexes) == True and __is_sorted_on_keys__(rdata_fields, rkey_indexes) == True):
+            utils.debug("{}: both sides are sorted on keys. Using sort merge join".format(dmsg))
+
+            # iterate over both sides together. The keys are computed only for the current rows
+            i = 0
+            j = 0
+            lkey = __get_row_key__(ldata_fields, i, lkey_indexes)
+            rkey = __get_row_key__(rdata_fields, j, rkey_indexes)
+            while (lkey is not None or rkey is not None):
+                # unmatched left side
+                if (rkey is None or (lkey is not None and lkey < rkey)):
+                    if (include_left_unmatched == True):
+                        lvals2 = list([ldata_fields[i][k] for k in lvalue_indexes])
+                        new_data_fields.append(list(lkey) + lvals2 + default_rvals + default_rkey_copy_vals)
+                    i = i + 1
+                    lkey = __get_row_key__(ldata_fields, i, lkey_indexes)
+                # unmatched right side
+                elif (lkey is None or rkey < lkey):
+                    if (include_right_unmatched == True):
+                        rvals2 = list([rdata_fields[j][k] for k in rvalue_indexes])
+                        right_unmatched_data_fields.append(list(rkey) + default_lvals + rvals2 + list([rkey[k] for k in rkey_copy_positions]))
+                    j = j + 1
+                    rkey = __get_row_key__(rdata_fields, j, rkey_indexes)
+                # find the block of rows with the same key on both sides and do MxN merge
+                else:
+                    key = lkey
+                    rvals2_arr = []
+                    while (rkey is not None and rkey == key):
+                        rvals2_arr.append(list([rdata_fields[j][k] for k in rvalue_indexes]))
+                        j = j + 1
+                        rkey = __get_row_key__(rdata_fields, j, rkey_indexes)
+
+                    # MxN
+                    rkey_copy_vals = list([key[k] for k in rkey_copy_positions])
+                    while (lkey is not None and lkey == key):
+                        lvals2 = list([ldata_fields[i][k] for k in lvalue_indexes])
+                        for rvals2 in rvals2_arr:
+                            new_data_fields.append(list(key) + lvals2 + rvals2 + rkey_copy_vals)
+                        i = i + 1
+                        lkey = __get_row_key__(ldata_fields, i, lkey_indexes)
+        # build the hash table on the right side and probe with the left side
+        elif (that.num_rows() <= self.num_rows()):
+            utils.debug("{}: using hash join with right side as build side".format(dmsg))
+
+            # create a hashmap of right key values
+            rvkeys = {}
+            for fields in rdata_fields:
+                rvkeys.setdefault(tuple([fields[i] for i in rkey_indexes]), []).append(list([fields[i] for i in rvalue_indexes]))
+
+            # probe
+            matched_keys = {}
+            for fields in instrumentation.track(ldata_fields, "[1/1] probing hash table", dmsg):
+                # get the key and values
+                key = tuple([fields[i] for i in lkey_indexes])
+                lvals2 = list([fields[i] for i in lvalue_indexes])
+
+                # lookup
+                rvals2_arr = rvkeys.get(key)
+                if (rvals2_arr is not None):
+                    matched_keys[key] = 1
+                    rkey_copy_vals = list([key[k] for k in rkey_copy_positions])
+                    for rvals2 in rvals2_arr:
+                        new_data_fields.append(list(key) + lvals2 + rvals2 + rkey_copy_vals)
+                elif (include_left_unmatched == True):
+                    new_data_fields.append(list(key) + lvals2 + default_rvals + default_rkey_copy_vals)
+
+            # unmatched right side
+            if (include_right_unmatched == True):
+                for fields in rdata_fields:
+                    key = tuple([fields[i] for i in rkey_indexes])
+                    if (key not in matched_keys.keys()):
+                        rvals2 = list([fields[i] for i in rvalue_indexes])
+                        right_unmatched_data_fields.append(list(key) + default_lvals + rvals2 + list([key[k] for k in rkey_copy_positions]))
+        # build the hash table on the left side and probe with the right side
+        else:
+            utils.debug("{}: using hash join with left side as build side".format(dmsg))
+
+            # create a hashmap of left key to the left row positions
+            lvkeys = {}
+            for i in range(len(ldata_fields)):
+                lvkeys.setdefault(tuple([ldata_fields[i][k] for k in lkey_indexes]), []).append(i)
+
+            # probe. The matching right values are collected for each left row so that the output is in the left order
+            lmatches = [None] * len(ldata_fields)
+            for fields in instrumentation.track(rdata_fields, "[1/1] probing hash table", dmsg):
+                # get the key and values
+                key = tuple([fields[i] for i in rkey_indexes])
+                rvals2 = list([fields[i] for i in rvalue_indexes])
+
+                # lookup
+                lpositions = lvkeys.get(key)
+                if (lpositions is not None):
+                    for i in lpositions:
+                        if (lmatches[i] is None):
+                            lmatches[i] = []
+                        lmatches[i].append(rvals2)
+                elif (include_right_unmatched == True):
+                    right_unmatched_data_fields.append(list(key) + default_lvals + rvals2 + list([key[k] for k in rkey_copy_positions]))
+
+            # left side in order
+            for i in range(len(ldata_fields)):
+                fields = ldata_fields[i]
+                key = tuple([fields[k] for k in lkey_indexes])
+                lvals2 = list([fields[k] for k in lvalue_indexes])
+                if (lmatches[i] is not None):
+                    rkey_copy_vals = list([key[k] for k in rkey_copy_positions])
+                    for rvals2 in lmatches[i]:
+                        new_data_fields.append(list(key) + lvals2 + rvals2 + rkey_copy_vals)
+                elif (include_left_unmatched == True):
+                    new_data_fields.append(list(key) + lvals2 + default_rvals + default_rkey_copy_vals)
+
+        # unmatched right side at the end
+        new_data_fields.extend(right_unmatched_data_fields)
 
         # return
-        return result 
+        return DataFrame(new_header_fields, new_data_fields)
 
     # method to do map join. The right side is stored in a hashmap. only applicable to inner joins
     def natural_join(self, that, dmsg = ""):
@@ -3418,12 +3414,7 @@ class DataFrame:
 
         # iterate through left side and add new values using the hash_map
         new_data_fields = []
-        counter = 0
-        for fields in self.data_fields:
-            # report progress
-            counter = counter + 1
-            utils.report_progress("natural_join: [1/1] adding values from hashmap", dmsg, counter, self.num_rows())
-
+        for fields in instrumentation.track(self.data_fields, "natural_join: [1/1] adding values from hashmap", dmsg):
             # get the key and value
             lvalues_k = []
             lvalues_v = []
@@ -3525,14 +3516,10 @@ class DataFrame:
             # merge
             return merge(results)
 
-        # create a hashmap of right key values
+        # use the hash index of the right side if available, else create a hashmap of right key values
+        rindex = that.__get_index__(rkeys)
         rvkeys = {}
-        counter = 0
-        for fields in that.get_data_fields():
-            # report progress
-            counter = counter + 1
-            utils.report_progress("__map_join__: building map for right side", dmsg, counter, len(that.get_data_fields()))
-
+        for fields in instrumentation.track(that.get_data_fields() if (rindex is None) else [], "__map_join__: building map for right side", dmsg):
             # parse data
             rvals1 = list([fields[i] for i in rkey_indexes]) 
             rvals2 = list([fields[i] for i in rvalue_indexes])
@@ -3601,12 +3588,7 @@ class DataFrame:
         new_data_fields = []
 
         # iterate over left side
-        counter = 0
-        for fields in self.data_fields:
-            # report progress
-            counter = counter + 1
-            utils.report_progress("__map_join__: join the two groups", dmsg, counter, self.num_rows())
-
+        for fields in instrumentation.track(self.data_fields, "__map_join__: join the two groups", dmsg):
             # generate left side key and values
             lvals1 = list([fields[i] for i in lkey_indexes])
             lvals2 = list([fields[i] for i in lvalue_indexes])
@@ -3615,7 +3597,13 @@ class DataFrame:
             # get ride side values
             rvals2_arr = [default_rvals]
             keys_matched = 0
-            if (lvkey in rvkeys.keys()):
+            if (rindex is not None):
+                rrow_ids = rindex.lookup(lvals1[0] if (len(lvals1) == 1) else tuple(lvals1))
+                if (len(rrow_ids) > 0):
+                    rdata_fields = that.get_data_fields()
+                    rvals2_arr = list([list([rdata_fields[j][i] for i in rvalue_indexes]) for j in rrow_ids.tolist()])
+                    keys_matched = 1
+            elif (lvkey in rvkeys.keys()):
                   rvals2_arr = rvkeys[lvkey]
                   keys_matched = 1
 
@@ -3626,7 +3614,7 @@ class DataFrame:
 
                 # take care of different join types
                 if (join_type == "inner"):
-                    if (lvkey in rvkeys):
+                    if (keys_matched == 1):
                         new_data_fields.append(new_fields)
                 elif (join_type == "left_outer" or join_type == "left"):
                     new_data_fields.append(new_fields)
@@ -3695,12 +3683,7 @@ class DataFrame:
             data_list.append([])
 
         # iterate to split data
-        counter = 0
-        for i in range(self.num_rows()):
-            # report progress
-            counter = counter + 1
-            utils.report_progress("__split_batches_randomly__: [1/1] assigning batch index", dmsg, counter, self.num_rows())
-
+        for i in instrumentation.track(range(self.num_rows()), "__split_batches_randomly__: [1/1] assigning batch index", dmsg):
             # check if original order of data needs to be preserved
             if (preserve_order == True):
                 batch_index = int(i / batch_size)
@@ -3752,12 +3735,7 @@ class DataFrame:
 
         # assign each record to its correct place
         batch_index = hashed_tsv2.get_col_index(temp_col2)
-        counter = 0
-        for fields in hashed_tsv2.get_data_fields():
-            # report progress
-            counter = counter + 1
-            utils.report_progress("__split_batches_by_cols__: [1/1] assigning batch index", dmsg, counter, len(hashed_tsv2.get_data_fields()))
-
+        for fields in instrumentation.track(hashed_tsv2.get_data_fields(), "__split_batches_by_cols__: [1/1] assigning batch index", dmsg):
             batch_id = int(fields[batch_index])
             new_data_fields_list[batch_id].append(fields)
 
@@ -3904,12 +3882,7 @@ class DataFrame:
 
         # iterate
         exploded_values = []
-        counter = 0
-        for fields in self.data_fields:
-            # report progress
-            counter = counter + 1
-            utils.report_progress("[1/2] calling explode function", dmsg, counter, self.num_rows())
-
+        for fields in instrumentation.track(self.data_fields, "[1/2] calling explode function", dmsg):
             # process data
             col_values_map = {}
             for i in indexes:
@@ -3962,12 +3935,7 @@ class DataFrame:
         # iterate and generate new data
         utils.print_code_todo_warning("explode: Verify this logic is not breaking anything. check TODO")
 
-        counter = 0
-        for i in range(self.num_rows()):
-            # report progress
-            counter = counter + 1
-            utils.report_progress("[2/2] generating data", dmsg, counter, self.num_rows())
-
+        for i in instrumentation.track(range(self.num_rows()), "[2/2] generating data", dmsg):
             # process data
             fields = self.data_fields[i]
 
@@ -4383,6 +4351,14 @@ class DataFrame:
             transpose_col_groups = transpose_col_groups, merge_list_method = merge_list_method, url_encoded_cols = url_encoded_cols, nested_cols = nested_cols,
             collapse_primitive_list = collapse_primitive_list, custom_map_parsing_funcs = custom_map_parsing_funcs, max_results = max_results, dmsg = dmsg)
 
+        # fast path for the default parameters that flattens each value in a single pass
+        if (accepted_cols is None and excluded_cols is None and single_value_list_cols is None and transpose_col_groups is None and merge_list_method == "join" and
+            url_encoded_cols is None and nested_cols is None and (custom_map_parsing_funcs is None or len(custom_map_parsing_funcs) == 0) and max_results is None):
+            result = json_flatten.explode_json_rows(self.header_fields, self.data_fields, col, prefix, exp_func, default_val, collapse, collapse_primitive_list, dmsg = dmsg)
+            if (result is not None):
+                new_header_fields, new_data_fields = result
+                return DataFrame(new_header_fields, new_data_fields)
+
         # warn
         utils.warn_once("{}: validate is called".format(dmsg))
 
@@ -4566,13 +4542,8 @@ class DataFrame:
         result = []
 
         # progress counters
-        counter = 0
         dmsg = utils.extend_inherit_message(dmsg, "to_tuples")
-        for fields in self.select(cols, dmsg = dmsg).get_data_fields():
-            # report progress
-            counter = counter + 1
-            utils.report_progress("to_tuples: [1/1] converting to tuples", dmsg, counter, self.num_rows())
-
+        for fields in instrumentation.track(self.select(cols, dmsg = dmsg).get_data_fields(), "to_tuples: [1/1] converting to tuples", dmsg):
             # append
             result.append(self.__expand_to_tuple__(fields))
 
@@ -4621,12 +4592,12 @@ class DataFrame:
 
     # calls class that inherits TSV
     def extend_class(self, newclass, *args, **kwargs):
-        return newclass(self.header, self.data, *args, **kwargs)
+        return newclass(self.header_fields, self.data_fields, *args, **kwargs)
 
     # calls class that inherits TSV. TODO: forgot the purpose
     def extend_external_class(self, newclass, *args, **kwargs):
         utils.warn("extend_external_class: not sure the purpose of this method now. use extend_class instead")
-        return newclass(self.header, self.data, *args, **kwargs)
+        return newclass(self.header_fields, self.data_fields, *args, **kwargs)
 
     # custom function to call user defined apis
     def custom_func(self, func, *args, **kwargs):
@@ -4698,7 +4669,7 @@ class DataFrame:
 
     # TODO: confusing name. is_empty can also imply no data
     def is_empty(self):
-        return self.get_header() == ""
+        return self.has_empty_header()
 
     def has_empty_header(self):
         return self.num_cols() == 0
@@ -4762,36 +4733,254 @@ class DataFrame:
         return self
 
     def __has_all_int_values__(self, col):
-        # check for empty
-        if (self.num_rows() == 0):
-            return False
+        return self.get_col_stats(col).is_int()
 
-        # TODO: is there a better way to call is numeric
-        try:
-            for v in self.col_as_array(col):
-                if (utils.isnumeric(v) == False):
-                    return False
-        except:
-            return False
+    def __has_all_float_values__(self, col):
+        return self.get_col_stats(col).is_numeric()
+
+    # returns the ColumnStats with inferred type, min, max, empty and distinct count. Computed once per column and
+    # carried over by the operations that preserve the column like select, rename, drop_cols and sort
+    def get_col_stats(self, col, dmsg = ""):
+        dmsg = utils.extend_inherit_message(dmsg, "get_col_stats")
+
+        # validation
+        if (col not in self.header_map.keys()):
+            raise Exception("{}: column not found: {}, {}".format(dmsg, col, self.header_fields))
+
+        # compute if not cached
+        if (col not in self.col_stats_cache.keys()):
+            self.col_stats_cache[col] = column_stats.compute_col_stats(self.num_rows(), lambda value_type: self.__get_parsed_col__(col, value_type))
+            utils.trace("{}: col: {}, stats: {}".format(dmsg, col, self.col_stats_cache[col]))
 
         # return
-        return True
+        return self.col_stats_cache[col]
 
-    def __has_all_float_values__(self, col):
-        # check for empty
+    # builds a hash index from the values of the columns to the row positions. The index is used by eq, eq_str, values_in,
+    # values_not_in, filter on equality expressions, cols_as_map and by __map_join__ on the right side. The dataframes
+    # derived from this one dont have the index, except the ones with the same rows like select and rename
+    def create_index(self, col_or_cols, dmsg = ""):
+        dmsg = utils.extend_inherit_message(dmsg, "create_index")
+
+        # check empty
+        if (self.has_empty_header()):
+            raise Exception("{}: empty header tsv".format(dmsg))
+
+        # resolve columns
+        cols = self.__get_matching_cols__(col_or_cols)
+        if (len(cols) == 0):
+            raise Exception("{}: no matching cols: {}".format(dmsg, col_or_cols))
+
+        # single column reuses the dictionary encoding of the column
+        if (len(cols) == 1):
+            (codes, keys) = self.__get_parsed_col__(cols[0], "str")
+        else:
+            indexes = self.__get_col_indexes__(cols)
+            (codes, keys) = columnar.encode_dictionary(list([tuple([fields[i] for i in indexes]) for fields in self.data_fields]))
+
+        # create index
+        index = hash_index.from_codes(cols, codes, keys)
+        self.__set_index__(index)
+        utils.debug("{}: {}".format(dmsg, index))
+
+        # return
+        return self
+
+    # returns the hash index on exactly these columns, or None
+    def get_index(self, col_or_cols):
+        return self.__get_index__(col_or_cols)
+
+    def has_index(self, col_or_cols):
+        return self.__get_index__(col_or_cols) is not None
+
+    def get_indexes(self):
+        return list(self.indexes.values())
+
+    def drop_indexes(self):
+        self.indexes = {}
+        return self
+
+    def __get_index__(self, col_or_cols):
+        index = self.indexes.get(tuple([col_or_cols] if (isinstance(col_or_cols, str)) else col_or_cols))
+
+        # the index is invalid if the rows were changed in place
+        if (index is not None and index.num_rows != self.num_rows()):
+            utils.warn("__get_index__: number of rows changed after creating the index. Dropping the index: {}".format(index.cols))
+            del self.indexes[tuple(index.cols)]
+            return None
+
+        # return
+        return index
+
+    # drops the parsed columns, stats and hash indexes when the rows are changed in place
+    def __clear_caches__(self):
+        self.parsed_cols_cache = {}
+        self.col_stats_cache = {}
+        self.indexes = {}
+
+    # copies the cached stats of the columns in col_map (old name -> new name) to new_df. The parsed columns are
+    # copied only if the rows are in the same order
+    def __carry_col_stats__(self, new_df, col_map, same_rows):
+        for col, new_col in col_map.items():
+            if (col in self.col_stats_cache.keys()):
+                new_df.col_stats_cache[new_col] = self.col_stats_cache[col]
+
+        # parsed columns and hash indexes
+        if (same_rows == True):
+            for (col, value_type), parsed in self.parsed_cols_cache.items():
+                if (col in col_map.keys()):
+                    new_df.parsed_cols_cache[(col_map[col], value_type)] = parsed
+            for index in list(self.indexes.values()):
+                if (all([col in col_map.keys() for col in index.cols])):
+                    new_df.__set_index__(hash_index.HashIndex(list([col_map[col] for col in index.cols]), index.keys, index.offsets, index.row_ids, index.num_rows))
+
+        # return
+        return new_df
+
+    # returns the column parsed as a numpy array of the given value_type: int, float or str. For str, the column
+    # is dictionary encoded into (codes, dictionary). Returns None if the values can not be parsed. Cached per column
+    def __get_parsed_col__(self, col, value_type):
+        # check cache
+        cache_key = (col, value_type)
+        if (cache_key in self.parsed_cols_cache.keys()):
+            return self.parsed_cols_cache[cache_key]
+
+        # columnar data is already parsed
+        parsed = None
+        if (self.is_columnar() == True):
+            column = self.get_columnar_column(col)
+            if (value_type == "str" and column.col_type == columnar.COL_TYPE_STR):
+                parsed = (column.values, column.dictionary)
+            elif (value_type == "float" and column.is_numeric() == True):
+                parsed = column.values.astype(np.float64)
+            elif (value_type == "int" and column.col_type == columnar.COL_TYPE_INT):
+                parsed = column.values
+
+        # parse the string values
+        if (parsed is None):
+            values = rowview.get_col_values(self.data_fields, self.header_map[col])
+            if (value_type == "str"):
+                parsed = columnar.encode_dictionary(values)
+            else:
+                try:
+                    parsed = np.fromiter(map(int if (value_type == "int") else float, values), dtype = np.int64 if (value_type == "int") else np.float64, count = len(values))
+                except (ValueError, OverflowError, TypeError):
+                    parsed = None
+
+        # update cache
+        self.parsed_cols_cache[cache_key] = parsed
+
+        # return
+        return parsed
+
+    # returns new dataframe with the string values of the expression as new column
+    def __add_expr_col__(self, expr, new_col, dmsg = ""):
+        dmsg = utils.extend_inherit_message(dmsg, "__add_expr_col__")
+
+        # validation
+        if (new_col in self.header_map.keys()):
+            raise Exception("New column: {} already exists in {}".format(new_col, str(self.header_fields)))
+
+        # create new header
+        new_header_fields = utils.merge_arrays([self.header_fields, [new_col]])
+
+        # check for no data
         if (self.num_rows() == 0):
-            return False
+            return DataFrame(new_header_fields, [])
 
-        # TODO: is there a better way to call is numeric
-        try:
-            for v in self.col_as_array(col):
-                if (utils.is_float(v) == False):
-                    return False
-        except:
-            return False
+        # evaluate
+        values = expr.evaluate_strings(self)
+        utils.trace("{}: evaluated: {}".format(dmsg, expr))
+        new_data_fields = list([[*fields, value] for fields, value in zip(self.data_fields, values)])
 
         # return
-        return True
+        return DataFrame(new_header_fields, new_data_fields)
+
+    def __set_index__(self, index):
+        # validation
+        if (index.num_rows != self.num_rows()):
+            raise Exception("__set_index__: number of rows mismatch: {}, {}".format(index.num_rows, self.num_rows()))
+        for col in index.cols:
+            if (col not in self.header_map.keys()):
+                raise Exception("__set_index__: column not found: {}, {}".format(col, self.header_fields))
+
+        # set
+        self.indexes[tuple(index.cols)] = index
+
+    # returns the sorted row positions with any of the values in col using the hash index, or None if there is no index
+    def __lookup_index__(self, col, values):
+        index = self.__get_index__([col]) if (isinstance(col, str)) else None
+        if (index is None):
+            return None
+
+        # return
+        return index.lookup_many(values)
+
+    # returns all rows except the ones at the given positions
+    def __exclude_rows__(self, row_ids):
+        mask = np.ones(self.num_rows(), dtype = bool)
+        mask[row_ids] = False
+        return self.__select_rows_by_mask__(mask)
+
+    # returns the rows where mask is True
+    def __select_rows_by_mask__(self, mask):
+        return self.__take_rows__(np.flatnonzero(mask))
+
+    # returns the rows at the given positions without copying them
+    def __take_rows__(self, indexes):
+        # columnar data only needs the row indexes
+        if (self.is_columnar() == True):
+            indexes = np.asarray(indexes, dtype = np.int64)
+            if (self.data_fields.indexes is not None):
+                indexes = self.data_fields.indexes[indexes]
+            return DataFrame(self.header_fields, columnar.ColumnarRowView(self.data_fields.columns, indexes = indexes))
+
+        # row major data is shared with a view
+        if (isinstance(indexes, np.ndarray)):
+            indexes = indexes.tolist()
+        return DataFrame(self.header_fields, rowview.create_view(self.data_fields, row_indexes = indexes))
+
+    # filter on a single column using a numpy mask. value_type is int, float, float_to_int or str. For numeric types, mask_func takes
+    # the parsed array and returns a boolean array. row_func is the equivalent per row function used when the column can not be parsed.
+    # For str, row_func is called once per distinct value instead
+    def __vectorized_filter__(self, col, value_type, mask_func, row_func, include_cond = True, ignore_if_missing = False, dmsg = ""):
+        dmsg = utils.extend_inherit_message(dmsg, "__vectorized_filter__")
+
+        # use the generic filter for all boundary conditions
+        if (self.has_empty_header() or self.num_rows() == 0):
+            return self.filter([col], row_func, include_cond = include_cond, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+
+        # resolve the column
+        matching_cols = self.__get_matching_cols__([col], ignore_if_missing = ignore_if_missing)
+        if (len(matching_cols) != 1):
+            return self.filter([col], row_func, include_cond = include_cond, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+
+        # parse. int(float(x)) is done as float truncation
+        parsed = self.__get_parsed_col__(matching_cols[0], "float" if (value_type == "float_to_int") else value_type)
+        if (parsed is not None and value_type == "float_to_int"):
+            parsed = np.trunc(parsed) if (np.all(np.isfinite(parsed))) else None
+
+        # fallback if the values are not parseable. the generic filter raises the same error as before
+        if (parsed is None):
+            utils.trace("{}: column can not be parsed as {}: {}".format(dmsg, value_type, col))
+            return self.filter([col], row_func, include_cond = include_cond, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+
+        # create mask
+        if (value_type == "str"):
+            (codes, dictionary) = parsed
+            dict_mask = np.array(list([row_func(v) == include_cond for v in dictionary]), dtype = bool)
+            mask = dict_mask[codes] if (len(dictionary) > 0) else np.zeros(len(codes), dtype = bool)
+        else:
+            mask = mask_func(parsed)
+
+            # validation for values that numpy cant compare with
+            if (isinstance(mask, np.ndarray) == False or mask.shape != parsed.shape):
+                return self.filter([col], row_func, include_cond = include_cond, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+
+            if (include_cond == False):
+                mask = np.logical_not(mask)
+
+        # return
+        return self.__select_rows_by_mask__(mask)
 
     # this is a utility function that takes list of column names that support regular expression.
     # col_or_cols is a special variable that can be either single column name or an array. python
@@ -4929,11 +5118,9 @@ class DataFrame:
         total_sizes = list([0 for c in self.get_columns()])
  
         # data validation
-        counter = 0
-        for fields in self.data_fields:
-            counter = counter + 1
-            utils.report_progress("[1/1] selecting columns", dmsg, counter, self.num_rows())
-            total_sizes[i] = total_sizes[i] + sum([len(f) for f in fields])
+        for fields in instrumentation.track(self.data_fields, "[1/1] selecting columns", dmsg):
+            for i in range(len(fields)):
+                total_sizes[i] = total_sizes[i] + len(fields[i])
 
         # find the max size
         max_value = max(total_sizes)
@@ -5114,7 +5301,7 @@ def get_version():
 def get_func_name(f):
     return f.__name__
 
-def read(path_or_paths, sep = None, do_union = False, def_val_map = None, username = None, password = None, num_par = 0):
+def read(path_or_paths, sep = None, do_union = False, def_val_map = None, username = None, password = None, num_par = 0, cols = None, filter_expr = None):
     # resolve single or multiple paths
     paths = utils.get_argument_as_array(path_or_paths)
 
@@ -5124,14 +5311,23 @@ def read(path_or_paths, sep = None, do_union = False, def_val_map = None, userna
 
     # check if union needs to be done. default is intersect
     if (do_union == False):
-        return tsvutils.read(paths, sep = sep, username = username, password = password, num_par = num_par)
+        return tsvutils.read(paths, sep = sep, username = username, password = password, num_par = num_par, cols = cols, filter_expr = filter_expr)
     else:
         # check if default values are checked explicitly
         if (def_val_map is None):
             def_val_map = {}
 
         # return
-        return tsvutils.read(paths, sep = sep, def_val_map = {}, username = username, password = password, num_par = num_par)
+        return tsvutils.read(paths, sep = sep, def_val_map = {}, username = username, password = password, num_par = num_par, cols = cols, filter_expr = filter_expr)
+
+# lazy version of read. only the columns needed by the method chain are read
+def scan(path_or_paths, sep = None, do_union = False, def_val_map = None, username = None, password = None, num_par = 0):
+    read_params = {"sep": sep, "do_union": do_union, "def_val_map": def_val_map, "username": username, "password": password, "num_par": num_par}
+    return lazy.LazyDataFrame(source_paths = path_or_paths, source_read_params = read_params)
+
+# context manager that records every DataFrame method call inside the block. See profiler.Profiler
+def profile(track_bytes = True, trace_memory = False, folded_stacks_file = None):
+    return profiler.Profiler(track_bytes = track_bytes, trace_memory = trace_memory, folded_stacks_file = folded_stacks_file)
 
 def write(xtsv, path):
     return xtsv.write(path)
@@ -5263,6 +5459,26 @@ def new_with_cols(header_fields, data_fields = []):
 def create_empty():
     return new_with_cols([])
 
+# checks if the list is sorted in increasing order
+# returns the key of the row at the given position, or None if the position is past the end
+def __get_row_key__(data_fields, i, indexes):
+    if (i >= len(data_fields)):
+        return None
+    fields = data_fields[i]
+    return tuple([fields[k] for k in indexes])
+
+# checks if the rows are sorted on the keys. Only the previous key is kept
+def __is_sorted_on_keys__(data_fields, indexes):
+    prev_key = None
+    for fields in data_fields:
+        key = tuple([fields[k] for k in indexes])
+        if (prev_key is not None and key < prev_key):
+            return False
+        prev_key = key
+
+    # return
+    return True
+
 def __is_builtin_func__(func):
     # check type
     if (type(func) in (type(sum), type(math.ceil))):
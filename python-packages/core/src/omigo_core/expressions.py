@@ -0,0 +1,395 @@
+"""Column expressions that are evaluated a column at a time using numpy.
+
+    from omigo_core.expressions import col
+    xdf.filter((col("bytes").to_float() > 1e6) & col("host").startswith("ip-"))
+
+A column is read as a dictionary encoded array of strings, and the string functions and comparisons are applied once
+per distinct value. Conversions like to_float use the parsed column cache of the DataFrame. Note that & | ~ bind
+tighter than the comparison operators in python, so the comparisons need to be in parentheses. The columns used by an
+expression are available with get_cols() so that readers can read only those columns before applying the filter"""
+import numpy as np
+
+class __Encoded__:
+    """Array represented as codes into an array of distinct values"""
+
+    def __init__(self, codes, values):
+        self.codes = codes
+        self.values = values
+
+    def materialize(self):
+        return self.values[self.codes]
+
+# returns true if the value is a result of evaluation and not a scalar
+def __is_array__(v):
+    return isinstance(v, (np.ndarray, __Encoded__))
+
+def __materialize__(v):
+    return v.materialize() if (isinstance(v, __Encoded__)) else v
+
+# applies func to the evaluated args. When the only arrays are dictionary encoded with the same codes, func is applied to the
+# distinct values only
+def __apply__(func, args):
+    arrays = list([v for v in args if (__is_array__(v))])
+    if (len(arrays) == 0):
+        return func(*args)
+
+    # dictionary encoded
+    if (isinstance(arrays[0], __Encoded__) and all([isinstance(v, __Encoded__) and v.codes is arrays[0].codes for v in arrays])):
+        return __Encoded__(arrays[0].codes, func(*list([v.values if (isinstance(v, __Encoded__)) else v for v in args])))
+
+    # return
+    return func(*list([__materialize__(v) for v in args]))
+
+# calls func on each value of the array
+def __map_values__(func, dtype):
+    def __map_values_inner__(arr):
+        if (__is_array__(arr) == False):
+            return func(arr)
+        return np.array(list([func(v) for v in arr.tolist()]), dtype = dtype)
+
+    return __map_values_inner__
+
+# parses each value of the array. Values that can not be parsed take the default value, or raise exception if default is None
+def __parse_values__(parse_func, dtype, default, name):
+    def __parse_value__(v):
+        try:
+            return parse_func(v)
+        except (ValueError, TypeError, OverflowError):
+            if (default is None):
+                raise Exception("{}: value can not be parsed: {}".format(name, v))
+            return default
+
+    def __parse_values_inner__(arr):
+        if (__is_array__(arr) == False):
+            return __parse_value__(arr)
+
+        # numeric arrays only need a cast
+        if (arr.dtype != object):
+            return arr.astype(dtype)
+
+        return np.array(list([__parse_value__(v) for v in arr.tolist()]), dtype = dtype)
+
+    return __parse_values_inner__
+
+def __to_bool_expr__(v, op):
+    if (isinstance(v, Expr)):
+        return v
+    elif (isinstance(v, bool)):
+        return Lit(v)
+    else:
+        raise Exception("Expr: operator {} needs boolean expressions. Use parentheses around comparisons: {}".format(op, v))
+
+def __to_expr__(v):
+    return v if (isinstance(v, Expr)) else Lit(v)
+
+# the values of a column are strings. A number would never be equal to them and fail with < >, so comparing a column
+# with anything other than a string raises the same error for all the comparisons
+def __check_str_values__(c, values, op):
+    for v in values:
+        if (isinstance(v, str) == False):
+            raise Exception("Expr: {} {} {}: column values are strings. Compare with a string or use to_int() / to_float()".format(repr(c), op, repr(v)))
+
+def __compare__(op, a, b, func):
+    (a, b) = (__to_expr__(a), __to_expr__(b))
+    if (isinstance(a, Col) and isinstance(b, Lit)):
+        __check_str_values__(a, [b.value], op)
+    elif (isinstance(a, Lit) and isinstance(b, Col)):
+        __check_str_values__(b, [a.value], op)
+
+    # return
+    return Func(op, [a, b], func, is_operator = True)
+
+class Expr:
+    """Base class of the column expressions"""
+
+    # returns the evaluated value as a scalar, numpy array or dictionary encoded array
+    def __eval__(self, xdf):
+        raise Exception("Expr: __eval__ not implemented")
+
+    # returns the list of column names used by this expression
+    def get_cols(self):
+        raise Exception("Expr: get_cols not implemented")
+
+    # name used for the output columns
+    def get_name(self):
+        return repr(self)
+
+    # returns numpy array with one value per row
+    def evaluate(self, xdf):
+        result = __materialize__(self.__eval__(xdf))
+        if (isinstance(result, np.ndarray) == False):
+            result = np.array([result] * xdf.num_rows(), dtype = object if (isinstance(result, str)) else None)
+        return result
+
+    # returns the boolean numpy array for filtering
+    def evaluate_mask(self, xdf):
+        result = self.evaluate(xdf)
+        if (result.dtype != bool):
+            if (result.dtype != object or all([isinstance(v, bool) for v in result.tolist()]) == False):
+                raise Exception("Expr: expression is not a condition: {}".format(self))
+            result = result.astype(bool)
+        return result
+
+    # returns the list of string values in the same format as transform
+    def evaluate_strings(self, xdf):
+        result = self.__eval__(xdf)
+
+        # convert each distinct value only once
+        if (isinstance(result, __Encoded__)):
+            strs = list([__to_str__(v) for v in result.values.tolist()])
+            return list([strs[c] for c in result.codes.tolist()])
+
+        # return
+        return list([__to_str__(v) for v in self.evaluate(xdf).tolist()])
+
+    # python boolean operators can not be overloaded
+    def __bool__(self):
+        raise Exception("Expr: can not be used as a boolean. Use & | ~ instead of and, or, not: {}".format(self))
+
+    # comparisons
+    def __eq__(self, that):
+        return __compare__("==", self, that, lambda a, b: a == b)
+
+    def __ne__(self, that):
+        return __compare__("!=", self, that, lambda a, b: a != b)
+
+    def __lt__(self, that):
+        return __compare__("<", self, that, lambda a, b: a < b)
+
+    def __le__(self, that):
+        return __compare__("<=", self, that, lambda a, b: a <= b)
+
+    def __gt__(self, that):
+        return __compare__(">", self, that, lambda a, b: a > b)
+
+    def __ge__(self, that):
+        return __compare__(">=", self, that, lambda a, b: a >= b)
+
+    # arithmetic
+    def __add__(self, that):
+        return Func("+", [self, __to_expr__(that)], lambda a, b: a + b, is_operator = True)
+
+    def __radd__(self, that):
+        return Func("+", [__to_expr__(that), self], lambda a, b: a + b, is_operator = True)
+
+    def __sub__(self, that):
+        return Func("-", [self, __to_expr__(that)], lambda a, b: a - b, is_operator = True)
+
+    def __rsub__(self, that):
+        return Func("-", [__to_expr__(that), self], lambda a, b: a - b, is_operator = True)
+
+    def __mul__(self, that):
+        return Func("*", [self, __to_expr__(that)], lambda a, b: a * b, is_operator = True)
+
+    def __rmul__(self, that):
+        return Func("*", [__to_expr__(that), self], lambda a, b: a * b, is_operator = True)
+
+    def __truediv__(self, that):
+        return Func("/", [self, __to_expr__(that)], lambda a, b: a / b, is_operator = True)
+
+    def __rtruediv__(self, that):
+        return Func("/", [__to_expr__(that), self], lambda a, b: a / b, is_operator = True)
+
+    def __floordiv__(self, that):
+        return Func("//", [self, __to_expr__(that)], lambda a, b: a // b, is_operator = True)
+
+    def __mod__(self, that):
+        return Func("%", [self, __to_expr__(that)], lambda a, b: a % b, is_operator = True)
+
+    def __neg__(self):
+        return Func("neg", [self], lambda a: -a)
+
+    def abs(self):
+        return Func("abs", [self], np.abs)
+
+    # boolean operators
+    def __and__(self, that):
+        return Func("&", [self, __to_bool_expr__(that, "&")], np.logical_and, is_operator = True)
+
+    def __rand__(self, that):
+        return Func("&", [__to_bool_expr__(that, "&"), self], np.logical_and, is_operator = True)
+
+    def __or__(self, that):
+        return Func("|", [self, __to_bool_expr__(that, "|")], np.logical_or, is_operator = True)
+
+    def __ror__(self, that):
+        return Func("|", [__to_bool_expr__(that, "|"), self], np.logical_or, is_operator = True)
+
+    def __invert__(self):
+        return Func("not", [self], np.logical_not)
+
+    # conversions
+    def to_float(self, default = None):
+        return ToNumber("to_float", self, float, np.float64, default)
+
+    def to_int(self, default = None):
+        return ToNumber("to_int", self, int, np.int64, default)
+
+    def to_str(self):
+        return Func("to_str", [self], __map_values__(__to_str__, object))
+
+    # string functions
+    def startswith(self, prefix):
+        return Func("startswith", [self], __map_values__(lambda v: v.startswith(prefix), bool), params = [prefix])
+
+    def endswith(self, suffix):
+        return Func("endswith", [self], __map_values__(lambda v: v.endswith(suffix), bool), params = [suffix])
+
+    def contains(self, sub):
+        return Func("contains", [self], __map_values__(lambda v: sub in v, bool), params = [sub])
+
+    def lower(self):
+        return Func("lower", [self], __map_values__(lambda v: v.lower(), object))
+
+    def upper(self):
+        return Func("upper", [self], __map_values__(lambda v: v.upper(), object))
+
+    def strip(self):
+        return Func("strip", [self], __map_values__(lambda v: v.strip(), object))
+
+    def len(self):
+        return Func("len", [self], __map_values__(len, np.int64))
+
+    def is_empty(self):
+        return Func("is_empty", [self], __map_values__(lambda v: v == "", bool))
+
+    def is_nonempty(self):
+        return Func("is_nonempty", [self], __map_values__(lambda v: v != "", bool))
+
+    def isin(self, values):
+        if (isinstance(self, Col)):
+            __check_str_values__(self, values, "isin")
+        values_set = set(values)
+        return Func("isin", [self], __map_values__(lambda v: v in values_set, bool), params = [sorted(values_set, key = str)])
+
+    # returns the same expression with a different output name
+    def alias(self, name):
+        return Alias(self, name)
+
+class Col(Expr):
+    def __init__(self, name):
+        self.name = name
+
+    def __eval__(self, xdf):
+        if (self.name not in xdf.get_header_fields()):
+            raise Exception("Column not found: {}, header: {}".format(self.name, xdf.get_header_fields()))
+        (codes, dictionary) = xdf.__get_parsed_col__(self.name, "str")
+        return __Encoded__(codes, np.array(dictionary, dtype = object))
+
+    def get_cols(self):
+        return [self.name]
+
+    def get_name(self):
+        return self.name
+
+    def __repr__(self):
+        return "col({})".format(repr(self.name))
+
+class Lit(Expr):
+    def __init__(self, value):
+        self.value = value
+
+    def __eval__(self, xdf):
+        return self.value
+
+    def get_cols(self):
+        return []
+
+    def __repr__(self):
+        return repr(self.value)
+
+class Func(Expr):
+    """Applies func to the evaluated args. params are the constant parameters and are used only for display"""
+
+    def __init__(self, name, args, func, params = None, is_operator = False):
+        self.name = name
+        self.args = args
+        self.func = func
+        self.params = params if (params is not None) else []
+        self.is_operator = is_operator
+
+    def __eval__(self, xdf):
+        return __apply__(self.func, list([arg.__eval__(xdf) for arg in self.args]))
+
+    def get_cols(self):
+        cols = []
+        for arg in self.args:
+            for c in arg.get_cols():
+                if (c not in cols):
+                    cols.append(c)
+
+        # return
+        return cols
+
+    def __repr__(self):
+        if (self.is_operator == True):
+            return "({} {} {})".format(repr(self.args[0]), self.name, repr(self.args[1]))
+        else:
+            return "{}.{}({})".format(repr(self.args[0]), self.name, ", ".join(list([repr(t) for t in self.args[1:] + self.params])))
+
+class ToNumber(Func):
+    """Parses the values as numbers. Columns use the parsed column cache of the DataFrame"""
+
+    def __init__(self, name, arg, parse_func, dtype, default):
+        super().__init__(name, [arg], __parse_values__(parse_func, dtype, default, name), params = [default] if (default is not None) else [])
+        self.dtype = dtype
+
+    def __eval__(self, xdf):
+        if (isinstance(self.args[0], Col) and self.args[0].name in xdf.get_header_fields()):
+            parsed = xdf.__get_parsed_col__(self.args[0].name, "int" if (self.dtype == np.int64) else "float")
+            if (parsed is not None):
+                return parsed
+
+        # return
+        return super().__eval__(xdf)
+
+class Alias(Expr):
+    def __init__(self, expr, name):
+        self.expr = expr
+        self.name = name
+
+    def __eval__(self, xdf):
+        return self.expr.__eval__(xdf)
+
+    def get_cols(self):
+        return self.expr.get_cols()
+
+    def get_name(self):
+        return self.name
+
+    def __repr__(self):
+        return "{}.alias({})".format(repr(self.expr), repr(self.name))
+
+# same string conversion as transform
+def __to_str__(v):
+    return str(v) if (v is not None) else ""
+
+def col(name):
+    return Col(name)
+
+def lit(value):
+    return Lit(value)
+
+def is_expr(v):
+    return isinstance(v, Expr)
+
+# returns (col, values) if the expression is an equality or isin on a column, else None. Used for hash index lookups
+def get_lookup(expr):
+    if (isinstance(expr, Func) == False or isinstance(expr.args[0], (Col, Lit)) == False):
+        return None
+
+    # equality
+    if (expr.name == "=="):
+        (a, b) = expr.args
+        if (isinstance(a, Col) and isinstance(b, Lit)):
+            __check_str_values__(a, [b.value], "==")
+            return (a.name, [b.value])
+        elif (isinstance(a, Lit) and isinstance(b, Col)):
+            __check_str_values__(b, [a.value], "==")
+            return (b.name, [a.value])
+    elif (expr.name == "isin" and isinstance(expr.args[0], Col)):
+        __check_str_values__(expr.args[0], expr.params[0], "isin")
+        return (expr.args[0].name, expr.params[0])
+
+    # return
+    return None
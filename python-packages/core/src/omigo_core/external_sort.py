@@ -0,0 +1,108 @@
+"""External merge sort for data that is read in chunks and does not fit in memory.
+
+Each run of at most max_run_rows rows is sorted in memory with DataFrame.sort and spilled to disk, and the runs are
+merged with heapq.merge using the same ordering. The merged rows are streamed so that only one row per run is kept
+in memory"""
+import heapq
+import math
+import os
+import shutil
+import tempfile
+from omigo_core import utils, dataframe
+
+# returns the sort key function for the row fields. This matches the order of DataFrame.sort: numbers are compared
+# as float with NaN at the end in both directions, and strings are compared as is
+def get_sort_key_func(indexes, all_numeric, reverse):
+    if (all_numeric == True):
+        # with reverse the largest key comes first, so NaN needs the smallest key
+        nan_flag = 0 if (reverse == True) else 1
+        def __numeric_key__(value):
+            value = float(value)
+            if (math.isnan(value)):
+                return (nan_flag, 0.0)
+            return (1 - nan_flag, value)
+
+        return lambda fields: tuple([__numeric_key__(fields[i]) for i in indexes])
+    else:
+        return lambda fields: tuple([str(fields[i]) for i in indexes])
+
+def __write_run__(run_dir, run_index, xdf):
+    run_file = os.path.join(run_dir, "run-{}.tsv".format(run_index))
+    with open(run_file, "w", encoding = "utf-8", newline = "\n") as fh:
+        for fields in xdf.get_data_fields():
+            fh.write("\t".join(fields))
+            fh.write("\n")
+
+    # return
+    return run_file
+
+def __read_run__(run_file):
+    with open(run_file, "r", encoding = "utf-8", newline = "\n") as fh:
+        for line in fh:
+            yield line[0:-1].split("\t")
+
+def __create_chunks__(header_fields, rows, chunk_rows):
+    data_fields = []
+    for fields in rows:
+        data_fields.append(fields)
+        if (len(data_fields) >= chunk_rows):
+            yield dataframe.new_with_cols(header_fields, data_fields = data_fields)
+            data_fields = []
+
+    # last chunk
+    if (len(data_fields) > 0):
+        yield dataframe.new_with_cols(header_fields, data_fields = data_fields)
+
+# generator that sorts the dataframes from chunks, for example hydra.read_chunks, and yields the sorted rows as
+# dataframes of at most chunk_rows rows. all_numeric is not detected as it would need all the data
+def sort_chunks(chunks, cols, reverse = False, all_numeric = False, max_run_rows = None, chunk_rows = 100000, tmp_dir = None, dmsg = ""):
+    dmsg = utils.extend_inherit_message(dmsg, "sort_chunks")
+    max_run_rows = utils.get_sort_max_run_rows() if (max_run_rows is None) else max_run_rows
+    tmp_dir = utils.get_sort_tmp_dir() if (tmp_dir is None) else tmp_dir
+
+    # validation
+    if (max_run_rows <= 0 or chunk_rows <= 0):
+        raise Exception("{}: invalid max_run_rows: {} or chunk_rows: {}".format(dmsg, max_run_rows, chunk_rows))
+
+    # create the directory for the runs lazily
+    run_dir = None
+    try:
+        # create sorted runs
+        run_files = []
+        header_fields = None
+        cur_run = []
+        for xdf in chunks:
+            if (header_fields is None):
+                header_fields = xdf.get_header_fields()
+            elif (xdf.get_header_fields() != header_fields):
+                raise Exception("{}: header mismatch: {}, {}".format(dmsg, header_fields, xdf.get_header_fields()))
+
+            # spill the full runs
+            for fields in xdf.get_data_fields():
+                cur_run.append(list(fields))
+                if (len(cur_run) >= max_run_rows):
+                    if (run_dir is None):
+                        run_dir = tempfile.mkdtemp(prefix = "omigo-sort-", dir = tmp_dir)
+                    run_xdf = dataframe.new_with_cols(header_fields, data_fields = cur_run).sort(cols, reverse = reverse, all_numeric = all_numeric)
+                    run_files.append(__write_run__(run_dir, len(run_files), run_xdf))
+                    cur_run = []
+
+        # check for empty input
+        if (header_fields is None):
+            return
+
+        # the last run is merged from memory
+        last_xdf = dataframe.new_with_cols(header_fields, data_fields = cur_run).sort(cols, reverse = reverse, all_numeric = all_numeric)
+        cur_run = None
+        utils.debug("{}: number of runs: {}, run_dir: {}".format(dmsg, len(run_files) + 1, run_dir))
+
+        # k-way merge. runs are merged in the input order so that the sort is stable
+        indexes = last_xdf.__get_col_indexes__(last_xdf.__get_matching_cols__(cols))
+        key_func = get_sort_key_func(indexes, all_numeric, reverse)
+        runs = list([__read_run__(run_file) for run_file in run_files]) + [iter(last_xdf.get_data_fields())]
+        rows = heapq.merge(*runs, key = key_func, reverse = reverse) if (len(runs) > 1) else runs[0]
+        for xdf in __create_chunks__(header_fields, rows, chunk_rows):
+            yield xdf
+    finally:
+        if (run_dir is not None):
+            shutil.rmtree(run_dir, ignore_errors = True)
@@ -0,0 +1,68 @@
+"""Hash indexes from the values of key columns to the row positions of a DataFrame.
+
+The row positions are grouped by key in a single array, with offsets marking the rows of each key, same as the
+dictionary encoding of a column. The row positions of each key are in increasing order so that the lookups return the
+rows in the same order as a scan. The arrays can be written as blocks of the otsv format and used without copying"""
+import numpy as np
+
+class HashIndex:
+    """Maps each key to the row positions. The key is the value for single column, and tuple of values otherwise"""
+
+    def __init__(self, cols, keys, offsets, row_ids, num_rows):
+        self.cols = list(cols)
+        self.keys = keys
+        self.key_map = dict([(keys[i], i) for i in range(len(keys))])
+        self.offsets = offsets
+        self.row_ids = row_ids
+        self.num_rows = num_rows
+
+    def num_keys(self):
+        return len(self.keys)
+
+    def has_key(self, key):
+        return key in self.key_map
+
+    # returns the row positions for the key
+    def lookup(self, key):
+        i = self.key_map.get(key)
+        if (i is None):
+            return self.row_ids[0:0]
+        return self.row_ids[self.offsets[i]:self.offsets[i + 1]]
+
+    # returns the sorted row positions for any of the keys
+    def lookup_many(self, keys):
+        parts = list([self.lookup(key) for key in set(keys) if (key in self.key_map)])
+        if (len(parts) == 0):
+            return self.row_ids[0:0]
+        elif (len(parts) == 1):
+            return parts[0]
+        else:
+            return np.sort(np.concatenate(parts))
+
+    # returns true if each key has a single row
+    def is_unique(self):
+        return len(self.keys) == self.num_rows
+
+    # returns the key that is repeated first in the row order, or None if the keys are unique
+    def get_first_duplicate_key(self):
+        dup_indexes = np.flatnonzero(np.diff(self.offsets) > 1)
+        if (len(dup_indexes) == 0):
+            return None
+        return self.keys[int(dup_indexes[np.argmin(self.row_ids[self.offsets[dup_indexes] + 1])])]
+
+    # returns the first row position of each key in the order of the keys
+    def get_first_row_ids(self):
+        return self.row_ids[self.offsets[0:-1]]
+
+    def __repr__(self):
+        return "HashIndex: cols: {}, num_keys: {}, num_rows: {}".format(self.cols, len(self.keys), self.num_rows)
+
+# creates the index from the code of each row into the list of distinct keys
+def from_codes(cols, codes, keys):
+    codes = np.asarray(codes, dtype = np.int64)
+    row_ids = np.argsort(codes, kind = "stable").astype(np.int64)
+    offsets = np.zeros(len(keys) + 1, dtype = np.int64)
+    offsets[1:] = np.cumsum(np.bincount(codes, minlength = len(keys)))
+
+    # return
+    return HashIndex(cols, keys, offsets, row_ids, len(codes))
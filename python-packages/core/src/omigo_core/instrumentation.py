@@ -0,0 +1,299 @@
+"""Operator level instrumentation and progress reporting for DataFrame.
+
+The row loops wrap their iterable with track(), which returns the iterable as it is unless progress reporting is
+enabled, so there is no per row cost by default. The progress of the tracked loops is printed by a background
+ticker thread instead of from inside the loop. While there is any CallListener, the public DataFrame methods are
+wrapped to notify the listeners. enable() adds the listener that records the number of calls, rows in, rows out,
+wall time and optionally bytes of each operator. The original methods are restored once the last listener is removed"""
+import functools
+import inspect
+import threading
+import time
+from omigo_core import utils
+
+class OperatorStats:
+    """Aggregated counters of a single DataFrame method. The wall time includes the nested calls"""
+
+    name = None
+    num_calls = None
+    rows_in = None
+    rows_out = None
+    wall_time_sec = None
+    bytes_in = None
+    bytes_out = None
+
+    # constructor
+    def __init__(self, name):
+        self.name = name
+        self.num_calls = 0
+        self.rows_in = 0
+        self.rows_out = 0
+        self.wall_time_sec = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def to_map(self):
+        return {
+            "name": self.name,
+            "num_calls": self.num_calls,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "wall_time_sec": self.wall_time_sec,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out
+        }
+
+class Progress:
+    """Progress of a single tracked loop. counter is updated by the loop and read by the ticker"""
+
+    def __init__(self, msg, total):
+        self.msg = msg
+        self.total = total
+        self.counter = 0
+
+class ProgressTicker(threading.Thread):
+    """Daemon thread that prints the progress of the active loops at fixed interval"""
+
+    def __init__(self):
+        super().__init__(daemon = True)
+
+    def run(self):
+        while True:
+            time.sleep(utils.get_progress_ticker_interval_sec())
+            for progress in list(ACTIVE_PROGRESS.values()):
+                perc = int(100 * progress.counter / progress.total) if (progress.total > 0) else 100
+                utils.debug("{}: {}% ({} / {})".format(progress.msg, perc, progress.counter, progress.total))
+
+# global state
+LOCK = threading.Lock()
+ENABLED = False
+TRACK_BYTES = False
+OPERATOR_STATS = {}
+ORIGINAL_METHODS = {}
+ARG_POSITIONS = {}
+WRAPPED_CLASSES = []
+ACTIVE_PROGRESS = {}
+TICKER = None
+
+# returns the iterable for the row loop. The iterable is returned as it is if progress reporting is disabled
+def track(iterable, msg, dmsg = "", total = None):
+    # find the total
+    if (total is None):
+        total = len(iterable)
+
+    # no per row cost if progress is disabled
+    if (utils.is_report_progress_enabled(total) == False):
+        return iterable
+
+    # return
+    return __track__(iterable, dmsg + ": " + msg if (dmsg is not None and len(dmsg) > 0) else msg, total)
+
+def __track__(iterable, msg, total):
+    global TICKER
+
+    # start the ticker once
+    with LOCK:
+        if (TICKER is None):
+            TICKER = ProgressTicker()
+            TICKER.start()
+
+    # register
+    progress = Progress(msg, total)
+    ACTIVE_PROGRESS[id(progress)] = progress
+
+    # iterate
+    try:
+        for x in iterable:
+            progress.counter = progress.counter + 1
+            yield x
+    finally:
+        ACTIVE_PROGRESS.pop(id(progress), None)
+
+# the accessors that are called internally by every method are not wrapped
+UNWRAPPED_METHODS = ["get_header_fields", "get_data_fields", "get_header_map", "num_rows", "num_cols", "size_in_bytes",
+    "is_columnar", "get_columns", "is_empty", "has_empty_header", "has_col", "get_col_index"]
+
+class CallListener:
+    """Receives the calls of the DataFrame methods while it is added with add_listener(). before_call returns a token
+    that is passed to after_call. result is None if the method raised an exception"""
+
+    def before_call(self, name, xdf, args, kwargs):
+        return None
+
+    def after_call(self, token, result):
+        pass
+
+class OperatorStatsListener(CallListener):
+    def before_call(self, name, xdf, args, kwargs):
+        bytes_in = call_original(xdf, "size_in_bytes") if (TRACK_BYTES == True) else 0
+        return (name, time.time(), call_original(xdf, "num_rows"), bytes_in)
+
+    def after_call(self, token, result):
+        # record only the methods that return a DataFrame
+        (name, ts_start, rows_in, bytes_in) = token
+        if (is_dataframe(result)):
+            bytes_out = call_original(result, "size_in_bytes") if (TRACK_BYTES == True) else 0
+            record_operator(name, rows_in, call_original(result, "num_rows"), time.time() - ts_start, bytes_in = bytes_in, bytes_out = bytes_out)
+
+# global listeners
+LISTENERS = []
+OPERATOR_STATS_LISTENER = OperatorStatsListener()
+
+def is_enabled():
+    return ENABLED
+
+# records the operator stats. track_bytes calls size_in_bytes on input and output
+def enable(track_bytes = False):
+    global ENABLED
+    global TRACK_BYTES
+
+    # set the flags
+    TRACK_BYTES = track_bytes
+    if (ENABLED == True):
+        return
+
+    # add listener
+    add_listener(OPERATOR_STATS_LISTENER)
+    ENABLED = True
+
+def disable():
+    global ENABLED
+
+    # remove listener
+    if (ENABLED == True):
+        remove_listener(OPERATOR_STATS_LISTENER)
+        ENABLED = False
+
+# the DataFrame methods are wrapped only while there is at least one listener
+def add_listener(listener):
+    with LOCK:
+        LISTENERS.append(listener)
+        if (len(LISTENERS) == 1):
+            from omigo_core import dataframe
+            wrap_class(dataframe.DataFrame)
+
+def remove_listener(listener):
+    with LOCK:
+        LISTENERS.remove(listener)
+        if (len(LISTENERS) == 0):
+            __unwrap_all__()
+
+def is_dataframe(x):
+    from omigo_core import dataframe
+    return isinstance(x, dataframe.DataFrame)
+
+# returns the original unbound method, or None if not wrapped
+def __get_original__(xdf, name):
+    for cls in type(xdf).__mro__:
+        if ((cls, name) in ORIGINAL_METHODS.keys()):
+            return ORIGINAL_METHODS[(cls, name)]
+
+    # not wrapped
+    return None
+
+# calls the method bypassing the wrapper
+def call_original(xdf, name, *args, **kwargs):
+    func = __get_original__(xdf, name)
+    if (func is not None):
+        return func(xdf, *args, **kwargs)
+
+    # not wrapped
+    return getattr(xdf, name)(*args, **kwargs)
+
+# returns the value of the named argument of a wrapped method call, passed either by keyword or by position
+def get_call_arg(xdf, name, args, kwargs, arg_name, default = None):
+    if (arg_name in kwargs.keys()):
+        return kwargs[arg_name]
+
+    # find the position of the argument once per method
+    func = __get_original__(xdf, name)
+    if (func is None):
+        return default
+    if ((func, arg_name) not in ARG_POSITIONS.keys()):
+        position = None
+        params = list(inspect.signature(func).parameters.values())[1:]
+        for i in range(len(params)):
+            if (params[i].kind not in (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)):
+                break
+            if (params[i].name == arg_name):
+                position = i
+                break
+        ARG_POSITIONS[(func, arg_name)] = position
+
+    # return
+    position = ARG_POSITIONS[(func, arg_name)]
+    return args[position] if (position is not None and position < len(args)) else default
+
+# wraps the public methods defined in the class. Classes created by extend_class are wrapped when they are first seen
+def wrap_class(cls):
+    if (cls in WRAPPED_CLASSES):
+        return
+
+    # wrap
+    for name, func in list(vars(cls).items()):
+        if (name.startswith("_") == False and name not in UNWRAPPED_METHODS and callable(func)):
+            ORIGINAL_METHODS[(cls, name)] = func
+            setattr(cls, name, __wrap_method__(name, func))
+
+    # add to the list
+    WRAPPED_CLASSES.append(cls)
+
+def __unwrap_all__():
+    for (cls, name), func in ORIGINAL_METHODS.items():
+        setattr(cls, name, func)
+
+    # reset
+    ORIGINAL_METHODS.clear()
+    WRAPPED_CLASSES.clear()
+
+def __wrap_method__(name, func):
+    @functools.wraps(func)
+    def __instrumented__(self, *args, **kwargs):
+        # notify the listeners
+        listeners = list(LISTENERS)
+        tokens = list([t.before_call(name, self, args, kwargs) for t in listeners])
+
+        # call
+        result = None
+        try:
+            result = func(self, *args, **kwargs)
+        finally:
+            for i in reversed(range(len(listeners))):
+                listeners[i].after_call(tokens[i], result)
+
+        # the subclasses from extend_class have their own methods
+        if (len(LISTENERS) > 0 and is_dataframe(result) and type(result) not in WRAPPED_CLASSES):
+            with LOCK:
+                wrap_class(type(result))
+
+        # return
+        return result
+
+    # return
+    return __instrumented__
+
+def record_operator(name, rows_in, rows_out, wall_time_sec, bytes_in = 0, bytes_out = 0):
+    with LOCK:
+        if (name not in OPERATOR_STATS.keys()):
+            OPERATOR_STATS[name] = OperatorStats(name)
+
+        # update
+        stats = OPERATOR_STATS[name]
+        stats.num_calls = stats.num_calls + 1
+        stats.rows_in = stats.rows_in + rows_in
+        stats.rows_out = stats.rows_out + rows_out
+        stats.wall_time_sec = stats.wall_time_sec + wall_time_sec
+        stats.bytes_in = stats.bytes_in + bytes_in
+        stats.bytes_out = stats.bytes_out + bytes_out
+
+# returns the list of maps of operator stats sorted by wall time
+def get_operator_stats():
+    with LOCK:
+        mps = list([t.to_map() for t in OPERATOR_STATS.values()])
+
+    # return
+    return sorted(mps, key = lambda t: t["wall_time_sec"], reverse = True)
+
+def reset():
+    with LOCK:
+        OPERATOR_STATS.clear()
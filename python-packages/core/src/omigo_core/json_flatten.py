@@ -0,0 +1,188 @@
+"""Single pass flattening engine for explode_json.
+
+Most json events are maps of primitive values and nested maps that flatten to exactly one output row. These are
+flattened directly into a map of key path -> value with the same key names and values as the generic explode_json
+transform function. A single list of primitive values at the top level generates one row per value. The sorted key
+paths are learnt from a sample and the output rows are written in the same pass. Events with lists of maps, more than
+one list or top level lists go through the generic transform function"""
+import json
+from omigo_core import utils
+
+# constants
+JSON_EXPLODE_INDEX = "__explode_json_index__"
+JSON_EXPLODE_LEN = "__explode_json_len__"
+SAMPLE_SIZE = 1000
+MIN_SAMPLE_FAST_RATIO = 0.5
+
+# same as utils.replace_spl_white_spaces_with_space
+SPL_WHITE_SPACES_TABLE = str.maketrans({"\t": " ", "\n": " ", "\v": " ", "\r": " "})
+
+# returns the parsed json, or None if the value needs to go through the generic path
+def __parse__(json_str, dmsg):
+    if (json_str.startswith("%7B")):
+        return json.loads(utils.url_decode(json_str))
+    elif (json_str.startswith("{")):
+        utils.warn_once("{}: called with column that is not url encoded json. Assuming plain json string".format(dmsg))
+        return json.loads(json_str)
+    else:
+        return None
+
+# flattens the map into out. Returns False if the map needs the generic path. The primitive values at each level are
+# written before the nested maps as the nested values take precedence. A non empty list of primitive values at the top
+# level is added to lists and generates one row per value
+def __flatten__(json_mp, out, path, lists, collapse_primitive_list):
+    nested = None
+    for k, v in json_mp.items():
+        if (isinstance(v, str)):
+            out[path + k] = v.translate(SPL_WHITE_SPACES_TABLE)
+        elif (v is None):
+            out[path + k] = ""
+        elif (isinstance(v, (int, float))):
+            out[path + k] = str(v)
+        elif (isinstance(v, dict)):
+            if (len(v) > 0):
+                if (nested is None):
+                    nested = []
+                nested.append((k, v))
+        elif (isinstance(v, list)):
+            if (len(v) > 0):
+                # only lists of primitive values
+                if (isinstance(v[0], (str, int, float)) == False or None in v):
+                    return False
+
+                # collapsed lists are single values at any level
+                values = list([str(t).translate(SPL_WHITE_SPACES_TABLE) for t in v])
+                if (collapse_primitive_list == True):
+                    out[path + k] = ",".join(sorted(values))
+                elif (path == "" and len(lists) == 0):
+                    lists.append((k, values))
+                else:
+                    return False
+                out[path + k + ":" + JSON_EXPLODE_LEN] = str(len(v))
+        else:
+            return False
+
+    # nested maps
+    if (nested is not None):
+        for k, v in nested:
+            if (__flatten__(v, out, path + k + ":", lists, collapse_primitive_list) == False):
+                return False
+            out[path + JSON_EXPLODE_INDEX] = "0"
+
+    # return
+    return True
+
+# returns the list of flattened maps for the json string and a flag whether the generic transform function exp_func was used
+def __flatten_value__(json_str, col, exp_func, collapse_primitive_list, dmsg):
+    # the invalid values are handled by the generic function
+    if (json_str is not None and json_str != ""):
+        json_mp = __parse__(json_str, dmsg)
+        if (isinstance(json_mp, dict)):
+            out = {}
+            lists = []
+            if (__flatten__(json_mp, out, "", lists, collapse_primitive_list) == True):
+                # no list
+                if (len(lists) == 0):
+                    return [out], False
+
+                # one row per list value. The other values take precedence same as the generic path
+                k, values = lists[0]
+                results = []
+                for i in range(len(values)):
+                    mp = {k: values[i], JSON_EXPLODE_INDEX: str(i)}
+                    mp.update(out)
+                    results.append(mp)
+                return results, False
+
+    # generic
+    return exp_func({col: json_str}), True
+
+# returns the new header and data fields with the same output as add_seq_num followed by explode with exp_func, or None
+# if the sample shows that most of the values need the generic path
+def explode_json_rows(header_fields, data_fields, col, prefix, exp_func, default_val, collapse, collapse_primitive_list, dmsg = ""):
+    dmsg = utils.extend_inherit_message(dmsg, "explode_json_rows")
+
+    # header after add_seq_num
+    seq_header_fields = ["{}:__json_index__".format(prefix)] + header_fields
+    col_index = seq_header_fields.index(col)
+
+    # learn the key paths from a sample
+    sample = []
+    keys = {}
+    num_fast = 0
+    for fields in data_fields[0:SAMPLE_SIZE]:
+        flattened, is_generic = __flatten_value__(fields[col_index - 1], col, exp_func, collapse_primitive_list, dmsg)
+        sample.append(flattened)
+        for mp in flattened:
+            keys.update(mp)
+        if (is_generic == False):
+            num_fast = num_fast + 1
+
+    # check if the fast path is useful
+    if (len(sample) > 0 and num_fast < MIN_SAMPLE_FAST_RATIO * len(sample)):
+        utils.debug("{}: only {} / {} sample values can be flattened. Using generic path".format(dmsg, num_fast, len(sample)))
+        return None
+
+    # original columns in the output
+    base_header_fields = seq_header_fields if (collapse == False) else seq_header_fields[0:col_index] + seq_header_fields[col_index + 1:]
+
+    # single pass over the data. The rows are written using the sample keys and the values with new keys are kept aside
+    schema_keys = sorted(keys.keys())
+    schema_set = set(schema_keys)
+    new_keys = {}
+    new_key_rows = {}
+    new_data_fields = []
+    counter = 0
+    for fields in data_fields:
+        counter = counter + 1
+        base_fields = [str(counter)] + fields if (collapse == False) else [str(counter)] + fields[0:col_index - 1] + fields[col_index:]
+
+        # flatten
+        if (counter <= len(sample)):
+            flattened = sample[counter - 1]
+        else:
+            flattened, is_generic = __flatten_value__(fields[col_index - 1], col, exp_func, collapse_primitive_list, dmsg)
+
+        # write rows
+        for mp in flattened:
+            if (mp.keys() <= schema_set):
+                new_data_fields.append(base_fields + list([mp.get(k, default_val) for k in schema_keys]))
+            else:
+                for k in mp.keys():
+                    if (k not in schema_set):
+                        new_keys[k] = 1
+                new_key_rows[len(new_data_fields)] = mp
+                new_data_fields.append(base_fields)
+
+    # rewrite the rows for the keys that were not in the sample
+    all_keys = schema_keys
+    if (len(new_keys) > 0):
+        utils.debug("{}: number of keys not in sample: {}".format(dmsg, len(new_keys)))
+        all_keys = sorted(list(schema_keys) + list(new_keys.keys()))
+        all_key_index = dict([(all_keys[i], i) for i in range(len(all_keys))])
+        schema_positions = list([all_key_index[k] for k in schema_keys])
+        num_base = len(base_header_fields)
+        for i in range(len(new_data_fields)):
+            fields = new_data_fields[i]
+            if (i in new_key_rows.keys()):
+                mp = new_key_rows[i]
+                new_data_fields[i] = fields + list([mp.get(k, default_val) for k in all_keys])
+            else:
+                values = list([default_val for k in all_keys])
+                for j in range(len(schema_positions)):
+                    values[schema_positions[j]] = fields[num_base + j]
+                new_data_fields[i] = fields[0:num_base] + values
+
+    # validation
+    for k in all_keys:
+        if (len(k) == 0):
+            utils.error_and_raise_exception("{}: Invalid key in the hashmap:{}".format(dmsg, k))
+
+    # check if any of new keys clash with old columns
+    new_cols = list([prefix + ":" + k for k in all_keys])
+    for k in new_cols:
+        if (k in seq_header_fields):
+            raise Exception("Column already exist: {}, {}".format(k, str(seq_header_fields)))
+
+    # return
+    return base_header_fields + new_cols, new_data_fields
@@ -0,0 +1,355 @@
+"""Lazy evaluation of DataFrame method chains"""
+from omigo_core import utils, dataframe, instrumentation, expressions
+
+# row wise operators that can be fused together into a single pass over the data
+FUSABLE_OPS = ["select", "drop_cols", "filter", "transform"]
+
+class LazyDataFrame:
+    """Records a chain of DataFrame method calls as a logical plan and executes it only on collect().
+    Adjacent row wise steps are fused into one pass, filters are pushed below transforms that dont
+    produce the filter columns, and projections are pushed down to the reader. Steps with expressions are
+    evaluated a column at a time, and the leading expression filters are pushed down to the reader"""
+
+    source_df = None
+    source_paths = None
+    source_read_params = None
+    steps = None
+
+    # constructor. either source_df or source_paths is required
+    def __init__(self, source_df = None, source_paths = None, source_read_params = None, steps = None):
+        # validation
+        if ((source_df is None and source_paths is None) or (source_df is not None and source_paths is not None)):
+            raise Exception("LazyDataFrame: exactly one of source_df or source_paths is required")
+
+        self.source_df = source_df
+        self.source_paths = source_paths
+        self.source_read_params = source_read_params if (source_read_params is not None) else {}
+        self.steps = steps if (steps is not None) else []
+
+    def __add_step__(self, op, args, kwargs):
+        return LazyDataFrame(source_df = self.source_df, source_paths = self.source_paths, source_read_params = self.source_read_params,
+            steps = self.steps + [(op, args, kwargs)])
+
+    def select(self, col_or_cols, dmsg = ""):
+        return self.__add_step__("select", [col_or_cols], {"dmsg": dmsg})
+
+    def drop_cols(self, col_or_cols, ignore_if_missing = False, dmsg = ""):
+        return self.__add_step__("drop_cols", [col_or_cols], {"ignore_if_missing": ignore_if_missing, "dmsg": dmsg})
+
+    def filter(self, cols, func = None, include_cond = True, use_array_notation = False, ignore_if_missing = False, dmsg = ""):
+        return self.__add_step__("filter", [cols, func], {"include_cond": include_cond, "use_array_notation": use_array_notation,
+            "ignore_if_missing": ignore_if_missing, "dmsg": dmsg})
+
+    def exclude_filter(self, cols, func = None, ignore_if_missing = False, dmsg = ""):
+        return self.filter(cols, func, include_cond = False, ignore_if_missing = ignore_if_missing, dmsg = dmsg)
+
+    def transform(self, cols, func, new_col_or_cols = None, use_array_notation = False, dmsg = ""):
+        return self.__add_step__("transform", [cols, func, new_col_or_cols], {"use_array_notation": use_array_notation, "dmsg": dmsg})
+
+    def aggregate(self, grouping_col_or_cols, agg_cols, agg_funcs, *args, **kwargs):
+        return self.__add_step__("aggregate", [grouping_col_or_cols, agg_cols, agg_funcs] + list(args), kwargs)
+
+    # any other DataFrame api is recorded as is and acts as a barrier for fusion
+    def __getattr__(self, name):
+        # validation
+        if (name.startswith("__") or hasattr(dataframe.DataFrame, name) == False):
+            raise AttributeError("LazyDataFrame: unknown attribute: {}".format(name))
+
+        # create a recorder function
+        def __lazy_step_inner__(*args, **kwargs):
+            return self.__add_step__(name, list(args), kwargs)
+
+        # return
+        return __lazy_step_inner__
+
+    def lazy(self):
+        return self
+
+    # returns the optimized plan as a string
+    def explain(self, dmsg = ""):
+        dmsg = utils.extend_inherit_message(dmsg, "explain")
+
+        # the schema of files is not known before reading
+        if (self.source_df is None):
+            filter_expr, num_pushed = self.__get_pushdown_filter__()
+            lines = ["read: {}, cols: {}, filter: {}".format(self.source_paths, self.__get_pushdown_cols__(self.steps[num_pushed:]), filter_expr)]
+            return "\n".join(lines + list(["{}: {}".format(op, args[0]) for (op, args, kwargs) in self.steps[num_pushed:]]))
+
+        # optimize
+        lines = []
+        header_fields = self.source_df.get_header_fields()
+
+        # iterate over the stages
+        for stage in self.__plan_stages__(self.__push_filters_down__(header_fields, self.steps)):
+            if (stage[0] == "fused"):
+                lines.append("fused: [{}]".format(", ".join(list(["{}: {}".format(op, args[0]) for (op, args, kwargs) in stage[1]]))))
+            else:
+                (op, args, kwargs) = stage[1]
+                lines.append("{}: {}".format(op, args[0]))
+
+        # return
+        return "\n".join(lines)
+
+    def collect(self, dmsg = ""):
+        dmsg = utils.extend_inherit_message(dmsg, "collect")
+
+        # read the source. the filters pushed down to the reader are skipped
+        xdf, num_pushed = self.__read_source__(dmsg = dmsg)
+
+        # apply optimizations
+        steps = self.__push_filters_down__(xdf.get_header_fields(), self.steps[num_pushed:])
+
+        # execute each stage
+        for stage in self.__plan_stages__(steps):
+            if (stage[0] == "fused"):
+                xdf = __run_fused__(xdf, stage[1], dmsg = dmsg)
+            else:
+                (op, args, kwargs) = stage[1]
+                xdf = getattr(xdf, op)(*args, **kwargs)
+
+        # return
+        return xdf
+
+    # returns the list of columns needed from the source, or None if all columns are needed
+    def __get_pushdown_cols__(self, steps):
+        required = None
+        for (op, args, kwargs) in reversed(steps):
+            if (op == "select"):
+                required = __get_exact_cols__(args[0])
+            elif (op == "drop_cols"):
+                pass
+            elif (op == "filter"):
+                if (required is not None):
+                    cols = __get_exact_cols__(args[0])
+                    required = utils.merge_arrays([required, cols]) if (cols is not None) else None
+            elif (op == "transform"):
+                if (required is not None):
+                    cols = __get_exact_cols__(args[0])
+                    new_cols = __get_new_cols__(args)
+                    required = utils.merge_arrays([list(filter(lambda t: t not in new_cols, required)), cols]) if (cols is not None) else None
+            elif (op == "aggregate"):
+                grouping_cols = __get_exact_cols__(args[0])
+                agg_cols = __get_exact_cols__(args[1])
+                required = utils.merge_arrays([grouping_cols, agg_cols]) if (grouping_cols is not None and agg_cols is not None) else None
+            else:
+                # unknown operator, need all columns
+                required = None
+
+        # return distinct values
+        if (required is None):
+            return None
+        else:
+            return list(dict.fromkeys(required).keys())
+
+    # returns the leading expression filters combined into a single expression, and the number of steps
+    def __get_pushdown_filter__(self):
+        filter_expr = None
+        num_steps = 0
+        for (op, args, kwargs) in self.steps:
+            if (op != "filter" or expressions.is_expr(args[0]) == False):
+                break
+
+            # combine
+            expr = args[0] if (kwargs.get("include_cond", True) == True) else ~args[0]
+            filter_expr = expr if (filter_expr is None) else (filter_expr & expr)
+            num_steps = num_steps + 1
+
+        # return
+        return filter_expr, num_steps
+
+    # returns the source and the number of leading steps that were done by the reader
+    def __read_source__(self, dmsg = ""):
+        dmsg = utils.extend_inherit_message(dmsg, "__read_source__")
+
+        # data frame is used as is
+        if (self.source_df is not None):
+            return self.source_df, 0
+
+        # read only the columns and rows that are needed
+        filter_expr, num_pushed = self.__get_pushdown_filter__()
+        cols = self.__get_pushdown_cols__(self.steps[num_pushed:])
+        utils.debug("{}: reading: {}, pushdown cols: {}, pushdown filter: {}".format(dmsg, self.source_paths, cols, filter_expr))
+
+        # return
+        return dataframe.read(self.source_paths, cols = cols, filter_expr = filter_expr, **self.source_read_params), num_pushed
+
+    # move filters below the transforms that dont produce any of the columns used in the filter
+    def __push_filters_down__(self, header_fields, steps):
+        steps = list(steps)
+        moved = True
+        while (moved == True):
+            moved = False
+            schemas = __get_schemas__(header_fields, steps)
+            for i in range(1, len(steps)):
+                (op1, args1, kwargs1) = steps[i - 1]
+                (op2, args2, kwargs2) = steps[i]
+                if (op1 == "transform" and op2 == "filter" and schemas[i] is not None):
+                    new_cols = __get_new_cols__(args1)
+                    filter_cols = __resolve_cols__(schemas[i], args2[0], kwargs2.get("ignore_if_missing", False))
+                    if (len(list(filter(lambda t: t in new_cols, filter_cols))) == 0):
+                        steps[i - 1] = steps[i]
+                        steps[i] = (op1, args1, kwargs1)
+                        moved = True
+                        break
+
+        # return
+        return steps
+
+    # group adjacent fusable steps together
+    def __plan_stages__(self, steps):
+        stages = []
+        cur_group = []
+        for step in steps:
+            if (step[0] in FUSABLE_OPS and expressions.is_expr(step[1][0]) == False):
+                cur_group.append(step)
+            else:
+                if (len(cur_group) > 0):
+                    stages.append(("fused", cur_group))
+                    cur_group = []
+                stages.append(("single", step))
+
+        # last group
+        if (len(cur_group) > 0):
+            stages.append(("fused", cur_group))
+
+        # return
+        return stages
+
+def __to_array__(col_or_cols):
+    return [col_or_cols] if (isinstance(col_or_cols, str)) else list(col_or_cols)
+
+# returns the new columns of a transform step. transform(expr, new_col) has the new column as the second parameter
+def __get_new_cols__(args):
+    return [args[1]] if (expressions.is_expr(args[0])) else __to_array__(args[2])
+
+# returns the cols if they are plain names, None if they can be regex patterns. Expressions use the columns they refer to
+def __get_exact_cols__(col_or_cols):
+    if (expressions.is_expr(col_or_cols)):
+        return col_or_cols.get_cols()
+
+    cols = []
+    for c in __to_array__(col_or_cols):
+        if (expressions.is_expr(c)):
+            cols = utils.merge_arrays([cols, c.get_cols()])
+        elif (len(list(filter(lambda t: t in c, [".*", "^", "$", ",", "[", "+", "?"]))) > 0):
+            return None
+        else:
+            cols.append(c)
+
+    # return
+    return cols
+
+def __resolve_cols__(header_fields, col_or_cols, ignore_if_missing):
+    if (expressions.is_expr(col_or_cols)):
+        return col_or_cols.get_cols()
+    return dataframe.new_with_cols(header_fields).__get_matching_cols__(col_or_cols, ignore_if_missing = ignore_if_missing)
+
+# returns the schema before each step. None for steps after an unknown operator
+def __get_schemas__(header_fields, steps):
+    schemas = []
+    cur_header_fields = header_fields
+    for (op, args, kwargs) in steps:
+        schemas.append(cur_header_fields)
+        if (cur_header_fields is None):
+            continue
+
+        if (op == "select"):
+            cur_header_fields = __resolve_cols__(cur_header_fields, args[0], False)
+        elif (op == "drop_cols"):
+            matching_cols = __resolve_cols__(cur_header_fields, args[0], kwargs.get("ignore_if_missing", False))
+            cur_header_fields = list(filter(lambda t: t not in matching_cols, cur_header_fields))
+        elif (op == "filter"):
+            pass
+        elif (op == "transform"):
+            cur_header_fields = utils.merge_arrays([cur_header_fields, __get_new_cols__(args)])
+        else:
+            cur_header_fields = None
+
+    # return
+    return schemas
+
+# converts the result of a transform function into string fields, matching DataFrame.transform
+def __transform_result__(result, num_new_cols, use_array_notation):
+    # if result is None, convert to empty string
+    if (result is None):
+        result = ""
+
+    # single column
+    if (num_new_cols == 1):
+        if (isinstance(result, list)):
+            return [str(result[0])]
+        else:
+            return [str(result)]
+
+    # array notation results are appended as is
+    if (use_array_notation == True):
+        if (len(result) != num_new_cols):
+            raise Exception("Invalid number of fields in the result array. Expecting: {}, Got: {}, result: {}".format(num_new_cols, len(result), result))
+        return list(result)
+
+    # return
+    return list([str(result[i]) for i in range(num_new_cols)])
+
+# runs a group of row wise steps in a single pass over the data
+def __run_fused__(xdf, steps, dmsg = ""):
+    dmsg = utils.extend_inherit_message(dmsg, "__run_fused__")
+
+    # resolve each step against the running schema into a kernel
+    kernels = []
+    header_fields = xdf.get_header_fields()
+    for (op, args, kwargs) in steps:
+        cur_xdf = dataframe.new_with_cols(header_fields)
+        if (op == "select"):
+            cols = cur_xdf.__get_matching_cols__(args[0])
+            kernels.append(("project", cur_xdf.__get_col_indexes__(cols)))
+            header_fields = cols
+        elif (op == "drop_cols"):
+            matching_cols = cur_xdf.__get_matching_cols__(args[0], ignore_if_missing = kwargs.get("ignore_if_missing", False))
+            cols = list(filter(lambda t: t not in matching_cols, header_fields))
+            kernels.append(("project", cur_xdf.__get_col_indexes__(cols)))
+            header_fields = cols
+        elif (op == "filter"):
+            cols = cur_xdf.__get_matching_cols__(args[0], ignore_if_missing = kwargs.get("ignore_if_missing", False))
+            if (len(cols) == 0):
+                utils.raise_exception_or_warn("filter: no matching cols", kwargs.get("ignore_if_missing", False))
+                continue
+            kernels.append(("filter", cur_xdf.__get_col_indexes__(cols), args[1], kwargs.get("include_cond", True), kwargs.get("use_array_notation", False)))
+        elif (op == "transform"):
+            cols = cur_xdf.__get_matching_cols__(args[0])
+            new_cols = __to_array__(args[2])
+            for new_col in new_cols:
+                if (new_col in header_fields):
+                    raise Exception("New column: {} already exists in {}".format(new_col, str(header_fields)))
+            kernels.append(("transform", cur_xdf.__get_col_indexes__(cols), args[1], len(new_cols), kwargs.get("use_array_notation", False)))
+            header_fields = utils.merge_arrays([header_fields, new_cols])
+        else:
+            raise Exception("{}: operator not supported for fusion: {}".format(dmsg, op))
+
+    # debug
+    utils.debug("{}: fused steps: {}".format(dmsg, list([t[0] for t in steps])))
+
+    # single pass over the data
+    new_data_fields = []
+    for fields in instrumentation.track(xdf.get_data_fields(), "[1/1] running fused steps", dmsg):
+        # apply each kernel
+        include = True
+        for kernel in kernels:
+            if (kernel[0] == "project"):
+                fields = list([fields[i] for i in kernel[1]])
+            elif (kernel[0] == "filter"):
+                col_values = list([fields[i] for i in kernel[1]])
+                result = kernel[2](col_values) if (kernel[4] == True) else kernel[2](*col_values)
+                if (result != kernel[3]):
+                    include = False
+                    break
+            else:
+                col_values = list([fields[i] for i in kernel[1]])
+                result = kernel[2](col_values) if (kernel[4] == True) else kernel[2](*col_values)
+                fields = fields + __transform_result__(result, kernel[3], kernel[4])
+
+        # append
+        if (include == True):
+            new_data_fields.append(fields)
+
+    # return
+    return dataframe.new_with_cols(header_fields, data_fields = new_data_fields)
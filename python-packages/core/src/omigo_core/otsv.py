@@ -0,0 +1,228 @@
+"""Binary columnar file format (.otsv).
+
+Layout:
+    magic
+    column blocks, each aligned to BLOCK_ALIGNMENT bytes
+    footer as utf-8 json
+    footer length as 8 byte little endian int
+    magic
+
+Numeric columns are stored as little endian int64 / float64 arrays. String columns are dictionary encoded
+as int32 codes plus a dictionary block of the distinct values joined by newline. The footer has the name,
+type and the offset / length of the blocks of each column so that a reader only touches the selected columns.
+The hash indexes of the dataframe are stored as row ids and offsets blocks plus a json block of the keys"""
+import json
+import mmap
+import numpy as np
+from omigo_core import utils, dataframe, columnar, hash_index
+
+# constants
+OTSV_EXTENSION = ".otsv"
+OTSV_MAGIC = b"OTSV0001"
+OTSV_VERSION = 1
+BLOCK_ALIGNMENT = 8
+FOOTER_LEN_SIZE = 8
+
+# dtypes of the blocks
+BLOCK_DTYPES = {
+    columnar.COL_TYPE_INT: np.dtype("<i8"),
+    columnar.COL_TYPE_FLOAT: np.dtype("<f8"),
+    columnar.COL_TYPE_STR: np.dtype("<i4")
+}
+
+def is_otsv_path(path):
+    return path.endswith(OTSV_EXTENSION)
+
+def __pad__(parts, cur_offset):
+    remainder = cur_offset % BLOCK_ALIGNMENT
+    if (remainder != 0):
+        parts.append(b"\x00" * (BLOCK_ALIGNMENT - remainder))
+        cur_offset = cur_offset + BLOCK_ALIGNMENT - remainder
+
+    # return
+    return cur_offset
+
+# returns the file content as bytes
+def encode(xdf, dmsg = ""):
+    dmsg = utils.extend_inherit_message(dmsg, "encode")
+
+    # get the columns. reuse the typed columns if the dataframe is already columnar
+    if (xdf.is_columnar() == True):
+        columns = xdf.get_data_fields().get_columns()
+    else:
+        columns = columnar.from_rows(xdf.get_header_fields(), xdf.get_data_fields(), dmsg = dmsg).get_columns()
+
+    # write the blocks
+    parts = [OTSV_MAGIC]
+    cur_offset = len(OTSV_MAGIC)
+    col_metas = []
+    for column in columns:
+        # values block
+        cur_offset = __pad__(parts, cur_offset)
+        values_bytes = column.values.astype(BLOCK_DTYPES[column.col_type], copy = False).tobytes()
+        col_meta = {"name": column.name, "type": column.col_type, "offset": cur_offset, "length": len(values_bytes)}
+        parts.append(values_bytes)
+        cur_offset = cur_offset + len(values_bytes)
+
+        # dictionary block
+        if (column.col_type == columnar.COL_TYPE_STR):
+            dict_bytes = "\n".join(column.dictionary).encode("utf-8")
+            if (len(column.dictionary) > 0 and dict_bytes.count(b"\n") != len(column.dictionary) - 1):
+                raise Exception("{}: column has values with newline character: {}".format(dmsg, column.name))
+
+            col_meta["dict_offset"] = cur_offset
+            col_meta["dict_length"] = len(dict_bytes)
+            col_meta["dict_size"] = len(column.dictionary)
+            parts.append(dict_bytes)
+            cur_offset = cur_offset + len(dict_bytes)
+
+        # append
+        col_metas.append(col_meta)
+
+    # hash indexes
+    index_metas = []
+    for index in xdf.get_indexes():
+        index_meta = {"cols": index.cols, "num_keys": index.num_keys()}
+        for (name, arr) in [("row_ids", index.row_ids), ("offsets", index.offsets)]:
+            cur_offset = __pad__(parts, cur_offset)
+            arr_bytes = arr.astype("<i8", copy = False).tobytes()
+            index_meta[name + "_offset"] = cur_offset
+            parts.append(arr_bytes)
+            cur_offset = cur_offset + len(arr_bytes)
+
+        # keys
+        keys_bytes = json.dumps(index.keys).encode("utf-8")
+        index_meta["keys_offset"] = cur_offset
+        index_meta["keys_length"] = len(keys_bytes)
+        parts.append(keys_bytes)
+        cur_offset = cur_offset + len(keys_bytes)
+
+        # append
+        index_metas.append(index_meta)
+
+    # footer
+    footer = {"version": OTSV_VERSION, "num_rows": xdf.num_rows(), "columns": col_metas, "indexes": index_metas}
+    footer_bytes = json.dumps(footer).encode("utf-8")
+    parts.append(footer_bytes)
+    parts.append(len(footer_bytes).to_bytes(FOOTER_LEN_SIZE, "little"))
+    parts.append(OTSV_MAGIC)
+
+    # return
+    return b"".join(parts)
+
+# returns the footer from the content. buf can be bytes or mmap
+def read_footer(buf, dmsg = ""):
+    dmsg = utils.extend_inherit_message(dmsg, "read_footer")
+
+    # validation
+    magic_len = len(OTSV_MAGIC)
+    if (len(buf) < 2 * magic_len + FOOTER_LEN_SIZE or buf[0:magic_len] != OTSV_MAGIC or buf[len(buf) - magic_len:] != OTSV_MAGIC):
+        raise Exception("{}: not a valid otsv content".format(dmsg))
+
+    # read footer
+    footer_end = len(buf) - magic_len - FOOTER_LEN_SIZE
+    footer_len = int.from_bytes(buf[footer_end:footer_end + FOOTER_LEN_SIZE], "little")
+    footer = json.loads(bytes(buf[footer_end - footer_len:footer_end]).decode("utf-8"))
+
+    # check version
+    if (footer["version"] > OTSV_VERSION):
+        raise Exception("{}: unsupported version: {}".format(dmsg, footer["version"]))
+
+    # return
+    return footer
+
+def __decode_column__(buf, col_meta, num_rows):
+    # the numeric arrays are views over buf without any copy
+    col_type = col_meta["type"]
+    values = np.frombuffer(buf, dtype = BLOCK_DTYPES[col_type], count = num_rows, offset = col_meta["offset"])
+    if (col_type != columnar.COL_TYPE_STR):
+        return columnar.Column(col_meta["name"], col_type, values)
+
+    # dictionary
+    if (col_meta["dict_size"] > 0):
+        dict_offset = col_meta["dict_offset"]
+        dictionary = bytes(buf[dict_offset:dict_offset + col_meta["dict_length"]]).decode("utf-8").split("\n")
+    else:
+        dictionary = []
+
+    # return
+    return columnar.Column(col_meta["name"], col_type, values, dictionary = dictionary)
+
+def __decode_index__(buf, index_meta, num_rows):
+    num_keys = index_meta["num_keys"]
+    row_ids = np.frombuffer(buf, dtype = "<i8", count = num_rows, offset = index_meta["row_ids_offset"])
+    offsets = np.frombuffer(buf, dtype = "<i8", count = num_keys + 1, offset = index_meta["offsets_offset"])
+    keys_offset = index_meta["keys_offset"]
+    keys = json.loads(bytes(buf[keys_offset:keys_offset + index_meta["keys_length"]]).decode("utf-8"))
+
+    # keys of multiple columns are tuples
+    if (len(index_meta["cols"]) > 1):
+        keys = list([tuple(k) for k in keys])
+
+    # return
+    return hash_index.HashIndex(index_meta["cols"], keys, offsets, row_ids, num_rows)
+
+# returns a columnar dataframe with only the selected cols. buf can be bytes or mmap
+# filter_expr is an expression from omigo_core.expressions. Its columns are decoded first, and the rows that pass are
+# returned as row indexes into the decoded columns
+def decode(buf, cols = None, filter_expr = None, dmsg = ""):
+    dmsg = utils.extend_inherit_message(dmsg, "decode")
+
+    # read footer
+    footer = read_footer(buf, dmsg = dmsg)
+    col_metas = footer["columns"]
+    header_fields = list([t["name"] for t in col_metas])
+
+    # resolve the columns using the same rules as select
+    if (cols is not None):
+        selected_cols = dataframe.new_with_cols(header_fields).__get_matching_cols__(cols)
+        col_metas_map = dict([(t["name"], t) for t in col_metas])
+        col_metas = list([col_metas_map[c] for c in selected_cols])
+
+    # decode only the selected columns
+    columns_map = {}
+    indexes = None
+    if (filter_expr is not None):
+        all_col_metas_map = dict([(t["name"], t) for t in footer["columns"]])
+        for c in filter_expr.get_cols():
+            if (c not in all_col_metas_map.keys()):
+                raise Exception("{}: filter column not found: {}, header: {}".format(dmsg, c, header_fields))
+            columns_map[c] = __decode_column__(buf, all_col_metas_map[c], footer["num_rows"])
+
+        # evaluate the filter on the filter columns only
+        filter_df = dataframe.new_with_cols(list(columns_map.keys()), data_fields = columnar.ColumnarRowView(list(columns_map.values())))
+        indexes = np.flatnonzero(filter_expr.evaluate_mask(filter_df))
+        utils.trace("{}: filter: {}, num_rows: {}, num_selected: {}".format(dmsg, filter_expr, footer["num_rows"], len(indexes)))
+
+    columns = list([columns_map[t["name"]] if (t["name"] in columns_map.keys()) else __decode_column__(buf, t, footer["num_rows"]) for t in col_metas])
+    utils.trace("{}: num_rows: {}, num_cols: {}".format(dmsg, footer["num_rows"], len(columns)))
+
+    # create dataframe
+    xdf = dataframe.new_with_cols(list([t.name for t in columns]), data_fields = columnar.ColumnarRowView(columns, indexes = indexes))
+
+    # the hash indexes are valid only if all the rows are read
+    if (filter_expr is None):
+        for index_meta in footer.get("indexes", []):
+            if (all([c in xdf.get_header_fields() for c in index_meta["cols"]])):
+                xdf.__set_index__(__decode_index__(buf, index_meta, footer["num_rows"]))
+
+    # return
+    return xdf
+
+# reads the local file using mmap, only the blocks of the selected columns are paged in
+def read_file(path, cols = None, filter_expr = None, dmsg = ""):
+    dmsg = utils.extend_inherit_message(dmsg, "read_file")
+
+    # the mmap stays alive as long as the arrays refer to it
+    with open(path, "rb") as fh:
+        buf = mmap.mmap(fh.fileno(), 0, access = mmap.ACCESS_READ)
+
+    # return
+    return decode(buf, cols = cols, filter_expr = filter_expr, dmsg = dmsg)
+
+def write_file(xdf, path, dmsg = ""):
+    dmsg = utils.extend_inherit_message(dmsg, "write_file")
+
+    # write
+    with open(path, "wb") as fh:
+        fh.write(encode(xdf, dmsg = dmsg))
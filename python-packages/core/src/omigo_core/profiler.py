@@ -0,0 +1,179 @@
+"""Profiler for DataFrame pipelines. Use dataframe.profile() as context manager:
+
+    with dataframe.profile() as p:
+        xdf.select(...).aggregate(...)
+
+    p.to_df().show()
+    p.write_folded_stacks("profile.folded")
+
+Every DataFrame method call inside the block is recorded with its caller dmsg, elapsed time, input and output
+rows and size in bytes, and the peak allocation when trace_memory is enabled. The nested calls form a tree
+that can be written as folded stacks for flame graph tools"""
+import threading
+import time
+import tracemalloc
+from omigo_core import utils, dataframe, instrumentation
+
+class ProfiledCall:
+    """A single method call. The times are in seconds"""
+
+    def __init__(self, call_id, parent_id, depth, name, dmsg, rows_in, bytes_in):
+        self.call_id = call_id
+        self.parent_id = parent_id
+        self.depth = depth
+        self.name = name
+        self.dmsg = dmsg
+        self.rows_in = rows_in
+        self.bytes_in = bytes_in
+        self.rows_out = None
+        self.bytes_out = None
+        self.elapsed_sec = 0
+        self.child_elapsed_sec = 0
+        self.peak_alloc_bytes = None
+        self.stack = None
+        self.ts_start = None
+        self.ts_enter = None
+        self.start_memory = 0
+        self.max_child_memory = 0
+
+class Profiler(instrumentation.CallListener):
+    """Context manager that records the DataFrame method calls. track_bytes calls size_in_bytes on the input and
+    output of every call, and trace_memory uses tracemalloc to find the peak allocation of every call. The time spent
+    in the profiler for a nested call, like the size_in_bytes scans, is not counted in the self time of the parent"""
+
+    def __init__(self, track_bytes = True, trace_memory = False, folded_stacks_file = None):
+        self.track_bytes = track_bytes
+        self.trace_memory = trace_memory
+        self.folded_stacks_file = folded_stacks_file
+        self.calls = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.started_tracemalloc = False
+
+    def __enter__(self):
+        # start tracemalloc if not already running
+        if (self.trace_memory == True and tracemalloc.is_tracing() == False):
+            tracemalloc.start()
+            self.started_tracemalloc = True
+
+        # add listener
+        instrumentation.add_listener(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # remove listener
+        instrumentation.remove_listener(self)
+
+        # stop tracemalloc
+        if (self.started_tracemalloc == True):
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+
+        # write the folded stacks
+        if (self.folded_stacks_file is not None):
+            self.write_folded_stacks(self.folded_stacks_file)
+
+        # dont suppress exception
+        return False
+
+    def __get_stack__(self):
+        if (hasattr(self.local, "stack") == False):
+            self.local.stack = []
+
+        # return
+        return self.local.stack
+
+    def before_call(self, name, xdf, args, kwargs):
+        ts_enter = time.time()
+        stack = self.__get_stack__()
+        parent = stack[-1] if (len(stack) > 0) else None
+
+        # show the function name for the calls that take user defined function or class
+        label = name
+        if (name in ("custom_func", "extend_class", "extend_external_class") and len(args) > 0):
+            label = "{}:{}".format(name, getattr(args[0], "__name__", str(args[0])))
+
+        # create call
+        bytes_in = instrumentation.call_original(xdf, "size_in_bytes") if (self.track_bytes == True) else None
+        with self.lock:
+            call = ProfiledCall(len(self.calls), parent.call_id if (parent is not None) else None, len(stack), label,
+                instrumentation.get_call_arg(xdf, name, args, kwargs, "dmsg", default = ""), instrumentation.call_original(xdf, "num_rows"), bytes_in)
+            self.calls.append(call)
+        call.ts_enter = ts_enter
+        call.stack = (parent.stack + ";" if (parent is not None) else "") + label
+
+        # the peak is reset for every call, so keep the peak of the parent till now
+        if (self.trace_memory == True and tracemalloc.is_tracing() == True):
+            (current, peak) = tracemalloc.get_traced_memory()
+            if (parent is not None):
+                parent.max_child_memory = max(parent.max_child_memory, peak)
+            tracemalloc.reset_peak()
+            call.start_memory = current
+
+        # push
+        stack.append(call)
+        call.ts_start = time.time()
+
+        # return
+        return call
+
+    def after_call(self, call, result):
+        elapsed_sec = time.time() - call.ts_start
+        stack = self.__get_stack__()
+        stack.pop()
+        parent = stack[-1] if (len(stack) > 0) else None
+
+        # output
+        call.elapsed_sec = elapsed_sec
+        if (instrumentation.is_dataframe(result)):
+            call.rows_out = instrumentation.call_original(result, "num_rows")
+            if (self.track_bytes == True):
+                call.bytes_out = instrumentation.call_original(result, "size_in_bytes")
+
+        # peak memory
+        if (self.trace_memory == True and tracemalloc.is_tracing() == True):
+            peak = max(call.max_child_memory, tracemalloc.get_traced_memory()[1])
+            call.peak_alloc_bytes = peak - call.start_memory
+            if (parent is not None):
+                parent.max_child_memory = max(parent.max_child_memory, peak)
+
+        # update parent with the full time of the child including the profiler overhead
+        if (parent is not None):
+            parent.child_elapsed_sec = parent.child_elapsed_sec + (time.time() - call.ts_enter)
+
+    # returns the report with one row per call in the order of calls
+    def to_df(self, dmsg = ""):
+        dmsg = utils.extend_inherit_message(dmsg, "to_df")
+
+        # header
+        header_fields = ["call_id", "parent_id", "depth", "method", "dmsg", "elapsed_sec", "self_sec", "rows_in", "rows_out",
+            "bytes_in", "bytes_out", "peak_alloc_bytes"]
+
+        # data
+        data_fields = []
+        for call in self.calls:
+            values = [call.call_id, call.parent_id, call.depth, call.name, call.dmsg, "{:.6f}".format(call.elapsed_sec),
+                "{:.6f}".format(max(0, call.elapsed_sec - call.child_elapsed_sec)), call.rows_in, call.rows_out, call.bytes_in,
+                call.bytes_out, call.peak_alloc_bytes]
+            data_fields.append(list(["" if (t is None) else str(t) for t in values]))
+
+        # return
+        return dataframe.new_with_cols(header_fields, data_fields = data_fields)
+
+    # returns the lines in folded stack format with self time in microseconds as the value
+    def get_folded_stacks(self):
+        totals = {}
+        for call in self.calls:
+            totals[call.stack] = totals.get(call.stack, 0) + max(0, call.elapsed_sec - call.child_elapsed_sec)
+
+        # return
+        return list(["{} {}".format(k.replace(" ", "_"), int(v * 1e6)) for k, v in totals.items()])
+
+    def write_folded_stacks(self, output_file_name):
+        with open(output_file_name, "w") as fh:
+            for line in self.get_folded_stacks():
+                fh.write(line)
+                fh.write("\n")
+
+        # debug
+        utils.debug("write_folded_stacks: file saved to: {}".format(output_file_name))
@@ -0,0 +1,184 @@
+"""Zero copy row views for DataFrame"""
+import collections.abc
+import operator
+import weakref
+
+class RowView(collections.abc.Sequence):
+    """Read only list like view over the rows of a parent DataFrame. row_indexes picks the visible rows and col_indexes
+    picks the visible columns of each row. Views of views are composed so that they always point to the parent rows.
+    Any method that mutates the view first materializes it as a plain list of rows and notifies the write listeners"""
+
+    rows = None
+    row_indexes = None
+    col_indexes = None
+    col_getter = None
+    write_listeners = None
+
+    # constructor
+    def __init__(self, rows, row_indexes = None, col_indexes = None):
+        self.rows = rows
+        self.row_indexes = row_indexes
+        self.col_indexes = col_indexes
+        self.col_getter = operator.itemgetter(*col_indexes) if (col_indexes is not None and len(col_indexes) > 1) else None
+        self.write_listeners = []
+
+    def __len__(self):
+        if (self.row_indexes is not None):
+            return len(self.row_indexes)
+        else:
+            return len(self.rows)
+
+    def __get_fields__(self, fields):
+        if (self.col_indexes is None):
+            return fields
+        elif (self.col_getter is not None):
+            return list(self.col_getter(fields))
+        elif (len(self.col_indexes) == 1):
+            return [fields[self.col_indexes[0]]]
+        else:
+            return []
+
+    def __getitem__(self, i):
+        # slices return another view
+        if (isinstance(i, slice)):
+            row_indexes = self.row_indexes if (self.row_indexes is not None) else range(len(self.rows))
+            return RowView(self.rows, row_indexes = row_indexes[i], col_indexes = self.col_indexes)
+
+        # validation
+        n = len(self)
+        if (i < 0):
+            i = i + n
+        if (i < 0 or i >= n):
+            raise IndexError("RowView: index out of range: {}".format(i))
+
+        # return
+        return self.__get_fields__(self.rows[self.row_indexes[i] if (self.row_indexes is not None) else i])
+
+    def __iter__(self):
+        rows = self.rows
+        fields_iter = iter(rows) if (self.row_indexes is None) else map(rows.__getitem__, self.row_indexes)
+        if (self.col_indexes is None):
+            return fields_iter
+        else:
+            return map(self.__get_fields__, fields_iter)
+
+    # returns a view of the given row positions of this view
+    def take_rows(self, indexes):
+        if (self.row_indexes is not None):
+            row_indexes = self.row_indexes
+            indexes = list([row_indexes[i] for i in indexes])
+        return RowView(self.rows, row_indexes = indexes, col_indexes = self.col_indexes)
+
+    # returns a view of the given column positions of this view
+    def select_cols(self, indexes):
+        if (self.col_indexes is not None):
+            col_indexes = self.col_indexes
+            indexes = list([col_indexes[i] for i in indexes])
+        return RowView(self.rows, row_indexes = self.row_indexes, col_indexes = list(indexes))
+
+    # returns iterator over the parent rows of the visible rows
+    def iter_parent_rows(self):
+        if (self.row_indexes is None):
+            return iter(self.rows)
+        else:
+            return map(self.rows.__getitem__, self.row_indexes)
+
+    # returns the positions in the parent rows for the given column positions of this view
+    def get_parent_col_indexes(self, indexes):
+        if (self.col_indexes is None):
+            return indexes
+        else:
+            return list([self.col_indexes[i] for i in indexes])
+
+    # returns the values of a single column without creating the rows
+    def get_col_values(self, index):
+        if (self.col_indexes is not None):
+            index = self.col_indexes[index]
+        rows = self.rows
+        if (self.row_indexes is None):
+            return list([fields[index] for fields in rows])
+        else:
+            return list([rows[i][index] for i in self.row_indexes])
+
+    def materialize(self):
+        return list(self)
+
+    # registers a bound method that is called before every change of the rows, for example to clear the caches of the
+    # dataframe holding the view. Only a weak reference is kept
+    def add_write_listener(self, func):
+        self.write_listeners.append(weakref.WeakMethod(func))
+
+    # copy on write
+    def __materialize_inplace__(self):
+        for listener in self.write_listeners:
+            func = listener()
+            if (func is not None):
+                func()
+
+        if (self.row_indexes is not None or self.col_indexes is not None):
+            self.rows = self.materialize()
+            self.row_indexes = None
+            self.col_indexes = None
+            self.col_getter = None
+        return self.rows
+
+    def append(self, fields):
+        self.__materialize_inplace__().append(fields)
+
+    def extend(self, rows):
+        self.__materialize_inplace__().extend(rows)
+
+    def insert(self, i, fields):
+        self.__materialize_inplace__().insert(i, fields)
+
+    def pop(self, i = -1):
+        return self.__materialize_inplace__().pop(i)
+
+    def sort(self, *args, **kwargs):
+        self.__materialize_inplace__().sort(*args, **kwargs)
+
+    def reverse(self):
+        self.__materialize_inplace__().reverse()
+
+    def __setitem__(self, i, fields):
+        self.__materialize_inplace__()[i] = fields
+
+    def __delitem__(self, i):
+        del self.__materialize_inplace__()[i]
+
+    def __add__(self, that):
+        return list(self) + list(that)
+
+    def __radd__(self, that):
+        return list(that) + list(self)
+
+    def __eq__(self, that):
+        if (isinstance(that, collections.abc.Sequence) == False or isinstance(that, str)):
+            return False
+        return len(self) == len(that) and list(self) == list(that)
+
+    # pickle only the visible rows
+    def __reduce__(self):
+        return (list, (self.materialize(),))
+
+    def __repr__(self):
+        return repr(self.materialize())
+
+# returns a view of data_fields with the given row positions and column positions. data_fields can be a list or RowView
+def create_view(data_fields, row_indexes = None, col_indexes = None):
+    view = data_fields if (isinstance(data_fields, RowView)) else RowView(data_fields)
+    if (row_indexes is not None):
+        view = view.take_rows(row_indexes)
+    if (col_indexes is not None):
+        view = view.select_cols(col_indexes)
+    return view
+
+def is_view(data_fields):
+    return isinstance(data_fields, RowView)
+
+# returns the values of a single column
+def get_col_values(data_fields, index):
+    if (isinstance(data_fields, RowView)):
+        return data_fields.get_col_values(index)
+    else:
+        return list([fields[index] for fields in data_fields])
@@ -0,0 +1,287 @@
+"""Approximate, mergeable sketches used by the approx_* aggregation functions in udfs.
+
+Each sketch has add(), merge(), to_str() and from_str(). The serialized form is a short prefix followed by base64 so that
+the sketches can be stored as regular column values and merged again across partitions and hydra tasks"""
+import base64
+import hashlib
+import json
+import math
+import struct
+import zlib
+import numpy as np
+
+# serialization prefixes
+HLL_PREFIX = "hll1:"
+TDIGEST_PREFIX = "td1:"
+CMS_PREFIX = "cms1:"
+
+# hll representations
+HLL_DENSE = 0
+HLL_SPARSE = 1
+
+# stable 64 bit hash that does not change across processes
+def __hash64__(v):
+    return int.from_bytes(hashlib.blake2b(str(v).encode("utf-8"), digest_size = 8).digest(), "little")
+
+def __encode__(prefix, buf):
+    return prefix + base64.b64encode(buf).decode("ascii")
+
+def __decode__(prefix, xstr):
+    if (xstr.startswith(prefix) == False):
+        raise Exception("Invalid sketch, expected prefix: {}, found: {}".format(prefix, xstr[0:10]))
+    return base64.b64decode(xstr[len(prefix):])
+
+class HyperLogLog:
+    """Distinct count with relative error around 1.04 / sqrt(2^precision)"""
+
+    def __init__(self, precision = 12):
+        if (precision < 4 or precision > 16):
+            raise Exception("HyperLogLog: precision must be between 4 and 16: {}".format(precision))
+
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, v):
+        x = __hash64__(v)
+        num_bits = 64 - self.precision
+        index = x >> num_bits
+        rho = num_bits - (x & ((1 << num_bits) - 1)).bit_length() + 1
+        if (rho > self.registers[index]):
+            self.registers[index] = rho
+
+    def merge(self, that):
+        if (self.precision != that.precision):
+            raise Exception("HyperLogLog: precision mismatch: {}, {}".format(self.precision, that.precision))
+        self.registers = bytearray(np.maximum(np.frombuffer(self.registers, dtype = np.uint8), np.frombuffer(that.registers, dtype = np.uint8)).tobytes())
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        registers = np.frombuffer(self.registers, dtype = np.uint8)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / float(np.sum(np.power(2.0, -registers.astype(np.float64))))
+
+        # linear counting for small cardinalities
+        num_zeros = int(np.count_nonzero(registers == 0))
+        if (estimate <= 2.5 * m and num_zeros > 0):
+            estimate = m * math.log(m / num_zeros)
+
+        # return
+        return int(round(estimate))
+
+    # sparse form stores index and value of non zero registers, and is used when that is smaller
+    def to_str(self):
+        registers = np.frombuffer(self.registers, dtype = np.uint8)
+        indexes = np.flatnonzero(registers)
+        if (len(indexes) * 3 < len(registers)):
+            buf = struct.pack("<BB", self.precision, HLL_SPARSE) + indexes.astype("<u2").tobytes() + registers[indexes].tobytes()
+        else:
+            buf = struct.pack("<BB", self.precision, HLL_DENSE) + self.registers
+        return __encode__(HLL_PREFIX, buf)
+
+    @staticmethod
+    def from_str(xstr):
+        buf = __decode__(HLL_PREFIX, xstr)
+        precision, kind = struct.unpack_from("<BB", buf, 0)
+        hll = HyperLogLog(precision = precision)
+        if (kind == HLL_SPARSE):
+            num_values = (len(buf) - 2) // 3
+            indexes = np.frombuffer(buf, dtype = "<u2", count = num_values, offset = 2)
+            registers = np.zeros(1 << precision, dtype = np.uint8)
+            registers[indexes] = np.frombuffer(buf, dtype = np.uint8, count = num_values, offset = 2 + 2 * num_values)
+            hll.registers = bytearray(registers.tobytes())
+        else:
+            hll.registers = bytearray(buf[2:])
+        return hll
+
+class TDigest:
+    """Quantiles using merging t-digest with the arcsine scale function. Small inputs are kept exactly"""
+
+    def __init__(self, compression = 100):
+        self.compression = compression
+        self.means = []
+        self.counts = []
+        self.buffer = []
+        self.total = 0
+        self.min_value = None
+        self.max_value = None
+
+    def add(self, v):
+        self.buffer.append(float(v))
+        if (len(self.buffer) >= 5 * self.compression):
+            self.__compress__()
+
+    def merge(self, that):
+        that.__compress__()
+        if (that.total > 0):
+            self.min_value = that.min_value if (self.min_value is None) else min(self.min_value, that.min_value)
+            self.max_value = that.max_value if (self.max_value is None) else max(self.max_value, that.max_value)
+            self.__compress__(extra_means = that.means, extra_counts = that.counts)
+        return self
+
+    def __scale__(self, q):
+        return self.compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+    def __compress__(self, extra_means = None, extra_counts = None):
+        if (len(self.buffer) == 0 and extra_means is None):
+            return
+
+        # all centroids sorted by mean
+        items = list(zip(self.means, self.counts)) + list([(v, 1) for v in self.buffer])
+        if (extra_means is not None):
+            items = items + list(zip(extra_means, extra_counts))
+        items.sort()
+        self.buffer = []
+        if (len(items) == 0):
+            return
+
+        # update totals
+        self.total = sum([t[1] for t in items])
+        self.min_value = items[0][0] if (self.min_value is None) else min(self.min_value, items[0][0])
+        self.max_value = items[-1][0] if (self.max_value is None) else max(self.max_value, items[-1][0])
+
+        # merge neighbours while the centroid spans at most one unit of the scale function
+        means = []
+        counts = []
+        cur_mean, cur_count = items[0]
+        count_so_far = 0
+        k_lower = self.__scale__(0)
+        for mean, count in items[1:]:
+            if (self.__scale__((count_so_far + cur_count + count) / self.total) - k_lower <= 1):
+                cur_count = cur_count + count
+                cur_mean = cur_mean + (mean - cur_mean) * count / cur_count
+            else:
+                means.append(cur_mean)
+                counts.append(cur_count)
+                count_so_far = count_so_far + cur_count
+                k_lower = self.__scale__(count_so_far / self.total)
+                cur_mean, cur_count = mean, count
+
+        # last centroid
+        means.append(cur_mean)
+        counts.append(cur_count)
+        self.means = means
+        self.counts = counts
+
+    # linear interpolation between the centroid centers. Matches numpy.quantile when all centroids are single values
+    def quantile(self, q):
+        self.__compress__()
+        if (self.total == 0):
+            return None
+
+        # target position
+        target = q * (self.total - 1) + 0.5
+        center = self.counts[0] / 2
+        if (target <= center):
+            return self.min_value + (self.means[0] - self.min_value) * ((target - 0.5) / (center - 0.5) if (center > 0.5) else 1.0)
+
+        # find the neighbouring centroids
+        for i in range(1, len(self.means)):
+            next_center = center + (self.counts[i - 1] + self.counts[i]) / 2
+            if (target <= next_center):
+                return self.means[i - 1] + (self.means[i] - self.means[i - 1]) * (target - center) / (next_center - center)
+            center = next_center
+
+        # right tail
+        remaining = self.total - 0.5 - center
+        return self.means[-1] + (self.max_value - self.means[-1]) * ((target - center) / remaining if (remaining > 0) else 1.0)
+
+    def to_str(self):
+        self.__compress__()
+        min_value = self.min_value if (self.min_value is not None) else 0.0
+        max_value = self.max_value if (self.max_value is not None) else 0.0
+        buf = struct.pack("<dIdd", self.compression, len(self.means), min_value, max_value) + np.array(self.means, dtype = "<f8").tobytes() + \
+            np.array(self.counts, dtype = "<f8").tobytes()
+        return __encode__(TDIGEST_PREFIX, buf)
+
+    @staticmethod
+    def from_str(xstr):
+        buf = __decode__(TDIGEST_PREFIX, xstr)
+        compression, num_centroids, min_value, max_value = struct.unpack_from("<dIdd", buf, 0)
+        offset = struct.calcsize("<dIdd")
+        tdigest = TDigest(compression = compression)
+        tdigest.means = np.frombuffer(buf, dtype = "<f8", count = num_centroids, offset = offset).tolist()
+        tdigest.counts = list([int(t) for t in np.frombuffer(buf, dtype = "<f8", count = num_centroids, offset = offset + 8 * num_centroids)])
+        tdigest.total = sum(tdigest.counts)
+        if (num_centroids > 0):
+            tdigest.min_value = min_value
+            tdigest.max_value = max_value
+        return tdigest
+
+class CountMinSketch:
+    """Frequency estimates that never undercount, with the most frequent values tracked as heavy hitters"""
+
+    def __init__(self, width = 512, depth = 4, num_heavy_hitters = 20):
+        self.width = width
+        self.depth = depth
+        self.num_heavy_hitters = num_heavy_hitters
+        self.table = [0] * (width * depth)
+        self.total = 0
+        self.heavy_hitters = {}
+        self.min_heavy_hitter_count = 0
+
+    def __get_indexes__(self, v):
+        x = __hash64__(v)
+        h1 = x & 0xffffffff
+        h2 = x >> 32
+        return list([i * self.width + (h1 + i * h2) % self.width for i in range(self.depth)])
+
+    def add(self, v, count = 1):
+        v = str(v)
+        self.total = self.total + count
+
+        # update the counters
+        estimate = None
+        for index in self.__get_indexes__(v):
+            self.table[index] = self.table[index] + count
+            estimate = self.table[index] if (estimate is None or self.table[index] < estimate) else estimate
+
+        # update heavy hitters
+        self.__offer__(v, estimate)
+
+    def __offer__(self, v, estimate):
+        if (v in self.heavy_hitters or len(self.heavy_hitters) < self.num_heavy_hitters):
+            self.heavy_hitters[v] = estimate
+        elif (estimate > self.min_heavy_hitter_count):
+            # the stored min can be stale as the counts only increase. Recompute before evicting
+            min_key = min(self.heavy_hitters, key = self.heavy_hitters.get)
+            self.min_heavy_hitter_count = self.heavy_hitters[min_key]
+            if (estimate > self.min_heavy_hitter_count):
+                del self.heavy_hitters[min_key]
+                self.heavy_hitters[v] = estimate
+
+    def estimate(self, v):
+        return min([self.table[index] for index in self.__get_indexes__(str(v))])
+
+    def merge(self, that):
+        if (self.width != that.width or self.depth != that.depth):
+            raise Exception("CountMinSketch: dimension mismatch: ({}, {}), ({}, {})".format(self.width, self.depth, that.width, that.depth))
+
+        # add the counters and estimate the heavy hitters again
+        self.table = list([a + b for a, b in zip(self.table, that.table)])
+        self.total = self.total + that.total
+        candidates = set(self.heavy_hitters.keys()) | set(that.heavy_hitters.keys())
+        self.heavy_hitters = dict(sorted([(k, self.estimate(k)) for k in candidates], key = lambda t: (-t[1], t[0]))[0:self.num_heavy_hitters])
+        self.min_heavy_hitter_count = min(self.heavy_hitters.values()) if (len(self.heavy_hitters) > 0) else 0
+        return self
+
+    # returns list of (value, estimated count) in descending order of count
+    def topk(self, k = 10):
+        return sorted(self.heavy_hitters.items(), key = lambda t: (-t[1], t[0]))[0:k]
+
+    def to_str(self):
+        heavy_hitters = json.dumps(self.topk(self.num_heavy_hitters)).encode("utf-8")
+        buf = struct.pack("<IIIQ", self.width, self.depth, self.num_heavy_hitters, self.total) + np.array(self.table, dtype = "<u8").tobytes() + heavy_hitters
+        return __encode__(CMS_PREFIX, zlib.compress(buf))
+
+    @staticmethod
+    def from_str(xstr):
+        buf = zlib.decompress(__decode__(CMS_PREFIX, xstr))
+        width, depth, num_heavy_hitters, total = struct.unpack_from("<IIIQ", buf, 0)
+        offset = struct.calcsize("<IIIQ")
+        cms = CountMinSketch(width = width, depth = depth, num_heavy_hitters = num_heavy_hitters)
+        cms.table = np.frombuffer(buf, dtype = "<u8", count = width * depth, offset = offset).tolist()
+        cms.total = total
+        cms.heavy_hitters = dict([(k, c) for k, c in json.loads(buf[offset + 8 * width * depth:].decode("utf-8"))])
+        cms.min_heavy_hitter_count = min(cms.heavy_hitters.values()) if (len(cms.heavy_hitters) > 0) else 0
+        return cms
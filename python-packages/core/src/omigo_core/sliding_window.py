@@ -0,0 +1,173 @@
+"""Window aggregation engine used by window_aggregate.
+
+The windows are ranges of ranks over the sorted unique values of the window column, and both the start and end rank
+are non decreasing. The rows of each group are swept once in rank order, adding the rows that enter the window and
+removing the ones that leave it. The aggregation functions with sliding accumulators are updated incrementally, and
+the rest are called with the list of values in each window"""
+import bisect
+import datetime
+import math
+from omigo_core import utils, accumulators, timefuncs
+
+# returns the sorted unique values of the window column and their sort keys. Time based windows use the value in seconds
+def get_sorted_values(values, time_based):
+    uniq_values = set(values)
+    if (time_based == True):
+        pairs = sorted([(__parse_time__(v), v) for v in uniq_values])
+        return list([t[1] for t in pairs]), list([t[0] for t in pairs])
+    else:
+        sorted_values = sorted(uniq_values)
+        return sorted_values, sorted_values
+
+# numeric values are taken as seconds, and the rest as datetime strings in utc. The iso format is tried first as it is much faster
+def __parse_time__(v):
+    try:
+        return float(v)
+    except ValueError:
+        pass
+
+    try:
+        dt = datetime.datetime.fromisoformat(v)
+        if (dt.tzinfo is None):
+            dt = dt.replace(tzinfo = datetime.timezone.utc)
+        return dt.timestamp()
+    except ValueError:
+        return timefuncs.datetime_to_utctimestamp_sec(v)
+
+# returns the list of (start_rank, end_rank) for each window
+def get_windows(sort_keys, winsize, sliding, time_based):
+    num_values = len(sort_keys)
+    windows = []
+
+    # count based windows of winsize unique values
+    if (time_based == False):
+        if (sliding == True):
+            for i in range(num_values - (winsize - 1)):
+                windows.append((i, i + winsize - 1))
+        else:
+            for i in range(int(math.ceil(1.0 * num_values / winsize))):
+                windows.append((i * winsize, min(num_values - 1, i * winsize + winsize - 1)))
+
+        # return
+        return windows
+
+    # sliding time based windows end at each value and cover the previous winsize seconds
+    if (sliding == True):
+        start = 0
+        for end in range(num_values):
+            while (sort_keys[start] <= sort_keys[end] - winsize):
+                start = start + 1
+            windows.append((start, end))
+    else:
+        # fixed time based windows are aligned to multiples of winsize seconds
+        start = 0
+        for end in range(num_values):
+            if (end == num_values - 1 or math.floor(sort_keys[end + 1] / winsize) != math.floor(sort_keys[end] / winsize)):
+                windows.append((start, end))
+                start = end + 1
+
+    # return
+    return windows
+
+# returns the list of (first_row_position, window_index, group_key, agg_values) for each window that has rows of the group.
+# group_rows is the list of (rank, row_position, agg_values) sorted by rank
+def aggregate_group(group_key, group_rows, windows, window_ends, agg_funcs):
+    factories = list([accumulators.get_sliding_accumulator_factory(agg_func) for agg_func in agg_funcs])
+    accs = list([factory() if (factory is not None) else None for factory in factories])
+    num_rows = len(group_rows)
+    results = []
+
+    # monotonic deque for the first row position in the window
+    positions = []
+    positions_start = 0
+
+    # start with the first window that has the first row
+    start = 0
+    end = 0
+    w = bisect.bisect_left(window_ends, group_rows[0][0])
+    while (w < len(windows) and start < num_rows):
+        (start_rank, end_rank) = windows[w]
+
+        # add the rows entering the window
+        while (end < num_rows and group_rows[end][0] <= end_rank):
+            (rank, pos, values) = group_rows[end]
+            for j in range(len(accs)):
+                if (accs[j] is not None):
+                    accs[j].add(values[j])
+            while (len(positions) > positions_start and positions[-1] > pos):
+                positions.pop()
+            positions.append(pos)
+            end = end + 1
+
+        # remove the rows leaving the window
+        while (start < end and group_rows[start][0] < start_rank):
+            (rank, pos, values) = group_rows[start]
+            for j in range(len(accs)):
+                if (accs[j] is not None):
+                    accs[j].remove(values[j])
+            if (positions[positions_start] == pos):
+                positions_start = positions_start + 1
+            start = start + 1
+
+        # move to the next window that can have rows of this group
+        if (start == end):
+            if (end == num_rows):
+                break
+            w = max(w + 1, bisect.bisect_left(window_ends, group_rows[end][0]))
+            continue
+
+        # compute the aggregation
+        agg_values = []
+        for j in range(len(accs)):
+            if (accs[j] is not None):
+                agg_value = accs[j].result()
+            else:
+                agg_value = agg_funcs[j](list([str(group_rows[i][2][j]) for i in range(start, end)]))
+            agg_values.append(str(agg_value) if (agg_value is not None) else "")
+
+        # append
+        results.append((positions[positions_start], w, group_key, agg_values))
+        w = w + 1
+
+        # compact the deque
+        if (positions_start > 1024):
+            positions = positions[positions_start:]
+            positions_start = 0
+
+    # return
+    return results
+
+# returns the list of (group_values, window_start_value, window_end_value, agg_values) in the order of first occurrence
+def aggregate(data_fields, group_indexes, win_index, agg_indexes, agg_funcs, winsize, sliding, time_based, dmsg = ""):
+    dmsg = utils.extend_inherit_message(dmsg, "sliding_window.aggregate")
+
+    # find the windows
+    win_values = list([fields[win_index] for fields in data_fields])
+    sorted_values, sort_keys = get_sorted_values(win_values, time_based)
+    rank_map = dict([(sorted_values[i], i) for i in range(len(sorted_values))])
+    windows = get_windows(sort_keys, winsize, sliding, time_based)
+    window_ends = list([t[1] for t in windows])
+    utils.debug("{}: number of values: {}, number of windows: {}".format(dmsg, len(sorted_values), len(windows)))
+
+    # rows of each group
+    groups_map = {}
+    pos = 0
+    for fields in data_fields:
+        group_key = tuple([fields[i] for i in group_indexes])
+        if (group_key not in groups_map.keys()):
+            groups_map[group_key] = []
+        groups_map[group_key].append((rank_map[win_values[pos]], pos, list([fields[i] for i in agg_indexes])))
+        pos = pos + 1
+
+    # sweep each group. sort is stable so rows with same rank stay in the data order
+    results = []
+    if (len(windows) > 0):
+        for group_key, group_rows in groups_map.items():
+            group_rows.sort(key = lambda t: t[0])
+            results.extend(aggregate_group(group_key, group_rows, windows, window_ends, agg_funcs))
+
+    # same order as the rows were seen
+    results.sort(key = lambda t: (t[0], t[1]))
+
+    # return
+    return list([(group_key, sorted_values[windows[w][0]], sorted_values[windows[w][1]], agg_values) for (pos, w, group_key, agg_values) in results])
@@ -1,10 +1,11 @@
 """library of function to be used in calling lambda functions"""
 
+import json
 import statistics
 import numpy as np
 from dateutil import parser
 import datetime
-from omigo_core import utils
+from omigo_core import utils, sketches
 
 def file_base_name(x):
     if (len(x) <= 1):
@@ -222,7 +223,7 @@ def quantile(xs, start = 0, end = 1, by = 0.25, precision = 4):
         cur = cur + by
 
     format_str = "{:." + str(precision) + "f}"
-    quan = np.quantile(str_arr_to_float(xs), qarr)
+    quan = np.quantile([float(x) for x in xs], qarr)
     return ",".join(format_str.format(x) for x in quan)
 
 def quantile4(xs):
@@ -234,6 +235,98 @@ def quantile10(xs):
 def quantile40(xs):
     return quantile(xs, by=1/40)
 
+# approximate versions using mergeable sketches. The *_sketch functions return the serialized sketch that can be merged
+# later with *_merge, for example across partitions or hydra tasks, and read with the estimate functions
+def hll_sketch(vs):
+    hll = sketches.HyperLogLog()
+    for v in vs:
+        if (v.strip() != ""):
+            hll.add(v)
+    return hll.to_str()
+
+def hll_merge(vs):
+    hll = sketches.HyperLogLog()
+    for v in vs:
+        hll.merge(sketches.HyperLogLog.from_str(v))
+    return hll.to_str()
+
+def hll_estimate(x):
+    return sketches.HyperLogLog.from_str(x).estimate()
+
+# approximate uniq_count
+def approx_uniq_count(vs):
+    return hll_estimate(hll_sketch(vs))
+
+def tdigest_sketch(vs):
+    tdigest = sketches.TDigest()
+    for v in vs:
+        tdigest.add(v)
+    return tdigest.to_str()
+
+def tdigest_merge(vs):
+    tdigest = sketches.TDigest()
+    for v in vs:
+        tdigest.merge(sketches.TDigest.from_str(v))
+    return tdigest.to_str()
+
+# same output format as quantile
+def tdigest_quantile(x, start = 0, end = 1, by = 0.25, precision = 4):
+    if (start > end):
+        raise Exception("Start: {} > End: {}".format(start, end))
+
+    return __tdigest_quantile__(sketches.TDigest.from_str(x), start = start, end = end, by = by, precision = precision)
+
+def __tdigest_quantile__(tdigest, start = 0, end = 1, by = 0.25, precision = 4):
+    format_str = "{:." + str(precision) + "f}"
+    qarr = []
+    cur = start
+    while (cur < end):
+        qarr.append(cur)
+        cur = cur + by
+    return ",".join(format_str.format(tdigest.quantile(q)) for q in qarr)
+
+def tdigest_quantile4(x):
+    return tdigest_quantile(x)
+
+def tdigest_quantile10(x):
+    return tdigest_quantile(x, by=1/10)
+
+def __tdigest_quantile4__(tdigest):
+    return __tdigest_quantile__(tdigest)
+
+def __tdigest_quantile10__(tdigest):
+    return __tdigest_quantile__(tdigest, by=1/10)
+
+# approximate quantile4 and quantile10
+def approx_quantile4(xs):
+    return tdigest_quantile4(tdigest_sketch(xs))
+
+def approx_quantile10(xs):
+    return tdigest_quantile10(tdigest_sketch(xs))
+
+def cms_sketch(vs):
+    cms = sketches.CountMinSketch()
+    for v in vs:
+        cms.add(v)
+    return cms.to_str()
+
+def cms_merge(vs):
+    cms = sketches.CountMinSketch()
+    for v in vs:
+        cms.merge(sketches.CountMinSketch.from_str(v))
+    return cms.to_str()
+
+# json map of the most frequent values to their counts
+def cms_topk(x, k = 10):
+    return __cms_topk__(sketches.CountMinSketch.from_str(x), k = k)
+
+def __cms_topk__(cms, k = 10):
+    return json.dumps(dict(cms.topk(k)))
+
+# approximate top 10 values with counts
+def approx_topk(vs):
+    return cms_topk(cms_sketch(vs))
+
 def max_str(xs):
     utils.warn_once("max_str is deprecated. Use maxstr")
     xs = sorted(xs)
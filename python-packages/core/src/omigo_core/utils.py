@@ -20,6 +20,7 @@ TRACE_MSG_CACHE = {}
 EXCEPTION_AFTER_WARNINGS_MSG_CACHE = {}
 RATE_LIMIT_AFTER_WARNINGS_MSG_CACHE = {}
 NOOP_AFTER_WARNINGS_MSG_CACHE= {}
+INHERIT_MSG_CACHE = {}
 
 # some env variables
 OMIGO_CRITICAL = "OMIGO_CRITICAL"
@@ -35,6 +36,9 @@ OMIGO_CODE_TODO_WARNING = "OMIGO_CODE_TODO_WARNING"
 OMIGO_BIG_TSV_WARN_SIZE_THRESH = "OMIGO_BIG_TSV_WARN_SIZE_THRESH"
 OMIGO_RATE_LIMIT_N_WARNINGS = "OMIGO_RATE_LIMIT_N_WARNINGS"
 OMIGO_NOOP_N_WARNINGS = "OMIGO_NOOP_N_WARNINGS"
+OMIGO_SORT_MAX_RUN_ROWS = "OMIGO_SORT_MAX_RUN_ROWS"
+OMIGO_SORT_TMP_DIR = "OMIGO_SORT_TMP_DIR"
+OMIGO_PROGRESS_TICKER_INTERVAL_SEC = "OMIGO_PROGRESS_TICKER_INTERVAL_SEC"
 
 def is_critical():
     return str(os.environ.get(OMIGO_CRITICAL, "1")) == "1"
@@ -75,6 +79,30 @@ def get_big_tsv_warn_size_thresh():
 def set_big_tsv_warn_size_thresh(thresh):
     os.environ[OMIGO_BIG_TSV_WARN_SIZE_THRESH] = str(thresh)
 
+# number of rows in each sorted run that external_sort spills to disk
+def get_sort_max_run_rows():
+    return int(os.environ.get(OMIGO_SORT_MAX_RUN_ROWS, "1000000"))
+
+def set_sort_max_run_rows(max_run_rows):
+    os.environ[OMIGO_SORT_MAX_RUN_ROWS] = str(max_run_rows)
+
+def get_sort_tmp_dir():
+    return os.environ.get(OMIGO_SORT_TMP_DIR)
+
+def set_sort_tmp_dir(tmp_dir):
+    os.environ[OMIGO_SORT_TMP_DIR] = str(tmp_dir)
+
+# interval at which the background ticker prints the progress of the running operators
+def get_progress_ticker_interval_sec():
+    return float(os.environ.get(OMIGO_PROGRESS_TICKER_INTERVAL_SEC, "5"))
+
+def set_progress_ticker_interval_sec(interval_sec):
+    os.environ[OMIGO_PROGRESS_TICKER_INTERVAL_SEC] = str(interval_sec)
+
+# returns true if the progress needs to be reported for the given number of rows
+def is_report_progress_enabled(total):
+    return is_debug() and get_report_progress() > 0 and total >= get_report_progress_min_thresh()
+
 def trace(msg):
     if (is_trace()):
         print("[TRACE]: {}".format(msg))
@@ -574,6 +602,24 @@ def resolve_default_parameter(name, value, default_value, msg):
     return value
 
 def extend_inherit_message(old_msg, new_msg):
+     # check cache as this is called by every method
+     global INHERIT_MSG_CACHE
+     cache_key = (old_msg, new_msg)
+     if (cache_key in INHERIT_MSG_CACHE):
+         return INHERIT_MSG_CACHE[cache_key]
+
+     # check if the cache has become too big
+     if (len(INHERIT_MSG_CACHE) >= MSG_CACHE_MAX_LEN):
+         INHERIT_MSG_CACHE = {}
+
+     # compute
+     result = __extend_inherit_message__(old_msg, new_msg)
+     INHERIT_MSG_CACHE[cache_key] = result
+
+     # return
+     return result
+
+def __extend_inherit_message__(old_msg, new_msg):
      # check if both msgs are defined
      if (old_msg is not None and new_msg is not None):
          parts1 = list([t.strip() for t in old_msg.split(":")])
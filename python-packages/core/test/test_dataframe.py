@@ -0,0 +1,247 @@
+import json
+import pickle
+import time
+import unittest
+from unittest import mock
+from omigo_core import dataframe, udfs, utils, external_sort, otsv, instrumentation, codegen
+from omigo_core.expressions import col
+
+class TestDataFrame(unittest.TestCase):
+    def create_df1(self):
+        return dataframe.DataFrame(["name", "count", "score"], [["x", "1", "1.5"], ["y", "02", "2.0"], ["x", "3", "abc"]])
+
+    def test_columnar1(self):
+        xdf = self.create_df1().to_columnar()
+        self.assertTrue(xdf.is_columnar())
+        self.assertEqual(list(xdf.get_data_fields()), self.create_df1().get_data_fields())
+
+    def test_columnar2(self):
+        xdf = self.create_df1().to_columnar().select(["score", "name"])
+        self.assertEqual(list(xdf.get_data_fields()), [["1.5", "x"], ["2.0", "y"], ["abc", "x"]])
+        self.assertEqual(xdf.take(1).to_row_major().get_data_fields(), [["1.5", "x"]])
+
+    def test_lazy1(self):
+        xdf = self.create_df1().lazy() \
+            .transform("count", lambda t: int(t) * 2, "count2") \
+            .filter("name", lambda t: t == "x") \
+            .select(["name", "count2"])
+        self.assertEqual(xdf.explain().split("\n")[0], "fused: [filter: name, transform: count, select: ['name', 'count2']]")
+        self.assertEqual(xdf.collect().get_data_fields(), [["x", "2"], ["x", "6"]])
+        func = lambda t: [t[0], int(t[1])]
+        eager_xdf = self.create_df1().transform(["name", "count"], func, ["name2", "count2"], use_array_notation = True)
+        lazy_xdf = self.create_df1().lazy().transform(["name", "count"], func, ["name2", "count2"], use_array_notation = True).collect()
+        self.assertEqual(lazy_xdf.get_data_fields(), eager_xdf.get_data_fields())
+
+    def test_vectorized_filter1(self):
+        xdf = self.create_df1()
+        self.assertEqual(xdf.gt_int("count", 1).col_as_array("name"), ["y", "x"])
+        self.assertEqual(xdf.values_in("name", ["x"]).col_as_array("count"), ["1", "3"])
+        self.assertEqual(xdf.to_columnar().not_startswith("score", "1").col_as_array("score"), ["2.0", "abc"])
+
+    def test_aggregate1(self):
+        xdf = self.create_df1().aggregate("name", ["count", "count", "score"], [udfs.sumint, udfs.get_len, udfs.mkstr])
+        self.assertEqual(xdf.get_header_fields(), ["name", "count:sumint", "count:get_len", "score:mkstr"])
+        self.assertEqual(xdf.get_data_fields(), [["x", "4", "2", "1.5,abc"], ["y", "2", "1", "2.0"]])
+
+    def test_join1(self):
+        xdf1 = self.create_df1()
+        xdf2 = dataframe.DataFrame(["name", "label"], [["x", "l1"], ["z", "l2"]])
+        self.assertEqual(xdf1.inner_join(xdf2, "name").col_as_array("count"), ["1", "3"])
+        self.assertEqual(xdf1.left_join(xdf2, "name").col_as_array("label"), ["l1", "", "l1"])
+        self.assertEqual(xdf1.outer_join(xdf2, "name").col_as_array("name"), ["x", "y", "x", "z"])
+
+    def test_join2(self):
+        # the output order is same whichever side is the build side of the hash join, and for sort merge join
+        left_data_fields = [["c", "0"], ["b", "1"], ["a", "2"], ["b", "3"], ["c", "4"], ["d", "5"]]
+        right_data_fields = [["b", "r0"], ["e", "r1"], ["a", "r2"], ["b", "r3"], ["f", "r4"], ["a", "r5"], ["e", "r6"]]
+        expected = [["c", "0", ""], ["b", "1", "r0"], ["b", "1", "r3"], ["a", "2", "r2"], ["a", "2", "r5"], ["b", "3", "r0"], ["b", "3", "r3"],
+            ["c", "4", ""], ["d", "5", ""], ["e", "", "r1"], ["f", "", "r4"], ["e", "", "r6"]]
+        for (num_left_extra, num_right_extra) in [(0, 0), (2, 0), (0, 2)]:
+            # extra rows with no match change which side is bigger
+            left_extra = list([["h", "y{}".format(i)] for i in range(num_left_extra)])
+            right_extra = list([["g", "x{}".format(i)] for i in range(num_right_extra)])
+            left_xdf = dataframe.new_with_cols(["name", "count"], data_fields = left_data_fields + left_extra)
+            right_xdf = dataframe.new_with_cols(["name", "label"], data_fields = right_data_fields + right_extra)
+            left_expected = expected[0:9] + list([fields + [""] for fields in left_extra])
+            right_expected = expected[9:] + list([[fields[0], "", fields[1]] for fields in right_extra])
+            self.assertEqual(left_xdf.outer_join(right_xdf, "name").get_data_fields(), left_expected + right_expected)
+            self.assertEqual(left_xdf.left_join(right_xdf, "name").get_data_fields(), left_expected)
+            self.assertEqual(left_xdf.inner_join(right_xdf, "name").get_data_fields(), list([fields for fields in left_expected if (fields[2] != "")]))
+
+        # sorted inputs
+        left_xdf = dataframe.new_with_cols(["name", "count"], data_fields = sorted(left_data_fields))
+        right_xdf = dataframe.new_with_cols(["name", "label"], data_fields = sorted(right_data_fields))
+        self.assertEqual(left_xdf.outer_join(right_xdf, "name").get_data_fields(), [["a", "2", "r2"], ["a", "2", "r5"], ["b", "1", "r0"], ["b", "1", "r3"],
+            ["b", "3", "r0"], ["b", "3", "r3"], ["c", "0", ""], ["c", "4", ""], ["d", "5", ""], ["e", "", "r1"], ["e", "", "r6"], ["f", "", "r4"]])
+
+    def test_sort1(self):
+        xdf = self.create_df1()
+        self.assertEqual(xdf.sort("count").col_as_array("count"), ["1", "02", "3"])
+        self.assertEqual(xdf.sort(["name", "score"], reverse = True).col_as_array("score"), ["2.0", "abc", "1.5"])
+
+    def test_external_sort1(self):
+        xdf = self.create_df1()
+        chunks = external_sort.sort_chunks([xdf.take(2), xdf.skip(2)], "name", reverse = True, max_run_rows = 1, chunk_rows = 2)
+        self.assertEqual(list([t.num_rows() for t in chunks]), [2, 1])
+        self.assertEqual(list(external_sort.sort_chunks([xdf.take(0)], "name")), [])
+        values = ["3", "nan", "1", "-inf", "NaN", "2", "1", "10", "abc", "", "9", "é", "日本", "a\rb"]
+        xdf = dataframe.new_with_cols(["value", "id"], data_fields = list([[values[i], str(i)] for i in range(len(values))]))
+        for (sort_xdf, all_numeric) in [(xdf.take(8), True), (xdf, False)]:
+            for reverse in [False, True]:
+                expected = sort_xdf.sort(["value"], reverse = reverse, all_numeric = all_numeric).get_data_fields()
+                chunks = [sort_xdf.take(3), sort_xdf.skip(3)]
+                data_fields = list([fields for t in external_sort.sort_chunks(chunks, ["value"], reverse = reverse, all_numeric = all_numeric, max_run_rows = 2) for fields in t.get_data_fields()])
+                self.assertEqual(data_fields, expected)
+        self.assertEqual(xdf.take(8).sort("value").col_as_array("id"), ["3", "2", "6", "5", "0", "7", "1", "4"])
+
+    def test_otsv1(self):
+        xdf = otsv.decode(otsv.encode(self.create_df1()))
+        self.assertTrue(xdf.is_columnar())
+        self.assertEqual(list(xdf.get_data_fields()), self.create_df1().get_data_fields())
+        self.assertEqual(otsv.decode(otsv.encode(xdf), cols = ["score", "name"]).get_header_fields(), ["score", "name"])
+
+    def test_col_stats1(self):
+        xdf = self.create_df1()
+        self.assertEqual(xdf.get_col_stats("count").to_map(), {"inferred_type": "int", "num_rows": 3, "empty_count": 0, "min_value": 1, "max_value": 3, "distinct_count": 3})
+        self.assertEqual(xdf.get_col_stats("score").inferred_type, "str")
+        self.assertEqual(xdf.get_col_stats("name").distinct_count, 2)
+        self.assertIs(xdf.drop_cols("score").rename("count", "cnt").get_col_stats("cnt"), xdf.get_col_stats("count"))
+        self.assertEqual(xdf.to_df()["count"].tolist(), [1, 2, 3])
+
+    def test_instrumentation1(self):
+        instrumentation.reset()
+        instrumentation.enable()
+        try:
+            self.create_df1().eq_str("name", "x").select(["name", "count"])
+        finally:
+            instrumentation.disable()
+        stats_map = dict([(t["name"], t) for t in instrumentation.get_operator_stats()])
+        self.assertEqual((stats_map["eq_str"]["rows_in"], stats_map["eq_str"]["rows_out"]), (3, 2))
+        self.assertEqual(stats_map["select"]["num_calls"], 1)
+
+    def test_profile1(self):
+        with dataframe.profile() as p:
+            self.create_df1().custom_func(lambda x: x.eq_str("name", "x", dmsg = "test")).select(["name", "count"])
+        xdf = p.to_df()
+        self.assertEqual(xdf.col_as_array("method"), ["custom_func:<lambda>", "eq_str", "select"])
+        self.assertEqual(xdf.col_as_array("parent_id"), ["", "0", ""])
+        self.assertEqual(xdf.col_as_array("dmsg"), ["", "test", ""])
+        self.assertEqual(xdf.col_as_array("rows_out"), ["2", "2", "2"])
+        self.assertEqual(len(p.get_folded_stacks()), 3)
+
+    def test_profile2(self):
+        # slow size_in_bytes of the nested call is not counted in the self time of the parent
+        def __slow_size_in_bytes__(xdf):
+            time.sleep(0.05)
+            return 0
+
+        with mock.patch.object(dataframe.DataFrame, "size_in_bytes", __slow_size_in_bytes__):
+            with dataframe.profile() as p:
+                self.create_df1().custom_func(lambda x: x.take(2, "pos"))
+        xdf = p.to_df()
+        self.assertEqual(xdf.col_as_array("dmsg"), ["", "pos"])
+        self.assertTrue(float(xdf.col_as_array("self_sec")[0]) < 0.05)
+        self.assertTrue(float(xdf.col_as_array("elapsed_sec")[0]) >= 0.1)
+
+    def test_explode_json1(self):
+        events = [{"id": 1, "user": {"name": "a"}, "tags": ["t1", "t2"]}, {"id": 2, "ls": [{"k": 1}, {"k": 2}]}, {"id": 3, "user": {"name": "c\tx"}}]
+        xdf = dataframe.new_with_cols(["event"], data_fields = list([[utils.url_encode(json.dumps(t))] for t in events]))
+        fast_xdf = xdf.explode_json("event", prefix = "ev", collapse = True)
+        generic_xdf = xdf.explode_json("event", prefix = "ev", collapse = True, max_results = 100)
+        self.assertEqual(fast_xdf.get_header_fields(), generic_xdf.get_header_fields())
+        self.assertEqual(fast_xdf.get_data_fields(), generic_xdf.get_data_fields())
+        self.assertEqual(fast_xdf.col_as_array("ev:tags"), ["t1", "t2", "", "", ""])
+        self.assertEqual(fast_xdf.col_as_array("ev:user:name"), ["a", "a", "", "", "c x"])
+
+    def test_sketches1(self):
+        vs = list([str(i % 1000) for i in range(5000)])
+        self.assertTrue(abs(udfs.approx_uniq_count(vs) - 1000) < 50)
+        self.assertEqual(udfs.hll_estimate(udfs.hll_merge([udfs.hll_sketch(vs[0:2500]), udfs.hll_sketch(vs[2500:])])), udfs.approx_uniq_count(vs))
+        self.assertEqual(udfs.approx_quantile4(["3", "1", "2", "10"]), udfs.quantile4(["3", "1", "2", "10"]))
+        self.assertEqual(udfs.tdigest_quantile4(udfs.tdigest_merge([udfs.tdigest_sketch(["3", "1"]), udfs.tdigest_sketch(["2", "10"])])), "1.0000,1.7500,2.5000,4.7500")
+        xdf = self.create_df1()
+        self.assertEqual(xdf.aggregate("name", ["count"], [udfs.approx_uniq_count]).col_as_array("count:approx_uniq_count"), ["2", "1"])
+        self.assertEqual(xdf.group_count("name", topk = 1).get_data_fields(), [["x", "2", "0.666667"]])
+        self.assertEqual(json.loads(udfs.approx_topk(["a", "b", "a"])), {"a": 2, "b": 1})
+
+        # values with the separators
+        xdf = dataframe.new_with_cols(["name", "value"], data_fields = [["x", "a,b:1"], ["x", "a,b:1"], ["x", "c:2"], ["y", "2"]])
+        self.assertEqual(json.loads(xdf.aggregate("name", ["value"], [udfs.approx_topk]).col_as_array("value:approx_topk")[0]), {"a,b:1": 2, "c:2": 1})
+        xdf = dataframe.new_with_cols(["name", "value"], data_fields = [["x", "3"], ["x", "1"], ["x", "2"], ["x", "10"]])
+        self.assertEqual(xdf.aggregate("name", ["value"], [udfs.approx_quantile4]).col_as_array("value:approx_quantile4"), [udfs.quantile4(["3", "1", "2", "10"])])
+
+    def test_window_aggregate1(self):
+        xdf = dataframe.new_with_cols(["ts", "value"], data_fields = [["10", "5"], ["11", "1"], ["12", "4"], ["20", "2"]])
+        sliding_xdf = xdf.window_aggregate("ts", ["value", "value"], [udfs.sumint, udfs.maxint], 2, sliding = True)
+        self.assertEqual(sliding_xdf.get_data_fields(), [["10 - 11", "6", "5"], ["11 - 12", "5", "4"], ["12 - 20", "6", "4"]])
+        time_xdf = xdf.window_aggregate("ts", ["value"], [udfs.get_len], 5, sliding = True, time_based = True)
+        self.assertEqual(time_xdf.col_as_array("value:get_len"), ["1", "2", "3", "1"])
+        self.assertEqual(time_xdf.col_as_array("ts"), ["10 - 10", "10 - 11", "10 - 12", "20 - 20"])
+
+    def test_rowview1(self):
+        xdf = self.create_df1()
+        view_xdf = xdf.eq_str("name", "x").select(["count", "name"]).take(5)
+        self.assertTrue(view_xdf.is_view())
+        self.assertIs(view_xdf.get_data_fields().rows, xdf.get_data_fields())
+        self.assertEqual(view_xdf.get_data_fields(), [["1", "x"], ["3", "x"]])
+        self.assertEqual(pickle.loads(pickle.dumps(view_xdf.get_data_fields())), [["1", "x"], ["3", "x"]])
+        self.assertEqual(view_xdf.last(1).get_data_fields(), [["3", "x"]])
+        view_xdf.get_data_fields().append(["4", "z"])
+        self.assertEqual(view_xdf.num_rows(), 3)
+        self.assertEqual(xdf.num_rows(), 3)
+        self.assertFalse(view_xdf.to_row_major().is_view())
+
+    def test_rowview2(self):
+        view_xdf = self.create_df1().eq_str("name", "x").select(["count", "name"])
+        self.assertEqual(view_xdf.gt_int("count", 1).col_as_array("count"), ["3"])
+        self.assertEqual(view_xdf.sort("count", all_numeric = True).col_as_array("count"), ["1", "3"])
+        self.assertEqual(view_xdf.get_col_stats("count").num_rows, 2)
+        view_xdf.get_data_fields()[0] = ["9", "x"]
+        view_xdf.get_data_fields().append(["5", "z"])
+        self.assertEqual(view_xdf.gt_int("count", 1).col_as_array("count"), ["9", "3", "5"])
+        self.assertEqual(view_xdf.sort("count", all_numeric = True).col_as_array("count"), ["3", "5", "9"])
+        self.assertEqual(view_xdf.get_col_stats("count").num_rows, 3)
+
+    def test_codegen1(self):
+        xdf = self.create_df1()
+        self.assertEqual(xdf.filter(["name", "count"], lambda x, y: x == "x" and y != "1").get_data_fields(), [["x", "3", "abc"]])
+        self.assertIs(codegen.compile_filter((0, 1), False), codegen.compile_filter((0, 1), False))
+        self.assertEqual(xdf.transform(["name", "count"], lambda x, y: [x + y, None], ["xy", "empty"]).col_as_array("xy"), ["x1", "y02", "x3"])
+        self.assertEqual(xdf.transform(["count"], lambda t: None, "empty").col_as_array("empty"), ["", "", ""])
+        wide_xdf = dataframe.new_with_cols(list(["col{}".format(i) for i in range(20)]), data_fields = [list([str(i) for i in range(20)])])
+        self.assertEqual(wide_xdf.transform(wide_xdf.get_header_fields(), lambda *args: len(args), "num").col_as_array("num"), ["20"])
+
+    def test_expressions1(self):
+        xdf = self.create_df1()
+        self.assertEqual(xdf.filter((col("count").to_int() > 1) & col("name").startswith("x")).get_data_fields(), [["x", "3", "abc"]])
+        self.assertEqual(xdf.exclude_filter(col("name") == "x").col_as_array("count"), ["02"])
+        self.assertEqual(xdf.transform(col("score").to_float(default = 0.0) * 2, "score2").col_as_array("score2"), ["3.0", "4.0", "0.0"])
+        self.assertEqual(xdf.add_const("upper", col("name").upper()).col_as_array("upper"), ["X", "Y", "X"])
+        self.assertEqual(xdf.aggregate("name", [col("count").to_int().alias("num")], [udfs.sumint]).get_data_fields(), [["x", "4"], ["y", "2"]])
+        filter_expr = col("name").isin(["y"])
+        self.assertEqual(filter_expr.get_cols(), ["name"])
+        self.assertEqual(list(otsv.decode(otsv.encode(xdf), cols = ["count"], filter_expr = filter_expr).get_data_fields()), [["02"]])
+
+        # raw columns are compared with strings only
+        for filter_func in [lambda: col("count") == 1, lambda: col("count") > 1, lambda: 1 != col("count"), lambda: col("count").isin([1, "3"])]:
+            with self.assertRaises(Exception) as context:
+                xdf.filter(filter_func())
+            self.assertIn("to_int()", str(context.exception))
+        self.assertEqual(xdf.filter(col("count").to_int() == 1).col_as_array("count"), ["1"])
+        self.assertEqual(xdf.create_index("count").filter(col("count").isin(["1", "3"])).col_as_array("count"), ["1", "3"])
+
+    def test_hash_index1(self):
+        xdf = self.create_df1().create_index("name")
+        self.assertTrue(xdf.has_index("name"))
+        self.assertEqual(xdf.eq_str("name", "x").col_as_array("count"), ["1", "3"])
+        self.assertEqual(xdf.values_not_in("name", ["x"]).col_as_array("count"), ["02"])
+        self.assertEqual(xdf.filter(col("name") == "y").col_as_array("count"), ["02"])
+        self.assertEqual(xdf.create_index("count").cols_as_map("count", "name"), {"1": "x", "02": "y", "3": "x"})
+        self.assertFalse(xdf.eq_str("name", "x").has_index("name"))
+        self.assertTrue(xdf.select(["name", "score"]).has_index("name"))
+        self.assertEqual(otsv.decode(otsv.encode(xdf)).get_index("name").lookup("x").tolist(), [0, 2])
+        left_xdf = dataframe.new_with_cols(["name", "value"], data_fields = [["x", "a"], ["z", "b"]])
+        self.assertEqual(left_xdf.__map_join__(xdf.select(["name", "count"]), "name").get_data_fields(), [["x", "a", "1"], ["x", "a", "3"]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,19 +1,19 @@
 # package for doing multi threading on specific apis
 
-from concurrent.futures import ThreadPoolExecutor
-from omigo_core import tsv
-from omigo_core import tsvutils
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from omigo_core import dataframe
 from omigo_core import utils
 
 import math
 import time
 
-class MultiThreadTSV(tsv.TSV):
-    def __init__(self, header, data, num_par = 0, status_check_interval_sec = 10, sleep_interval_sec = 0.11, num_batches = 10, dmsg = ""):
-        super().__init__(header, data)
+class MultiThreadTSV(dataframe.DataFrame):
+    def __init__(self, header_fields, data_fields, num_par = 0, status_check_interval_sec = 10, sleep_interval_sec = 0.11, num_batches = 10, use_process_pool = False, dmsg = ""):
+        super().__init__(header_fields, data_fields)
         self.num_par = num_par
         self.status_check_interval_sec = status_check_interval_sec
         self.sleep_interval_sec = sleep_interval_sec
+        self.use_process_pool = use_process_pool
         self.dmsg = utils.extend_inherit_message(dmsg, "MultiThreadTSV")
 
         # check if num_par is more than number of rows
@@ -24,13 +24,13 @@ class MultiThreadTSV(tsv.TSV):
         # set the num_batches for better splitting
         self.num_batches = num_batches if (num_batches > num_par) else num_par
 
+    # func is called on each batch. With use_process_pool, func and its arguments need to be picklable, for example module level functions
     def parallelize(self, func, *args, **kwargs):
         # trace
-        utils.trace("{}: parallelize: func: {}, args: {}, kwargs: {}".format(self.dmsg, func, *args, **kwargs))
+        utils.trace("{}: parallelize: func: {}, args: {}, kwargs: {}".format(self.dmsg, func, args, kwargs))
 
         # split the data into num_par partitions
         batch_size = int(math.ceil(self.num_rows() / self.num_batches))
-        future_results = []
 
         # take start_time
         ts_start = time.time()
@@ -41,47 +41,47 @@ class MultiThreadTSV(tsv.TSV):
             combined_result = __parallelize__(self, func, *args, **kwargs)
         else:
             # print batch size
-            utils.debug("{}: num_rows: {}, num_par: {}, num_batches: {}, batch_size: {}, status_check_interval_sec: {}".format(self.dmsg,
-                self.num_rows(), self.num_par, self.num_batches, batch_size, self.status_check_interval_sec))
-
-            # run thread pool
-            with ThreadPoolExecutor(max_workers = self.num_par) as executor:
-                # execute batches concurrently based on num_par and batch_size
-                for i in range(self.num_batches):
-                    batch_i = self.skip_rows(batch_size * i).take(batch_size)
-                    # TODO: rewrite this logic. Right now dont submit empty batches
-                    if (batch_i.num_rows() > 0):
-                        future_results.append(executor.submit(__parallelize__, batch_i, func, *args, **kwargs))
-
-                # track total waiting time
-                time_elapsed = 0
-                # run while loop
-                while True:
-                    done_count = 0
-                    for f in future_results:
-                        if (f.done() == True):
-                            done_count = done_count + 1
-
-                    # debug
-                    utils.debug("{}: parallelize: done_count: {}, total: {}".format(self.dmsg, done_count, len(future_results)))
-
-                    # check if all are done
-                    if (done_count < len(future_results)):
-                        # sleep for some additional time to allow notebook stop method to work
-                        utils.debug("{}: parallelize: futures not completed yet. Sleeping for {} sec. Time elapsed: {} sec".format(self.dmsg, self.status_check_interval_sec, time_elapsed))
-                        time.sleep(self.status_check_interval_sec)
-                        time_elapsed = time_elapsed + self.status_check_interval_sec
-                    else:
-                        break
-
-            # combine the results
-            results = []
-            for f in future_results:
-                utils.trace("MultiThreadTSV: parallelize: xtsv num_rows: {}".format(f.result().num_rows()))
-                results.append(f.result())
-
-            # merge the tsvs using a common union.
-            combined_result = tsv.merge(results, def_val_map = {})
+            utils.debug("{}: num_rows: {}, num_par: {}, num_batches: {}, batch_size: {}, use_process_pool: {}".format(self.dmsg,
+                self.num_rows(), self.num_par, self.num_batches, batch_size, self.use_process_pool))
+
+            # create batches by slicing the rows. dont submit empty batches
+            data_fields = self.get_data_fields()
+            batches = []
+            for i in range(self.num_batches):
+                batch_data_fields = data_fields[batch_size * i: batch_size * (i + 1)]
+                if (len(batch_data_fields) > 0):
+                    batches.append(batch_data_fields)
+
+            # results in the order of batches
+            results = [None for i in range(len(batches))]
+
+            # run the pool
+            if (self.use_process_pool == True):
+                # the batches are sent to worker processes as a single string with the number of rows, which is much faster to pickle than list of rows
+                with ProcessPoolExecutor(max_workers = self.num_par) as executor:
+                    future_results = {}
+                    for i in range(len(batches)):
+                        future_results[executor.submit(__parallelize_encoded__, self.get_header_fields(), __encode_data_fields__(batches[i]), func, *args, **kwargs)] = i
+
+                    # collect the results as they complete
+                    for f in as_completed(future_results):
+                        (header_fields, encoded_data) = f.result()
+                        results[future_results[f]] = dataframe.new_with_cols(header_fields, data_fields = __decode_data_fields__(encoded_data))
+                        utils.debug("{}: parallelize: batch completed: {} / {}".format(self.dmsg, future_results[f] + 1, len(batches)))
+            else:
+                with ThreadPoolExecutor(max_workers = self.num_par) as executor:
+                    future_results = {}
+                    for i in range(len(batches)):
+                        batch = dataframe.new_with_cols(self.get_header_fields(), data_fields = batches[i])
+                        future_results[executor.submit(__parallelize__, batch, func, *args, **kwargs)] = i
+
+                    # collect the results as they complete
+                    for f in as_completed(future_results):
+                        results[future_results[f]] = f.result()
+                        utils.debug("{}: parallelize: batch completed: {} / {}".format(self.dmsg, future_results[f] + 1, len(batches)))
+
+            # merge the results
+            combined_result = __concat__(results)
 
         # take end_time
         ts_end = time.time()
@@ -92,3 +92,33 @@ class MultiThreadTSV(tsv.TSV):
 def __parallelize__(xtsv, func, *args, **kwargs):
     return func(xtsv, *args, **kwargs)
 
+# runs in the worker process
+def __parallelize_encoded__(header_fields, encoded_data, func, *args, **kwargs):
+    xtsv = dataframe.new_with_cols(header_fields, data_fields = __decode_data_fields__(encoded_data))
+    result = func(xtsv, *args, **kwargs)
+    return (result.get_header_fields(), __encode_data_fields__(result.get_data_fields()))
+
+# the number of rows is sent along with the string as a single empty field and no rows are both encoded as empty string
+def __encode_data_fields__(data_fields):
+    return (len(data_fields), "\n".join(["\t".join(fields) for fields in data_fields]))
+
+def __decode_data_fields__(encoded_data):
+    (num_rows, text) = encoded_data
+    return list([line.split("\t") for line in text.split("\n")]) if (num_rows > 0) else []
+
+# concatenate the results directly if they all have the same header, else merge using a common union
+def __concat__(results):
+    # check for same header
+    header_fields = results[0].get_header_fields()
+    for result in results:
+        if (result.get_header_fields() != header_fields):
+            utils.debug("MultiThreadTSV: results have different headers. Using merge_union")
+            return dataframe.merge_union(results, def_val_map = {})
+
+    # concat
+    data_fields = []
+    for result in results:
+        data_fields.extend(result.get_data_fields())
+
+    # return
+    return dataframe.new_with_cols(header_fields, data_fields = data_fields)
@@ -0,0 +1,24 @@
+import unittest
+from omigo_ext import multithread_ext
+
+# module level function so that it can be pickled for the process pool
+def identity_func(xdf):
+    return xdf
+
+class TestMultiThreadTSV(unittest.TestCase):
+    def test_process_pool1(self):
+        data_fields = list([["" if (i % 10 == 0) else str(i)] for i in range(100)])
+        xdf = multithread_ext.MultiThreadTSV(["value"], data_fields, num_par = 4, num_batches = 100, use_process_pool = True)
+        result = xdf.parallelize(identity_func)
+        self.assertEqual(result.get_header_fields(), ["value"])
+        self.assertEqual(result.get_data_fields(), data_fields)
+
+    def test_process_pool2(self):
+        data_fields = list([[str(i), ["a", "b"][i % 2]] for i in range(25)])
+        xdf = multithread_ext.MultiThreadTSV(["id", "name"], data_fields, num_par = 2, num_batches = 3, use_process_pool = True)
+        self.assertEqual(xdf.parallelize(identity_func).get_data_fields(), data_fields)
+        thread_xdf = multithread_ext.MultiThreadTSV(["id", "name"], data_fields, num_par = 2, num_batches = 3)
+        self.assertEqual(thread_xdf.parallelize(identity_func).get_data_fields(), data_fields)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,76 +1,109 @@
 """FileReader / FileWriter class"""
 
 import gzip
+import os
 import zipfile
-import time
 
 from omigo_hydra import s3_wrapper
 from omigo_core import utils
 
-# TODO: this is very inefficient. Use s3fs or write something better.
+# number of characters buffered before writing to the output stream
+WRITE_BLOCK_SIZE = 1024 * 1024
+
 class FileWriter:
-    """FileWriter class to write data into files"""
-    def __init__(self, output_file_name, s3_region, aws_profile):
+    """FileWriter class to write data into files. The data is compressed on the fly and streamed to the local file, or
+    uploaded to s3 in parts. Only the lines of the current block and one s3 part are kept in memory. Use it with a with
+    block so that the output is discarded, and the s3 multipart upload aborted, if there is any error before close"""
+    def __init__(self, output_file_name, s3_region, aws_profile, part_size = None):
         self.output_file_name = output_file_name
-        self.data = []
         self.s3_region = s3_region
         self.aws_profile = aws_profile
 
+        # lines are buffered and written as blocks
+        self.data = []
+        self.data_size = 0
+
+        # binary output
+        if (output_file_name.startswith("s3://")):
+            bucket_name, object_key = utils.split_s3_path(output_file_name)
+            self.output_raw = s3_wrapper.S3MultipartWriter(bucket_name, object_key, s3_region = s3_region, aws_profile = aws_profile, part_size = part_size)
+        else:
+            self.output_raw = open(output_file_name, "wb")
+
+        # compression
+        self.output_zipf = None
+        if (output_file_name.endswith(".gz")):
+            self.output_file = gzip.GzipFile(fileobj = self.output_raw, mode = "wb")
+        elif (output_file_name.endswith(".zip")):
+            self.output_zipf = zipfile.ZipFile(self.output_raw, "w", compression = zipfile.ZIP_DEFLATED)
+            self.output_file = self.output_zipf.open(output_file_name.split("/")[-1][0:-4], "w")
+        else:
+            self.output_file = self.output_raw
+
     def write(self, line):
         self.data.append(line)
+        self.data_size = self.data_size + len(line)
+        if (self.data_size >= WRITE_BLOCK_SIZE):
+            self.__write_block__()
+
+    def __write_block__(self):
+        if (len(self.data) > 0):
+            self.output_file.write("".join(self.data).encode("utf-8"))
+            self.data = []
+            self.data_size = 0
 
     def close(self):
-        output_zipf = None
-        output_file = None
+        # the compression layers dont close the underlying stream
+        self.__write_block__()
+        if (self.output_file is not self.output_raw):
+            self.output_file.close()
+        if (self.output_zipf is not None):
+            self.output_zipf.close()
+
+        # closing the s3 writer completes the upload
+        self.output_raw.close()
+
+        # set data to None
+        self.data = None
+
+    # discards the output. The s3 multipart upload is aborted and the local file is removed
+    def abort(self):
+        # check if already closed
+        if (self.data is None):
+            return
+
+        # the compression layers are closed only to release them, any error is ignored as the output is discarded
+        self.data = None
+        for output in [self.output_file, self.output_zipf]:
+            if (output is not None and output is not self.output_raw):
+                try:
+                    output.close()
+                except Exception as e:
+                    utils.debug("FileWriter: abort: error in closing the compression layer: {}".format(e))
+
+        # s3 or local
         if (self.output_file_name.startswith("s3://")):
-            content = "".join(self.data)
-            bucket_name, object_key = utils.split_s3_path(self.output_file_name)
-
-            # persist
-            s3_wrapper.put_file_with_text_content(bucket_name, object_key, content, self.s3_region, self.aws_profile)
-
-            # TODO: wait for file to exist
-            utils.warn_once("FileWriter: this has wait incorporated. this needs to be merged with hydra")
-            num_attempts = 20
-            wait_sec = 0.1
-            for attempt in range(num_attempts):
-                if (s3_wrapper.check_file_exists(self.output_file_name) == True):
-                    return
-                else:
-                    utils.debug("FileWriter: file write doesnt finished yet. path: {}, waiting for {} seconds, attempt: {} / {}".format(self.output_file_name,
-                        wait_sec, attempt, num_attempts))
-                    time.sleep(wait_sec)
-
-            # error
-            if (s3_wrapper.check_file_exists(self.output_file_name) == False):
-                raise Exception("FileWriter: write failed after {} attempts: {}".format(num_attempts, self.output_file_name))
+            self.output_raw.abort()
+        else:
+            self.output_raw.close()
+            if (os.path.exists(self.output_file_name)):
+                os.remove(self.output_file_name)
+
+        # debug
+        utils.debug("FileWriter: abort: {}".format(self.output_file_name))
+
+    def __enter__(self):
+        return self
+
+    # close on success, abort on exception. The exception is not suppressed
+    def __exit__(self, exc_type, exc_value, traceback):
+        if (exc_type is None):
+            self.close()
         else:
-            # construct output file
-            if (self.output_file_name.endswith(".gz")):
-                output_file = gzip.open(self.output_file_name, "wt")
-                # write all the content
-                for line in self.data:
-                    output_file.write(line)
-            elif (self.output_file_name.endswith(".zip")):
-                output_zipf = zipfile.ZipFile(self.output_file_name, "w")
-                output_file = output_zipf.open(self.output_file_name.split("/")[-1][0:-4], "w")
-                # write all the content
-                for line in self.data:
-                    output_file.write(str.encode(line))
-            else:
-                output_file = open(self.output_file_name, "w")
-                # write all the content
-                for line in self.data:
-                    output_file.write(line)
-
-            # close
-            if (output_file is not None):
-                output_file.close()
-            if (output_zipf is not None):
-                output_zipf.close()
-
-            # set data to None
-            self.data = None
+            self.abort()
+
+        # return
+        return False
 
 class TSVFileWriter:
     """FileWriter class to write data into files"""
@@ -79,16 +112,12 @@ class TSVFileWriter:
         self.aws_profile = aws_profile
 
     def save(self, xtsv, output_file_name):
-        output_zipf = None
-        output_file = None
-
-        # initialize fs
-        fs = s3io_wrapper.S3FSWrapper(s3_region = self.s3_region, aws_profile = self.aws_profile)
-
-        # write
-        content = xtsv.get_header() + "\n" + "\n".join(xtsv.get_data()) if (xtsv.num_rows() > 0) else xtsv.get_header()
-        bucket_name, object_key = utils.split_s3_path(output_file_name)
-        fs.write_text_file(bucket_name, object_key, content)
+        # write the rows one at a time without creating the full content. The output is discarded on any error
+        with FileWriter(output_file_name, self.s3_region, self.aws_profile) as output_file:
+            output_file.write("\t".join(xtsv.get_header_fields()))
+            for fields in xtsv.get_data_fields():
+                output_file.write("\n")
+                output_file.write("\t".join(fields))
 
 class FileReader:
     """FileReader class to read data files"""
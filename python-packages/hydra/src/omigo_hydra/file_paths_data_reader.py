@@ -15,11 +15,11 @@ class FilePathsDataReader:
     # file paths reader is an iterator based reader
     file_paths_readers = None
 
-    # cur_data holds the current data block
-    cur_data = None
+    # cur_lines is the line generator of the current file
+    cur_lines = None
 
-    # cur_index is the pointer to the line in cur_data
-    cur_index = 0
+    # cur_line is the next line to return. None if there is no more data
+    cur_line = None
 
     # header is the header line for entire dataset
     header = None
@@ -33,37 +33,41 @@ class FilePathsDataReader:
         # initialize the reader
         self.file_paths_readers = file_paths_reader.FilePathsReader(filepaths)
 
-        # loop through all files until find a one with proper data
-        found = False
-        while (found == False):
-            if (self.file_paths_readers.has_next()):
-                # initial load
-                filepath = self.file_paths_readers.next()
-                self.cur_data = file_paths_util.read_file_content_as_lines(filepath, self.s3_region, self.aws_profile)
-
-                # check for validity
-                if (len(self.cur_data) == 0):
-                    print("FilePathsDataReader: Invalid file found. No header.", filepath)
-                    sys.exit(0)
-
-                # read header
-                self.header = self.cur_data[0].rstrip("\n")
-
-                # assign cur_index to 0 for reading header
-                self.cur_index = 1
-
-                # check if found a valid file
-                if (self.cur_index < len(self.cur_data)):
-                    found = True
-            else:
-                self.cur_data = None
-                self.cur_index = -1
-                break
-
-        # check if found some valid file to read
-        if (found == False):
-            self.cur_data = None
-            self.cur_index = -1
+        # loop through all files until find a one with proper data. The header is from the same file
+        self.__load_next_line__(update_header = True)
+
+    # reads the next line from the current file, or moves to the next file with some data
+    def __load_next_line__(self, update_header = False):
+        while (True):
+            # check the current file
+            if (self.cur_lines is not None):
+                line = next(self.cur_lines, None)
+                if (line is not None):
+                    self.cur_line = line
+                    return
+
+                # end of file
+                self.cur_lines.close()
+                self.cur_lines = None
+
+            # check if any more files are left
+            if (self.file_paths_readers.has_next() == False):
+                self.cur_line = None
+                return
+
+            # open the next file as stream
+            filepath = self.file_paths_readers.next()
+            self.cur_lines = file_paths_util.read_file_content_as_lines_stream(filepath, self.s3_region, self.aws_profile)
+
+            # read header
+            header = next(self.cur_lines, None)
+            if (header is None):
+                print("FilePathsDataReader: Invalid file found. No header.", filepath)
+                sys.exit(0)
+
+            # assign header
+            if (update_header == True):
+                self.header = header
 
     # get header
     def get_header(self):
@@ -71,58 +75,25 @@ class FilePathsDataReader:
 
     # has next returns boolean if there is still some data left
     def has_next(self):
-        # check if no data block loaded
-        if (self.cur_data is None):
-            return False
-
-        return True
+        return self.cur_line is not None
 
     # close the file reader
     def close(self):
-        self.cur_data = None
-        self.cur_index = -1
+        if (self.cur_lines is not None):
+            self.cur_lines.close()
+            self.cur_lines = None
+        self.cur_line = None
 
     # next return the next line and also moves the pointers
     def next(self):
-        # declare and initialize variable
-        result = None
-
-        # cur_data should be non empty
+        # cur_line should be non empty
         if (self.has_next() == False):
             print("FilePathsDataReader: next() has next is false and next is called")
             return None
 
-        # check for current pointer
-        if (self.cur_index < len(self.cur_data)):
-            result = self.cur_data[self.cur_index].rstrip("\n")
-            self.cur_index = self.cur_index + 1
-        else:
-            print("FilePathsDataReader: next() this should not happen")
-
-        # Check if cur_index has reached the end of data block
-        if (self.cur_index >= len(self.cur_data)):
-            # check if any more data blocks are left
-            if (self.file_paths_readers.has_next() == False):
-                self.cur_data = None
-                self.cur_index = -1
-            else:
-                found = False
-                while (found == False):
-                    if (self.file_paths_readers.has_next()):
-                        # read the next block and reinitialize the cur_index
-                        filepath = self.file_paths_readers.next()
-                        self.cur_data = file_paths_util.read_file_content_as_lines(filepath, self.s3_region, self.aws_profile)
-                        self.cur_index = 1
-
-                        # check if found a valid file
-                        if (self.cur_index < len(self.cur_data)):
-                            found = True
-                    else:
-                        # invalidate the buffers
-                        self.cur_data = None
-                        self.cur_index = -1
-                        break
+        # read ahead the next line
+        result = self.cur_line
+        self.__load_next_line__()
 
         # return result
         return result
-
@@ -3,15 +3,30 @@
 import os
 import gzip
 import datetime
+import time
+import threading
 import zipfile
+import codecs
+from io import BytesIO
 
 # local imports
 from omigo_core import utils
 from omigo_core import timefuncs 
+from omigo_core import otsv
 from omigo_hydra import s3io_wrapper 
+from omigo_hydra import s3_wrapper
+from omigo_hydra import s3_cache
 # constant
 NUM_HOURS = 24
 
+# number of bytes to read at a time while streaming
+STREAM_READ_SIZE = 1024 * 1024
+
+# ttl of the cached listing of each dt directory
+LISTING_CACHE_TTL_SEC = 300
+LISTING_CACHE = {}
+LISTING_CACHE_LOCK = threading.Lock()
+
 # method to read the data
 def read_filepaths(path, start_date_str, end_date_str, fileprefix, s3_region = None, aws_profile = None, granularity = "hourly", ignore_missing = False):
     if (granularity == "hourly"):
@@ -135,11 +150,10 @@ def has_same_headers(filepaths, s3_region = None, aws_profile = None):
     for filepath in filepaths:
         # print(filepath)
 
-        # read content
-        lines = read_file_content_as_lines(filepath, s3_region = s3_region, aws_profile = aws_profile)
-
-        # read header
-        headerline = lines[0].rstrip("\n")
+        # read only the header line
+        lines = read_file_content_as_lines_stream(filepath, s3_region = s3_region, aws_profile = aws_profile)
+        headerline = next(lines, "")
+        lines.close()
         if ((headerline in header_set.keys()) == False):
             header_set[headerline] = filepath
 
@@ -175,35 +189,105 @@ def create_header_index_map(header):
 
     return header_map
 
+# reads all the lines using the streaming reader. Use read_file_content_as_lines_stream to process large files
 def read_file_content_as_lines(path, s3_region = None, aws_profile = None):
-    # check for s3
+    data = list(read_file_content_as_lines_stream(path, s3_region = s3_region, aws_profile = aws_profile))
+
+    # s3 content was read as text with the trailing newlines removed
+    if (path.startswith("s3://")):
+        while (len(data) > 0 and data[-1] == ""):
+            data.pop()
+
+    # return
+    return data
+
+# splits a binary stream into lines without reading all of it. The buffer holds at most one block and a partial line
+def __read_stream_as_lines__(fin):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    while True:
+        barr = fin.read(STREAM_READ_SIZE)
+        if (barr is None or len(barr) == 0):
+            break
+
+        # split the complete lines and keep the last partial one
+        lines = (buffer + decoder.decode(barr)).split("\n")
+        buffer = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+
+    # last line without newline
+    buffer = buffer + decoder.decode(b"", final = True)
+    if (len(buffer) > 0):
+        yield buffer.rstrip("\r")
+
+# otsv files are binary columnar. The rows are returned as tab separated lines for the line based readers
+def __read_otsv_as_lines__(path, s3_region, aws_profile):
     if (path.startswith("s3://")):
         bucket_name, object_key = utils.split_s3_path(path)
-        data = s3_wrapper.get_file_content_as_text(bucket_name, object_key, s3_region = s3_region, aws_profile = aws_profile)
-        data = data.split("\n")
-    else:
-        if (path.endswith(".gz")):
-            fin = gzip.open(path, mode = "rt")
-            data = [x.rstrip("\n") for x in fin.readlines()]
-            fin.close()
-        elif (path.endswith(".zip")):
-            zipf = zipfile.ZipFile(path, "r")
-            fin = zipf.open(zipf.infolist()[0], "r")
-            data = fin.read().decode().split("\n")
-            fin.close()
-            zipf.close()
+        cache = s3_cache.get_cache()
+        if (cache is not None):
+            xdf = otsv.decode(cache.get_file_content(bucket_name, object_key, s3_region = s3_region, aws_profile = aws_profile))
         else:
-            fin = open(path, "r")
-            data = [x.rstrip("\n") for x in fin.readlines()]
-            fin.close()
+            xdf = otsv.decode(s3_wrapper.get_file_content(bucket_name, object_key, s3_region = s3_region, aws_profile = aws_profile))
+    else:
+        xdf = otsv.read_file(path)
+
+    # header and data
+    yield "\t".join(xdf.get_header_fields())
+    for fields in xdf.get_data_fields():
+        yield "\t".join(fields)
+
+# streaming version of read_file_content_as_lines. This is a generator that reads one line at a time. The s3 objects
+# are read from the response body, and gz files are decompressed incrementally. Closing the generator closes the streams
+def read_file_content_as_lines_stream(path, s3_region = None, aws_profile = None):
+    # binary columnar format
+    if (otsv.is_otsv_path(path)):
+        yield from __read_otsv_as_lines__(path, s3_region, aws_profile)
+        return
 
     # simple csv parser
-    if (path.endswith(".csv") or path.endswith("csv.gz") or path.endswith(".csv.zip")):
-        utils.warn("Found a CSV file. Only simple csv format is supported")
-        data = [x.replace(",", "\t") for x in data]
+    is_csv = path.endswith(".csv") or path.endswith("csv.gz") or path.endswith(".csv.zip")
+    if (is_csv == True):
+        utils.warn_once("Found a CSV file. Only simple csv format is supported")
+
+    # open the binary stream
+    streams = []
+    try:
+        # check for s3
+        if (path.startswith("s3://")):
+            bucket_name, object_key = utils.split_s3_path(path)
+            cache = s3_cache.get_cache()
+            if (cache is not None):
+                # the local cache returns a regular file
+                streams.append(cache.open_file(bucket_name, object_key, s3_region = s3_region, aws_profile = aws_profile))
+                if (path.endswith(".zip")):
+                    streams.append(zipfile.ZipFile(streams[-1], "r"))
+            else:
+                streams.append(s3_wrapper.get_file_content_as_stream(bucket_name, object_key, s3_region = s3_region, aws_profile = aws_profile))
 
-    # return
-    return data
+                # zip needs random access, so it is read fully
+                if (path.endswith(".zip")):
+                    streams.append(zipfile.ZipFile(BytesIO(streams[-1].read()), "r"))
+        else:
+            # zip and regular files
+            if (path.endswith(".zip")):
+                streams.append(zipfile.ZipFile(path, "r"))
+            else:
+                streams.append(open(path, "rb"))
+
+        # decompression
+        if (path.endswith(".gz")):
+            streams.append(gzip.GzipFile(fileobj = streams[-1], mode = "rb"))
+        elif (path.endswith(".zip")):
+            streams.append(streams[-1].open(streams[-1].infolist()[0], "r"))
+
+        # read lines
+        for line in __read_stream_as_lines__(streams[-1]):
+            yield line.replace(",", "\t") if (is_csv == True) else line
+    finally:
+        for stream in reversed(streams):
+            stream.close()
 
 def create_date_numeric_representation(date_str, default_suffix):
     # check for yyyy-MM-dd
@@ -212,11 +296,99 @@ def create_date_numeric_representation(date_str, default_suffix):
     else:
         return timefuncs.datestr_to_datetime(date_str).strftime("%Y%m%d%H%M%S")
 
-# this is not a lookup function. This reads directory listing, and then picks the filepaths that match the criteria
-def get_file_paths_by_datetime_range(path, start_date_str, end_date_str, prefix, spillover_window = 1, num_par = 10, wait_sec = 1, s3_region = None, aws_profile = None):
-    # initialize fs
-    fs = s3io_wrapper.S3FSWrapper(s3_region = s3_region, aws_profile = aws_profile)
+# returns the base names in each path/dt=day directory. The days missing in the cache are listed as ranges of consecutive
+# days, each with a single StartAfter bounded listing that stops at the first key after the last day. If last_day_bound
+# is given, the listing of days[-1] also stops at the first base name greater than last_day_bound, compared on its
+# length, and days[-1] is not cached as its listing is partial
+def __list_s3_dt_dirs__(path, days, s3_region, aws_profile, last_day_bound = None):
+    bucket_name, object_key = utils.split_s3_path(path)
+    dir_key = object_key + "/dt=" if (object_key != "") else "dt="
+
+    # read from cache
+    result = {}
+    missing_indexes = []
+    cur_time = time.time()
+    with LISTING_CACHE_LOCK:
+        for i in range(len(days)):
+            entry = LISTING_CACHE.get((bucket_name, dir_key + days[i]))
+            if (entry is not None and entry[0] > cur_time):
+                result[days[i]] = entry[1]
+            else:
+                missing_indexes.append(i)
+
+    # group the consecutive days
+    day_ranges = []
+    for i in missing_indexes:
+        if (len(day_ranges) > 0 and day_ranges[-1][-1] == i - 1):
+            day_ranges[-1].append(i)
+        else:
+            day_ranges.append([i])
+
+    # list each range
+    for day_range in day_ranges:
+        listed = dict([(days[i], {}) for i in day_range])
+        first_day = days[day_range[0]]
+        last_day = days[day_range[-1]]
+        is_bounded = last_day_bound is not None and last_day == days[-1]
+        num_keys = 0
+
+        # the keys of first_day sort after dt=first_day
+        for key in s3_wrapper.list_keys(bucket_name, dir_key, start_after = dir_key + first_day, s3_region = s3_region, aws_profile = aws_profile):
+            remaining = key[len(dir_key):]
+            sep_index = remaining.find("/")
+            if (sep_index == -1):
+                continue
+
+            # stop after the last day
+            day = remaining[0:sep_index]
+            if (day > last_day):
+                break
+
+            # the immediate child of the directory
+            base_filename = remaining[sep_index + 1:].split("/")[0]
+
+            # the names after the bound in the last day can not match
+            if (is_bounded == True and day == last_day and base_filename[0:len(last_day_bound)] > last_day_bound):
+                break
+
+            if (day in listed.keys() and base_filename != ""):
+                listed[day][base_filename] = 1
+            num_keys = num_keys + 1
+
+        # debug
+        utils.trace("file_paths_util: __list_s3_dt_dirs__: s3://{}/{}, first_day: {}, last_day: {}, num_keys: {}".format(bucket_name, dir_key, first_day, last_day, num_keys))
 
+        # update cache
+        expiry_time = time.time() + LISTING_CACHE_TTL_SEC
+        with LISTING_CACHE_LOCK:
+            for day in listed.keys():
+                if (is_bounded == False or day != last_day):
+                    LISTING_CACHE[(bucket_name, dir_key + day)] = (expiry_time, list(listed[day].keys()))
+                result[day] = list(listed[day].keys())
+
+    # return
+    return result
+
+def __list_local_dt_dirs__(path, days):
+    result = {}
+    for day in days:
+        cur_path = path + "/dt=" + day
+        result[day] = sorted(os.listdir(cur_path)) if (os.path.isdir(cur_path)) else []
+
+    # return
+    return result
+
+# removes the cached listings
+def clear_listing_cache():
+    with LISTING_CACHE_LOCK:
+        LISTING_CACHE.clear()
+
+# this is not a lookup function. This reads directory listing, and then picks the filepaths that match the criteria.
+# The file names are prefix-startdate-starttime-enddate-endtime.tsv under path/dt=yyyymmdd. num_par and wait_sec are not
+# used as the whole date range is listed with a single paginated listing. The names sort by the start time, so on s3 the
+# listing of the last day stops at the first file starting after the end date. The first day is listed fully as its
+# files that start before the start date can still end after it
+def get_file_paths_by_datetime_range(path, start_date_str, end_date_str, prefix, spillover_window = 1, num_par = 10, wait_sec = 1, s3_region = None, aws_profile = None):
     # parse dates
     start_date = timefuncs.datestr_to_datetime(start_date_str)
     end_date = timefuncs.datestr_to_datetime(end_date_str)
@@ -224,42 +396,33 @@ def get_file_paths_by_datetime_range(path, start_date_str, end_date_str, prefix,
     # get number of days inclusive start and end and include +/- 1 day buffer for overlap
     num_days = (end_date - start_date).days + 1 + (spillover_window * 2)
     start_date_minus_window = start_date - datetime.timedelta(days = spillover_window)
+    days = list([(start_date_minus_window + datetime.timedelta(days = d)).strftime("%Y%m%d") for d in range(num_days)])
 
     # create a numeric representation of date
     start_date_numstr = create_date_numeric_representation(start_date_str, "000000")
     end_date_numstr = create_date_numeric_representation(end_date_str, "999999")
 
-    # create variable to store results
-    tasks = []
-
-    # iterate and create tasks
-    for d in range(num_days):
-        # generate the current path based on date
-        cur_date = start_date_minus_window + datetime.timedelta(days = d)
-        cur_path = path + "/dt=" + cur_date.strftime("%Y%m%d")
-
-        # get the list of files. This needs to be failsafe as not all directories may exist
-        tasks.append(utils.ThreadPoolTask(fs.get_directory_listing, cur_path, filter_func = None, ignore_if_missing = False, skip_exist_check = True,
-            region = s3_region, profile = aws_profile))
-
-    # execute the tasks
-    results = utils.run_with_thread_pool(tasks, num_par = num_par, wait_sec = wait_sec)
+    # get the list of files in each directory
+    if (path.startswith("s3://")):
+        last_day_bound = "{}-{}-{}".format(prefix, end_date_numstr[0:8], end_date_numstr[8:14])
+        files_map = __list_s3_dt_dirs__(path, days, s3_region, aws_profile, last_day_bound = last_day_bound)
+    else:
+        files_map = __list_local_dt_dirs__(path, days)
 
     # final result
     paths_found = []
 
     # iterate over results
-    for files_list in results:
+    for day in days:
+        cur_path = path + "/dt=" + day
+
         # debug
-        utils.trace("file_paths_util: get_file_paths_by_datetime_range: number of candidate files to read: cur_date: {}, count: {}".format(cur_date, len(files_list)))
+        utils.trace("file_paths_util: get_file_paths_by_datetime_range: number of candidate files to read: cur_date: {}, count: {}".format(day, len(files_map[day])))
 
         # apply filter on the name and the timestamp
-        for filename in files_list:
+        for base_filename in files_map[day]:
             #format: full_prefix/fileprefix-startdate-enddate-starttime-endtime.tsv
-            # get the last part after /
-            #sep_index = filename.rindex("/")
-            #filename1 = filename[sep_index + 1:]
-            base_filename = filename[len(cur_path) + 1:]
+            filename = cur_path + "/" + base_filename
             ext_index = None
 
             # ignore any hidden files that start with dot(.)
@@ -275,14 +438,14 @@ def get_file_paths_by_datetime_range(path, start_date_str, end_date_str, prefix,
             else:
                 raise Exception("file_paths_util: get_file_paths_by_datetime_range: extension parsing failed: {}".format(filename))
 
-            # proceed only if valid filename
-            if (ext_index != -1):
+            # proceed only if valid filename with the same prefix
+            if (ext_index != -1 and base_filename.startswith(prefix + "-")):
                 # strip the extension
                 filename2 = base_filename[0:ext_index]
                 filename3 = filename2[len(prefix) + 1:]
                 parts = filename3.split("-")
 
-                # the number of parts must be 3
+                # the number of parts must be 4
                 if (len(parts) == 4):
                     # get the individual parts in the filename
                     cur_start_ts = str(parts[0]) + str(parts[1])
@@ -290,7 +453,7 @@ def get_file_paths_by_datetime_range(path, start_date_str, end_date_str, prefix,
 
                     # apply the filter condition
                     if (not (str(end_date_numstr) < cur_start_ts or str(start_date_numstr) > cur_end_ts)):
-                        # note filename1
+                        # note filename
                         paths_found.append(filename)
                         utils.trace("file_paths_util: get_file_paths_by_datetime_range: found file: {}".format(filename))
 
@@ -320,7 +483,7 @@ def create_local_parent_dir(filepath):
         if (filepath.startswith("/")):
             dir_path = "/" + dir_path
 
-        if (fs.dir_exists(dir_path, None, None) == False):
+        if (fs.dir_exists(dir_path) == False):
             if (utils.is_debug()):
                 print("Creating local directory:", dir_path)
             os.makedirs(dir_path, exist_ok = True)
@@ -1,5 +1,8 @@
-from omigo_core import utils, dataframe, tsv, tsvutils
-from omigo_hydra import file_paths_data_reader, file_paths_util, s3io_wrapper
+from omigo_core import utils, dataframe, tsv, tsvutils, otsv, external_sort
+from omigo_hydra import file_paths_data_reader, file_paths_util, s3io_wrapper, s3_wrapper, file_io_wrapper
+
+# number of rows parsed at a time when read applies filter or cols
+READ_CHUNK_ROWS = 100000
 
 def save_to_file(xtsv, output_file_name, s3_region = None, aws_profile = None):
     # do some validation
@@ -9,6 +12,11 @@ def save_to_file(xtsv, output_file_name, s3_region = None, aws_profile = None):
     if (output_file_name.startswith("s3://") == False):
         file_paths_util.create_local_parent_dir(output_file_name)
 
+    # binary columnar format
+    if (otsv.is_otsv_path(output_file_name)):
+        __save_otsv__(xtsv, output_file_name, s3_region, aws_profile)
+        return
+
     # construct output file
     output_file = file_io_wrapper.TSVFileWriter(s3_region, aws_profile)
     
@@ -18,10 +26,56 @@ def save_to_file(xtsv, output_file_name, s3_region = None, aws_profile = None):
     # debug
     utils.debug("save_to_file: file saved to: {}, num_rows: {}, num_cols: {}".format(output_file_name, xtsv.num_rows(), xtsv.num_cols()))
 
+def __save_otsv__(xdf, output_file_name, s3_region, aws_profile):
+    # write
+    if (output_file_name.startswith("s3://")):
+        bucket_name, object_key = utils.split_s3_path(output_file_name)
+        s3_wrapper.put_file_content(bucket_name, object_key, otsv.encode(xdf), s3_region = s3_region, aws_profile = aws_profile)
+    else:
+        otsv.write_file(xdf, output_file_name)
+
+    # debug
+    utils.debug("save_to_file: file saved to: {}, num_rows: {}, num_cols: {}".format(output_file_name, xdf.num_rows(), xdf.num_cols()))
+
+# local files are memory mapped so that only the selected columns are read from disk
+def __read_otsv__(input_file, cols, filter_expr, s3_region, aws_profile):
+    if (input_file.startswith("s3://")):
+        bucket_name, object_key = utils.split_s3_path(input_file)
+        return otsv.decode(s3_wrapper.get_file_content(bucket_name, object_key, s3_region = s3_region, aws_profile = aws_profile), cols = cols, filter_expr = filter_expr)
+    else:
+        return otsv.read_file(input_file, cols = cols, filter_expr = filter_expr)
+
+# splits the line into fields, replacing the custom separator if any
+def __split_line__(line, sep, input_file):
+    # check if a custom separator is defined
+    if (sep is not None):
+        if ("\t" in line):
+            raise Exception("Cant parse non tab separated file as it contains tab character:", input_file)
+        line = line.replace(sep, "\t")
+
+    # return
+    return line.split("\t")
+
+# filters and selects the chunk, and appends the resulting rows. The rows are copied so that the unused fields are freed
+def __filter_select_chunk__(header_fields, data_fields, cols, filter_expr, result_data_fields):
+    xdf = dataframe.new_with_cols(header_fields, data_fields = data_fields)
+    if (filter_expr is not None):
+        xdf = xdf.filter(filter_expr)
+    if (cols is not None):
+        xdf = xdf.select(cols)
+
+    # append
+    result_data_fields.extend(list([list(fields) for fields in xdf.get_data_fields()]))
+
+    # return
+    return xdf.get_header_fields()
+
 def check_exists(xtsv, s3_region = None, aws_profile = None):
     return file_paths_util.check_exists(xtsv, s3_region, aws_profile)
 
-def read(input_file_or_files, sep = None, def_val_map = None, username = None, password = None, num_par = 0, s3_region = None, aws_profile = None):
+# filter_expr is an expression from omigo_core.expressions that is applied to each file before merging
+def read(input_file_or_files, sep = None, def_val_map = None, username = None, password = None, num_par = 0, s3_region = None, aws_profile = None, cols = None,
+    filter_expr = None):
     # convert the input to array
     input_files = utils.get_argument_as_array(input_file_or_files)
 
@@ -29,26 +83,37 @@ def read(input_file_or_files, sep = None, def_val_map = None, username = None, p
     tasks = []
 
     def __read_inner__(input_file):
-        # read file content                               
-        lines = file_paths_util.read_file_content_as_lines(input_file, s3_region, aws_profile)
-                                                          
-        # take header and dat
-        header = lines[0]
-        data = lines[1:]
-            
-        # check if a custom separator is defined
-        if (sep is not None):
-            # check for validation
-            for line in lines:
-                if ("\t" in line):
-                    raise Exception("Cant parse non tab separated file as it contains tab character:", input_file)
-
-            # create header and data
-            header = header.replace(sep, "\t")
-            data = [x.replace(sep, "\t") for x in data]
+        # binary columnar format
+        if (otsv.is_otsv_path(input_file)):
+            return __read_otsv__(input_file, cols, filter_expr, s3_region, aws_profile)
+
+        # read file content as a stream of lines
+        lines = file_paths_util.read_file_content_as_lines_stream(input_file, s3_region = s3_region, aws_profile = aws_profile)
+
+        # take header
+        header = next(lines, None)
+        if (header is None):
+            raise Exception("read: empty file: {}".format(input_file))
+        header_fields = __split_line__(header, sep, input_file)
+
+        # parse the data lines. The filter and select are applied on chunks so that only the needed data is kept
+        result_header_fields = None
+        result_data_fields = []
+        data_fields = []
+        for line in lines:
+            data_fields.append(__split_line__(line, sep, input_file))
+            if (len(data_fields) >= READ_CHUNK_ROWS and (filter_expr is not None or cols is not None)):
+                result_header_fields = __filter_select_chunk__(header_fields, data_fields, cols, filter_expr, result_data_fields)
+                data_fields = []
+
+        # last chunk
+        if (filter_expr is None and cols is None):
+            return dataframe.new_with_cols(header_fields, data_fields = data_fields)
+        elif (result_header_fields is None or len(data_fields) > 0):
+            result_header_fields = __filter_select_chunk__(header_fields, data_fields, cols, filter_expr, result_data_fields)
 
         # return
-        return dataframe.from_tsv(tsv.TSV(header, data))
+        return dataframe.new_with_cols(result_header_fields, data_fields = result_data_fields)
 
     # create tasks
     for input_file in input_files:
@@ -65,6 +130,84 @@ def read(input_file_or_files, sep = None, def_val_map = None, username = None, p
     # merge and return
     return tsvutils.merge(tsv_list, def_val_map = def_val_map)
 
+# generator that reads the files line by line and yields dataframes of at most chunk_rows rows. All the chunks have
+# the header of the first file. Files with the same columns in different order are reordered. otsv files are read
+# with the columnar reader
+def read_chunks(input_file_or_files, chunk_rows = 100000, sep = None, cols = None, s3_region = None, aws_profile = None, dmsg = ""):
+    dmsg = utils.extend_inherit_message(dmsg, "read_chunks")
+
+    # validation
+    if (chunk_rows <= 0):
+        raise Exception("{}: invalid chunk_rows: {}".format(dmsg, chunk_rows))
+
+    # convert the input to array
+    input_files = utils.get_argument_as_array(input_file_or_files)
+
+    # common header across all files
+    header_fields = None
+    data_fields = []
+
+    # iterate over files
+    for input_file in input_files:
+        # binary columnar format. The rows are created from the columns in blocks
+        if (otsv.is_otsv_path(input_file)):
+            xdf = __read_otsv__(input_file, None, None, s3_region, aws_profile)
+            file_header_fields = xdf.get_header_fields()
+            rows = iter(xdf.get_data_fields())
+        else:
+            # read lines
+            lines = file_paths_util.read_file_content_as_lines_stream(input_file, s3_region = s3_region, aws_profile = aws_profile)
+
+            # read header
+            header = next(lines, None)
+            if (header is None):
+                utils.warn("{}: empty file: {}".format(dmsg, input_file))
+                continue
+
+            # check if a custom separator is defined
+            if (sep is not None):
+                header = header.replace(sep, "\t")
+
+            # parse the data lines lazily
+            file_header_fields = header.split("\t")
+            rows = map(lambda line: __split_line__(line, sep, input_file), lines)
+
+        # check header against the previous files
+        reorder_indexes = None
+        if (header_fields is None):
+            header_fields = file_header_fields
+        elif (file_header_fields != header_fields):
+            if (sorted(file_header_fields) != sorted(header_fields)):
+                raise Exception("{}: header mismatch in file: {}, expected: {}, found: {}".format(dmsg, input_file, header_fields, file_header_fields))
+            reorder_indexes = list([file_header_fields.index(h) for h in header_fields])
+
+        # read data
+        for fields in rows:
+            if (reorder_indexes is not None):
+                fields = list([fields[i] for i in reorder_indexes])
+            data_fields.append(fields)
+
+            # yield the chunk
+            if (len(data_fields) >= chunk_rows):
+                yield __create_chunk__(header_fields, data_fields, cols)
+                data_fields = []
+
+    # last chunk
+    if (header_fields is not None and len(data_fields) > 0):
+        yield __create_chunk__(header_fields, data_fields, cols)
+
+# generator that reads the files in chunks and yields the rows sorted by sort_cols as dataframes of at most chunk_rows rows.
+# The data is sorted with external_sort, which spills sorted runs of max_run_rows rows to disk
+def read_sorted_chunks(input_file_or_files, sort_cols, reverse = False, all_numeric = False, chunk_rows = 100000, max_run_rows = None, sep = None, cols = None,
+    s3_region = None, aws_profile = None, dmsg = ""):
+    dmsg = utils.extend_inherit_message(dmsg, "read_sorted_chunks")
+    chunks = read_chunks(input_file_or_files, chunk_rows = chunk_rows, sep = sep, cols = cols, s3_region = s3_region, aws_profile = aws_profile, dmsg = dmsg)
+    return external_sort.sort_chunks(chunks, sort_cols, reverse = reverse, all_numeric = all_numeric, max_run_rows = max_run_rows, chunk_rows = chunk_rows, dmsg = dmsg)
+
+def __create_chunk__(header_fields, data_fields, cols):
+    xdf = dataframe.new_with_cols(header_fields, data_fields = data_fields)
+    return xdf.select(cols) if (cols is not None) else xdf
+
 def __read_with_filter_transform_select_func__(cols):
     # create a inner function
     def __read_with_filter_transform_select_func_inner__(mp):
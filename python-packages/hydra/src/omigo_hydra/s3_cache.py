@@ -0,0 +1,227 @@
+"""Local on disk cache of S3 objects.
+
+The objects are stored under the hash of bucket, key and ETag, so a changed object never matches an old entry. A HEAD
+request gets the current ETag before using the cache, except for the paths matching the immutable patterns, which are
+served from the last cached version without any request. The total size is capped by evicting the least recently
+used entries.
+
+The cache is enabled with enable_cache, or with the OMIGO_S3_CACHE_DIR env variable. OMIGO_S3_CACHE_MAX_SIZE and
+OMIGO_S3_CACHE_IMMUTABLE_PATTERNS (comma separated regex) are optional"""
+import collections
+import hashlib
+import os
+import re
+import tempfile
+import threading
+
+# local import
+from omigo_core import utils
+from omigo_hydra import s3_wrapper
+
+# constants
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".omigo", "s3_cache")
+DEFAULT_MAX_SIZE = 10 * 1024 * 1024 * 1024
+OBJECTS_DIR = "objects"
+REFS_DIR = "refs"
+
+# global cache
+S3_CACHE = None
+S3_CACHE_LOCK = threading.Lock()
+
+def __get_hash__(*parts):
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+class S3Cache:
+    """Content addressed cache of S3 objects with LRU eviction"""
+
+    def __init__(self, cache_dir = DEFAULT_CACHE_DIR, max_size = DEFAULT_MAX_SIZE, immutable_patterns = None):
+        # validation
+        if (max_size <= 0):
+            raise Exception("S3Cache: invalid max_size: {}".format(max_size))
+
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, OBJECTS_DIR)
+        self.refs_dir = os.path.join(cache_dir, REFS_DIR)
+        self.max_size = max_size
+        self.immutable_patterns = list([re.compile(p) for p in immutable_patterns]) if (immutable_patterns is not None) else []
+        self.lock = threading.Lock()
+        self.num_hits = 0
+        self.num_misses = 0
+
+        # entries in the lru order, oldest first
+        self.entries = collections.OrderedDict()
+        self.total_size = 0
+
+        # create dirs and load the existing entries
+        os.makedirs(self.objects_dir, exist_ok = True)
+        os.makedirs(self.refs_dir, exist_ok = True)
+        self.__load_entries__()
+
+    # restores the lru order from the modification times. The temp files of the downloads start with dot
+    def __load_entries__(self):
+        files = []
+        for name in os.listdir(self.objects_dir):
+            if (name.startswith(".") == False):
+                stat = os.stat(os.path.join(self.objects_dir, name))
+                files.append((stat.st_mtime, name, stat.st_size))
+
+        for (mtime, name, size) in sorted(files):
+            self.entries[name] = size
+            self.total_size = self.total_size + size
+
+        # debug
+        utils.debug("S3Cache: cache_dir: {}, num_entries: {}, total_size: {}".format(self.cache_dir, len(self.entries), self.total_size))
+
+    def is_immutable(self, bucket_name, object_key):
+        path = "s3://{}/{}".format(bucket_name, object_key)
+        for pattern in self.immutable_patterns:
+            if (pattern.search(path) is not None):
+                return True
+
+        return False
+
+    # returns an open binary file of the entry and marks it as recently used, or None if the entry is missing. The hit
+    # and miss counts are updated under the same lock
+    def __open_entry__(self, name, count_miss = True):
+        with self.lock:
+            if (name not in self.entries.keys()):
+                if (count_miss == True):
+                    self.num_misses = self.num_misses + 1
+                return None
+
+            # the file could have been removed by another process sharing the cache_dir
+            path = os.path.join(self.objects_dir, name)
+            try:
+                fh = open(path, "rb")
+            except FileNotFoundError:
+                self.total_size = self.total_size - self.entries.pop(name)
+                if (count_miss == True):
+                    self.num_misses = self.num_misses + 1
+                return None
+
+            # the modification time keeps the lru order across sessions
+            self.entries.move_to_end(name)
+            os.utime(path)
+            self.num_hits = self.num_hits + 1
+
+            # return
+            return fh
+
+    # adds the downloaded file and evicts the least recently used entries. Returns the open file of the entry
+    def __add_entry__(self, name, temp_file):
+        with self.lock:
+            size = os.path.getsize(temp_file)
+            os.replace(temp_file, os.path.join(self.objects_dir, name))
+            if (name in self.entries.keys()):
+                self.total_size = self.total_size - self.entries.pop(name)
+            self.entries[name] = size
+            self.total_size = self.total_size + size
+
+            # evict
+            while (self.total_size > self.max_size and len(self.entries) > 1):
+                evict_name, evict_size = self.entries.popitem(last = False)
+                self.total_size = self.total_size - evict_size
+                try:
+                    os.remove(os.path.join(self.objects_dir, evict_name))
+                except FileNotFoundError:
+                    pass
+                utils.debug("S3Cache: evicted: {}, size: {}, total_size: {}".format(evict_name, evict_size, self.total_size))
+
+            # open before releasing the lock so that the entry can not be evicted
+            return open(os.path.join(self.objects_dir, name), "rb")
+
+    # the ref file has the entry name of the last cached version of the object
+    def __read_ref__(self, bucket_name, object_key):
+        try:
+            with open(os.path.join(self.refs_dir, __get_hash__(bucket_name, object_key)), "r") as fh:
+                return fh.read()
+        except FileNotFoundError:
+            return None
+
+    def __write_ref__(self, bucket_name, object_key, name):
+        fd, temp_file = tempfile.mkstemp(dir = self.refs_dir, prefix = ".")
+        with os.fdopen(fd, "w") as fh:
+            fh.write(name)
+        os.replace(temp_file, os.path.join(self.refs_dir, __get_hash__(bucket_name, object_key)))
+
+    # returns an open binary file with the object content. Caller needs to close it
+    def open_file(self, bucket_name, object_key, s3_region = None, aws_profile = None):
+        # immutable objects are served from the last cached version without any request
+        is_immutable = self.is_immutable(bucket_name, object_key)
+        if (is_immutable == True):
+            name = self.__read_ref__(bucket_name, object_key)
+            # not a miss yet as the current etag can still be in the cache
+            fh = self.__open_entry__(name, count_miss = False) if (name is not None) else None
+            if (fh is not None):
+                return fh
+
+        # check the current etag
+        etag = s3_wrapper.get_etag(bucket_name, object_key, s3_region = s3_region, aws_profile = aws_profile)
+        name = __get_hash__(bucket_name, object_key, etag)
+        fh = self.__open_entry__(name)
+        if (fh is None):
+            # download the same version into a temp file and move it into the cache
+            fd, temp_file = tempfile.mkstemp(dir = self.objects_dir, prefix = ".")
+            os.close(fd)
+            try:
+                s3_wrapper.download_file(bucket_name, object_key, output_file = temp_file, s3_region = s3_region, aws_profile = aws_profile, etag = etag)
+                fh = self.__add_entry__(name, temp_file)
+            finally:
+                if (os.path.exists(temp_file)):
+                    os.remove(temp_file)
+
+            # debug
+            utils.debug("S3Cache: cached: s3://{}/{}, etag: {}, total_size: {}".format(bucket_name, object_key, etag, self.total_size))
+
+        # update ref
+        if (is_immutable == True):
+            self.__write_ref__(bucket_name, object_key, name)
+
+        # return
+        return fh
+
+    def get_file_content(self, bucket_name, object_key, s3_region = None, aws_profile = None):
+        with self.open_file(bucket_name, object_key, s3_region = s3_region, aws_profile = aws_profile) as fh:
+            return fh.read()
+
+    # removes all the entries
+    def clear(self):
+        with self.lock:
+            for name in self.entries.keys():
+                try:
+                    os.remove(os.path.join(self.objects_dir, name))
+                except FileNotFoundError:
+                    pass
+            self.entries.clear()
+            self.total_size = 0
+
+    def __repr__(self):
+        return "S3Cache: cache_dir: {}, num_entries: {}, total_size: {}, max_size: {}, num_hits: {}, num_misses: {}".format(self.cache_dir,
+            len(self.entries), self.total_size, self.max_size, self.num_hits, self.num_misses)
+
+def enable_cache(cache_dir = DEFAULT_CACHE_DIR, max_size = DEFAULT_MAX_SIZE, immutable_patterns = None):
+    global S3_CACHE
+    with S3_CACHE_LOCK:
+        S3_CACHE = S3Cache(cache_dir = cache_dir, max_size = max_size, immutable_patterns = immutable_patterns)
+
+    # return
+    return S3_CACHE
+
+def disable_cache():
+    global S3_CACHE
+    with S3_CACHE_LOCK:
+        S3_CACHE = None
+
+# returns the global cache, or None if the cache is not enabled
+def get_cache():
+    global S3_CACHE
+    if (S3_CACHE is None and "OMIGO_S3_CACHE_DIR" in os.environ.keys()):
+        with S3_CACHE_LOCK:
+            if (S3_CACHE is None):
+                max_size = int(os.environ["OMIGO_S3_CACHE_MAX_SIZE"]) if ("OMIGO_S3_CACHE_MAX_SIZE" in os.environ.keys()) else DEFAULT_MAX_SIZE
+                immutable_patterns = os.environ["OMIGO_S3_CACHE_IMMUTABLE_PATTERNS"].split(",") if ("OMIGO_S3_CACHE_IMMUTABLE_PATTERNS" in os.environ.keys()) else None
+                S3_CACHE = S3Cache(cache_dir = os.environ["OMIGO_S3_CACHE_DIR"], max_size = max_size, immutable_patterns = immutable_patterns)
+                utils.info("get_cache: {}".format(S3_CACHE))
+
+    # return
+    return S3_CACHE
@@ -1,8 +1,12 @@
 """wrapper methods to work with S3"""
 import boto3
+import collections
 import gzip
 import os
+import tempfile
 import zipfile
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from io import BytesIO
 
 # local import
@@ -19,6 +23,14 @@ S3_RESOURCE_LOCK = threading.Lock()
 S3_SESSION_LOCK = threading.Lock()
 S3_CLIENT_LOCK = threading.Lock()
 
+# part size and number of parallel ranged gets for downloading large objects
+DOWNLOAD_PART_SIZE = 16 * 1024 * 1024
+DOWNLOAD_NUM_PAR = 8
+
+# part size for multipart uploads. s3 needs at least 5MB for all parts except the last
+UPLOAD_PART_SIZE = 16 * 1024 * 1024
+MIN_UPLOAD_PART_SIZE = 5 * 1024 * 1024
+
 def create_session_key(s3_region = None, aws_profile = None):
     s3_region, aws_profile = resolve_region_profile(s3_region, aws_profile)
     if (s3_region is None and aws_profile is None):
@@ -107,17 +119,208 @@ def get_s3_bucket_cache(bucket_name, s3_region = None, aws_profile = None):
     # return
     return S3_BUCKETS[bucket_name]
 
-def get_file_content(bucket_name, object_key, s3_region = None, aws_profile = None):
-    s3_region, aws_profile = resolve_region_profile(s3_region, aws_profile)
-    s3_bucket = get_s3_bucket_cache(bucket_name, s3_region, aws_profile)
-    obj = s3_bucket.Object(object_key)
-    obj_content = obj.get()
-    body = obj_content["Body"]
+# objects larger than the part size are downloaded as ranged gets in parallel
+def __resolve_part_size_num_par__(part_size, num_par):
+    part_size = DOWNLOAD_PART_SIZE if (part_size is None) else part_size
+    num_par = DOWNLOAD_NUM_PAR if (num_par is None) else num_par
+
+    # validation
+    if (part_size <= 0 or num_par <= 0):
+        raise Exception("invalid part_size: {} or num_par: {}".format(part_size, num_par))
+
+    # return
+    return part_size, num_par
+
+# returns the response of the first part along with the object size. Empty objects dont support range. If etag is
+# given, the read fails if the object has changed
+def __get_first_part__(s3, bucket_name, object_key, part_size, etag = None):
+    kwargs = {} if (etag is None) else {"IfMatch": etag}
+    try:
+        response = s3.get_object(Bucket = bucket_name, Key = object_key, Range = "bytes=0-{}".format(part_size - 1), **kwargs)
+    except ClientError as e:
+        if (e.response.get("Error", {}).get("Code") != "InvalidRange"):
+            raise e
+        response = s3.get_object(Bucket = bucket_name, Key = object_key, **kwargs)
+        return response, response["ContentLength"]
+
+    # content range is like bytes 0-1023/4096
+    return response, int(response["ContentRange"].split("/")[-1])
+
+# returns the bytes in [start, end). The etag makes sure that all parts are from the same version of the object
+def __get_object_range__(s3, bucket_name, object_key, etag, start, end):
+    response = s3.get_object(Bucket = bucket_name, Key = object_key, Range = "bytes={}-{}".format(start, end - 1), IfMatch = etag)
+    body = response["Body"]
     data = body.read()
     body.close()
 
+    # validation
+    if (len(data) != end - start):
+        raise Exception("__get_object_range__: incomplete read: s3://{}/{}, range: {}-{}, length: {}".format(bucket_name, object_key, start, end, len(data)))
+
+    # return
     return data
 
+def __get_part_ranges__(start, size, part_size):
+    return list([(i, min(i + part_size, size)) for i in range(start, size, part_size)])
+
+# downloads the object in parts and calls write_func(offset, data, size) for each part in the order of completion.
+# Returns the object size
+def __download_parts__(bucket_name, object_key, write_func, s3_region, aws_profile, part_size, num_par, etag = None):
+    s3 = get_s3_client_cache(s3_region = s3_region, aws_profile = aws_profile)
+    response, size = __get_first_part__(s3, bucket_name, object_key, part_size, etag = etag)
+
+    # first part
+    body = response["Body"]
+    write_func(0, body.read(), size)
+    body.close()
+
+    # remaining parts
+    ranges = __get_part_ranges__(min(part_size, size), size, part_size)
+    if (len(ranges) > 0):
+        utils.debug("__download_parts__: s3://{}/{}, size: {}, num_parts: {}, num_par: {}".format(bucket_name, object_key, size, len(ranges) + 1, num_par))
+        with ThreadPoolExecutor(max_workers = num_par) as executor:
+            futures = dict([(executor.submit(__get_object_range__, s3, bucket_name, object_key, response["ETag"], start, end), start) for (start, end) in ranges])
+            for future in as_completed(futures.keys()):
+                write_func(futures[future], future.result(), size)
+
+    # return
+    return size
+
+# returns the object content. Objects larger than part_size are downloaded with num_par parallel ranged gets into
+# a single bytearray
+def get_file_content(bucket_name, object_key, s3_region = None, aws_profile = None, part_size = None, num_par = None):
+    s3_region, aws_profile = resolve_region_profile(s3_region, aws_profile)
+    part_size, num_par = __resolve_part_size_num_par__(part_size, num_par)
+
+    # the parts are copied to their offsets in the buffer
+    result = {}
+    def __write_func__(offset, data, size):
+        if (len(data) == size):
+            result["data"] = data
+        else:
+            if ("data" not in result.keys()):
+                result["data"] = bytearray(size)
+            result["data"][offset:offset + len(data)] = data
+
+    __download_parts__(bucket_name, object_key, __write_func__, s3_region, aws_profile, part_size, num_par)
+
+    # return the buffer without copying. This is bytes for a single part and bytearray for multiple parts
+    return result["data"]
+
+# downloads the object into a local file, or a temp file if output_file is None. Returns the file path. If etag is
+# given, the download fails if the object has a different etag
+def download_file(bucket_name, object_key, output_file = None, s3_region = None, aws_profile = None, part_size = None, num_par = None, etag = None):
+    s3_region, aws_profile = resolve_region_profile(s3_region, aws_profile)
+    part_size, num_par = __resolve_part_size_num_par__(part_size, num_par)
+
+    # create temp file
+    if (output_file is None):
+        fd, output_file = tempfile.mkstemp(prefix = "s3_wrapper_", suffix = "_" + os.path.basename(object_key))
+        os.close(fd)
+
+    # write the parts at their offsets
+    with open(output_file, "wb") as fh:
+        def __write_func__(offset, data, size):
+            fh.seek(offset)
+            fh.write(data)
+
+        size = __download_parts__(bucket_name, object_key, __write_func__, s3_region, aws_profile, part_size, num_par, etag = etag)
+
+    # debug
+    utils.debug("download_file: s3://{}/{}, output_file: {}, size: {}".format(bucket_name, object_key, output_file, size))
+
+    # return
+    return output_file
+
+class S3RangedReader:
+    """File like reader over an S3 object. The first part is streamed from the response body while the next num_par
+    parts are prefetched as ranged gets. The memory used is bounded by num_par parts"""
+
+    def __init__(self, s3, bucket_name, object_key, etag, size, body, part_size, num_par):
+        self.s3 = s3
+        self.bucket_name = bucket_name
+        self.object_key = object_key
+        self.etag = etag
+        self.body = body
+        self.num_par = num_par
+        self.ranges = __get_part_ranges__(min(part_size, size), size, part_size)
+        self.next_range_index = 0
+        self.executor = ThreadPoolExecutor(max_workers = num_par)
+        self.futures = collections.deque()
+        self.buffer = b""
+        self.buffer_offset = 0
+
+        # start prefetch
+        self.__submit__()
+
+    def __submit__(self):
+        while (len(self.futures) < self.num_par and self.next_range_index < len(self.ranges)):
+            start, end = self.ranges[self.next_range_index]
+            self.futures.append(self.executor.submit(__get_object_range__, self.s3, self.bucket_name, self.object_key, self.etag, start, end))
+            self.next_range_index = self.next_range_index + 1
+
+    def readable(self):
+        return True
+
+    # reads at most size bytes. All the remaining bytes if size is negative
+    def read(self, size = -1):
+        parts = []
+        while (size != 0):
+            if (self.body is not None):
+                # first part
+                data = self.body.read() if (size < 0) else self.body.read(size)
+                if (len(data) == 0):
+                    self.body.close()
+                    self.body = None
+                    continue
+            elif (self.buffer_offset < len(self.buffer)):
+                # current prefetched part
+                end = len(self.buffer) if (size < 0) else min(len(self.buffer), self.buffer_offset + size)
+                data = self.buffer[self.buffer_offset:end]
+                self.buffer_offset = end
+            elif (len(self.futures) > 0):
+                # wait for the next part
+                self.buffer = self.futures.popleft().result()
+                self.buffer_offset = 0
+                self.__submit__()
+                continue
+            else:
+                break
+
+            # append
+            parts.append(data)
+            if (size > 0):
+                size = size - len(data)
+
+        # return
+        return b"".join(parts)
+
+    def close(self):
+        if (self.body is not None):
+            self.body.close()
+            self.body = None
+
+        # cancel the pending prefetch
+        for future in self.futures:
+            future.cancel()
+        self.futures.clear()
+        self.executor.shutdown(wait = False)
+
+# returns a stream of the object without reading it. Objects larger than part_size are read with num_par parallel ranged gets.
+# Caller needs to close it
+def get_file_content_as_stream(bucket_name, object_key, s3_region = None, aws_profile = None, part_size = None, num_par = None):
+    s3_region, aws_profile = resolve_region_profile(s3_region, aws_profile)
+    part_size, num_par = __resolve_part_size_num_par__(part_size, num_par)
+    s3 = get_s3_client_cache(s3_region = s3_region, aws_profile = aws_profile)
+    response, size = __get_first_part__(s3, bucket_name, object_key, part_size)
+
+    # small objects dont need any prefetch
+    if (size <= part_size):
+        return response["Body"]
+
+    # return
+    return S3RangedReader(s3, bucket_name, object_key, response["ETag"], size, response["Body"], part_size, num_par)
+
 # TODO: Deprecated
 def get_s3_file_content(bucket_name, object_key, s3_region = None, aws_profile = None):
     utils.warn_once("use get_file_content instead")
@@ -128,10 +331,15 @@ def get_s3_file_content_as_text(bucket_name, object_key, s3_region = None, aws_p
     utils.warn_once("use get_file_content_as_text instead")
     return get_file_content_as_text(bucket_name, object_key, s3_region = s3_region, aws_profile = aws_profile)
 
-def get_file_content_as_text(bucket_name, object_key, s3_region = None, aws_profile = None):
+def get_file_content_as_text(bucket_name, object_key, s3_region = None, aws_profile = None, part_size = None, num_par = None):
     s3_region, aws_profile = resolve_region_profile(s3_region, aws_profile)
-    barr = get_file_content(bucket_name, object_key, s3_region, aws_profile)
+    barr = get_file_content(bucket_name, object_key, s3_region, aws_profile, part_size = part_size, num_par = num_par)
 
+    # return
+    return decode_file_content_as_text(object_key, barr)
+
+# decompresses the content based on the extension of object_key and returns the text
+def decode_file_content_as_text(object_key, barr):
     # check for gz or zip
     if (object_key.endswith(".gz")):
         barr = gzip.decompress(barr)
@@ -141,10 +349,18 @@ def get_file_content_as_text(bucket_name, object_key, s3_region = None, aws_prof
         barr = zfile.open(zfile.infolist()[0]).read()
         zfile.close()
 
-    # return bytearray
-    barr = bytearray(barr)
+    # return
     return barr.decode().rstrip("\n")
 
+# returns the etag of the object with a HEAD request
+def get_etag(bucket_name, object_key, s3_region = None, aws_profile = None):
+    s3_region, aws_profile = resolve_region_profile(s3_region, aws_profile)
+    s3 = get_s3_client_cache(s3_region = s3_region, aws_profile = aws_profile)
+    response = s3.head_object(Bucket = bucket_name, Key = object_key)
+
+    # return
+    return response["ETag"]
+
 # TODO: this is expensive and works in specific scenarios only especially for files
 def check_path_exists(path, s3_region = None, aws_profile = None):
     s3_region, aws_profile = resolve_region_profile(s3_region, aws_profile)
@@ -188,6 +404,100 @@ def put_file_content(bucket_name, object_key, barr, s3_region = None, aws_profil
     # write
     obj.put(Body = barr)
 
+class S3MultipartWriter:
+    """File like writer that uploads the data as parts of a multipart upload once part_size bytes are buffered. Data
+    smaller than part_size is uploaded with a single put on close. The memory used is bounded by part_size"""
+
+    def __init__(self, bucket_name, object_key, s3_region = None, aws_profile = None, part_size = None):
+        s3_region, aws_profile = resolve_region_profile(s3_region, aws_profile)
+        part_size = UPLOAD_PART_SIZE if (part_size is None) else part_size
+
+        # validation. s3 needs all parts except the last to be at least 5MB
+        if (part_size < MIN_UPLOAD_PART_SIZE):
+            raise Exception("S3MultipartWriter: part_size: {} is less than the minimum: {}".format(part_size, MIN_UPLOAD_PART_SIZE))
+
+        self.s3 = get_s3_client_cache(s3_region = s3_region, aws_profile = aws_profile)
+        self.bucket_name = bucket_name
+        self.object_key = object_key
+        self.part_size = part_size
+        self.buffer = bytearray()
+        self.upload_id = None
+        self.parts = []
+        self.closed = False
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if (self.closed == True):
+            raise Exception("S3MultipartWriter: write on closed writer: s3://{}/{}".format(self.bucket_name, self.object_key))
+
+        with memoryview(data) as view:
+            # fill the buffer and upload it once it is full
+            offset = 0
+            if (len(self.buffer) > 0):
+                offset = min(self.part_size - len(self.buffer), len(view))
+                self.buffer.extend(view[0:offset])
+                if (len(self.buffer) == self.part_size):
+                    self.__upload_part__(self.buffer)
+                    self.buffer = bytearray()
+
+            # the full parts of a large write are sliced from the data. Only the remainder is buffered. boto does not
+            # take a memoryview as the body, so each part is copied once
+            while (len(view) - offset >= self.part_size):
+                self.__upload_part__(bytes(view[offset:offset + self.part_size]))
+                offset = offset + self.part_size
+            self.buffer.extend(view[offset:])
+
+        # return
+        return len(data)
+
+    # parts are uploaded only when full
+    def flush(self):
+        pass
+
+    # uploads the data as the next part
+    def __upload_part__(self, data):
+        try:
+            if (self.upload_id is None):
+                self.upload_id = self.s3.create_multipart_upload(Bucket = self.bucket_name, Key = self.object_key)["UploadId"]
+
+            part_number = len(self.parts) + 1
+            response = self.s3.upload_part(Bucket = self.bucket_name, Key = self.object_key, UploadId = self.upload_id, PartNumber = part_number, Body = data)
+            self.parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+        except Exception as e:
+            self.abort()
+            raise e
+
+    def close(self):
+        if (self.closed == True):
+            return
+
+        # single put for small data
+        if (self.upload_id is None):
+            self.s3.put_object(Bucket = self.bucket_name, Key = self.object_key, Body = self.buffer)
+        else:
+            if (len(self.buffer) > 0):
+                self.__upload_part__(self.buffer)
+            try:
+                self.s3.complete_multipart_upload(Bucket = self.bucket_name, Key = self.object_key, UploadId = self.upload_id, MultipartUpload = {"Parts": self.parts})
+            except Exception as e:
+                self.abort()
+                raise e
+
+        # debug
+        utils.debug("S3MultipartWriter: close: s3://{}/{}, num_parts: {}".format(self.bucket_name, self.object_key, len(self.parts)))
+        self.buffer = None
+        self.closed = True
+
+    # discards the uploaded parts
+    def abort(self):
+        if (self.upload_id is not None):
+            self.s3.abort_multipart_upload(Bucket = self.bucket_name, Key = self.object_key, UploadId = self.upload_id)
+            self.upload_id = None
+        self.buffer = None
+        self.closed = True
+
 # TODO: Deprecated
 def put_s3_file_content(bucket_name, object_key, barr, s3_region = None, aws_profile = None):
     utils.warn_once("use put_file_content instead")
@@ -238,6 +548,19 @@ def __get_all_s3_objects__(s3, **base_kwargs):
             break
         continuation_token = response.get('NextContinuationToken')
 
+# returns a generator of the keys with the prefix in sorted order, starting after start_after. The pages are fetched
+# as the generator is consumed, so the caller can stop early
+def list_keys(bucket_name, prefix, start_after = None, s3_region = None, aws_profile = None):
+    s3_region, aws_profile = resolve_region_profile(s3_region, aws_profile)
+    s3 = get_s3_client_cache(s3_region = s3_region, aws_profile = aws_profile)
+
+    # list
+    kwargs = {"Bucket": bucket_name, "Prefix": prefix}
+    if (start_after is not None):
+        kwargs["StartAfter"] = start_after
+    for obj in __get_all_s3_objects__(s3, **kwargs):
+        yield obj["Key"]
+
 # FIXME: This method is implemented using reverse engineering. Not so reliable
 # TODO: ignore_if_missing should be FALSE by default
 # FIXME: the prefix in aws s3 list command are hurting
@@ -1,4 +1,4 @@
-from omigo_hydra import s3_wrapper, local_fs_wrapper
+from omigo_hydra import s3_wrapper, s3_cache, local_fs_wrapper
 from omigo_core import tsv
 from omigo_core import utils
 import time
@@ -111,6 +111,14 @@ class S3FSWrapper:
     def __s3_read_file_contents_as_text__(self, path):
         path = self.__normalize_path__(path)
         bucket_name, object_key = utils.split_s3_path(path)
+
+        # use the local cache if enabled
+        cache = s3_cache.get_cache()
+        if (cache is not None):
+            barr = cache.get_file_content(bucket_name, object_key, s3_region = self.s3_region, aws_profile = self.aws_profile)
+            return s3_wrapper.decode_file_content_as_text(object_key, barr)
+
+        # return
         return s3_wrapper.get_file_content_as_text(bucket_name, object_key, s3_region = self.s3_region, aws_profile = self.aws_profile)
 
     # the path here can be compressed gz file
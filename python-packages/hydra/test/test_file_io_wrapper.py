@@ -0,0 +1,102 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+from omigo_core import dataframe
+from omigo_hydra import s3_wrapper, file_io_wrapper, hydra
+
+# moto is optional
+try:
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+S3_REGION = "us-east-1"
+BUCKET_NAME = "bucket1"
+
+class TestFileIOWrapper(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors = True)
+
+    def test_save1(self):
+        xdf = dataframe.new_with_cols(["name", "value"], data_fields = [["x", "1"], ["y", "é"]])
+        for name in ["f1.tsv", "f1.tsv.gz", "f1.tsv.zip"]:
+            path = os.path.join(self.tmp_dir, name)
+            file_io_wrapper.TSVFileWriter(None, None).save(xdf, path)
+            if (name.endswith(".gz")):
+                with gzip.open(path, "rb") as fh:
+                    content = fh.read()
+            elif (name.endswith(".zip")):
+                with zipfile.ZipFile(path, "r") as zf:
+                    self.assertEqual(zf.namelist(), ["f1.tsv"])
+                    content = zf.read("f1.tsv")
+            else:
+                with open(path, "rb") as fh:
+                    content = fh.read()
+            self.assertEqual(content.decode("utf-8"), "name\tvalue\nx\t1\ny\té")
+
+    def test_abort1(self):
+        # the partial output is removed on exception
+        for name in ["f1.tsv", "f1.tsv.gz", "f1.tsv.zip"]:
+            path = os.path.join(self.tmp_dir, name)
+            with self.assertRaises(ValueError):
+                with file_io_wrapper.FileWriter(path, None, None) as output_file:
+                    output_file.write("name\tvalue")
+                    raise ValueError("test")
+            self.assertFalse(os.path.exists(path))
+
+        # abort after close does nothing
+        path = os.path.join(self.tmp_dir, "f2.tsv")
+        output_file = file_io_wrapper.FileWriter(path, None, None)
+        output_file.write("name")
+        output_file.close()
+        output_file.abort()
+        self.assertTrue(os.path.exists(path))
+
+@unittest.skipIf(mock_aws is None, "moto is not installed")
+class TestFileIOWrapperS3(unittest.TestCase):
+    def setUp(self):
+        self.env_patch = mock.patch.dict(os.environ, {"AWS_ACCESS_KEY_ID": "test", "AWS_SECRET_ACCESS_KEY": "test", "AWS_DEFAULT_REGION": S3_REGION})
+        self.env_patch.start()
+        self.mock = mock_aws()
+        self.mock.start()
+        self.s3 = s3_wrapper.get_s3_client_cache(s3_region = S3_REGION)
+        self.s3.create_bucket(Bucket = BUCKET_NAME)
+
+    def tearDown(self):
+        self.mock.stop()
+        self.env_patch.stop()
+
+    def test_multipart1(self):
+        # random hex is larger than one part after compression too
+        content = os.urandom(6 * 1024 * 1024).hex()
+        for name in ["f1.tsv", "f1.tsv.gz"]:
+            with file_io_wrapper.FileWriter("s3://{}/{}".format(BUCKET_NAME, name), S3_REGION, None, part_size = s3_wrapper.MIN_UPLOAD_PART_SIZE) as output_file:
+                output_file.write(content)
+            self.assertTrue(len(output_file.output_raw.parts) > 1)
+            data = s3_wrapper.get_file_content(BUCKET_NAME, name, s3_region = S3_REGION)
+            self.assertEqual((gzip.decompress(data) if (name.endswith(".gz")) else data).decode("utf-8"), content)
+
+        # small output is a single put
+        xdf = dataframe.new_with_cols(["name", "value"], data_fields = [["x", "1"]])
+        hydra.save_to_file(xdf, "s3://{}/f2.tsv".format(BUCKET_NAME), s3_region = S3_REGION)
+        self.assertEqual(s3_wrapper.get_file_content(BUCKET_NAME, "f2.tsv", s3_region = S3_REGION), b"name\tvalue\nx\t1")
+
+    def test_abort1(self):
+        # the multipart upload is aborted on exception
+        with self.assertRaises(ValueError):
+            with file_io_wrapper.FileWriter("s3://{}/f1.tsv".format(BUCKET_NAME), S3_REGION, None, part_size = s3_wrapper.MIN_UPLOAD_PART_SIZE) as output_file:
+                output_file.write(os.urandom(3 * 1024 * 1024).hex())
+                self.assertIsNotNone(output_file.output_raw.upload_id)
+                raise ValueError("test")
+        self.assertEqual(self.s3.list_multipart_uploads(Bucket = BUCKET_NAME).get("Uploads", []), [])
+        self.assertEqual(self.s3.list_objects_v2(Bucket = BUCKET_NAME).get("KeyCount"), 0)
+
+if __name__ == '__main__':
+    unittest.main()
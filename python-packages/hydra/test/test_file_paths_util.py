@@ -0,0 +1,144 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+from omigo_hydra import s3_wrapper, file_paths_util
+
+# moto is optional
+try:
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+S3_REGION = "us-east-1"
+BUCKET_NAME = "bucket1"
+
+# file names in each dt directory. The date range 2024-01-10 to 2024-01-11T10:30:00 with spillover_window 1 covers
+# 20240109 to 20240112
+DT_FILES = {
+    "20240109": ["data-20240109-220000-20240109-225959.tsv", "data-20240109-230000-20240110-005959.tsv.gz"],
+    "20240110": [".hidden", "data-20240110-010000-20240110-015959.tsv", "other-20240110-010000-20240110-015959.tsv"],
+    "20240111": ["data-20240111-100000-20240111-105959.tsv", "data-20240111-110000-20240111-115959.tsv"],
+    "20240112": ["abc-20240112-000000-20240112-005959.tsv", "data-20240112-000000-20240112-005959.tsv", "zzz-20240112-000000-20240112-005959.tsv"],
+    "20240113": ["data-20240113-000000-20240113-005959.tsv"]
+}
+DT_MATCHING_FILES = ["dt=20240109/data-20240109-230000-20240110-005959.tsv.gz", "dt=20240110/data-20240110-010000-20240110-015959.tsv",
+    "dt=20240111/data-20240111-100000-20240111-105959.tsv"]
+
+class TestFilePathsUtil(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.stream_read_size = file_paths_util.STREAM_READ_SIZE
+
+    def tearDown(self):
+        file_paths_util.STREAM_READ_SIZE = self.stream_read_size
+        shutil.rmtree(self.tmp_dir, ignore_errors = True)
+
+    def create_file(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        if (name.endswith(".gz")):
+            with gzip.open(path, "wb") as fh:
+                fh.write(content)
+        elif (name.endswith(".zip")):
+            with zipfile.ZipFile(path, "w") as zf:
+                zf.writestr(name[0:-4], content)
+        else:
+            with open(path, "wb") as fh:
+                fh.write(content)
+        return path
+
+    def test_read_lines_stream1(self):
+        # every read size splits some of the 2, 3 and 4 byte characters
+        lines = ["name\tvalue", "é\tü", "日本語\t€", "😀x\t\r"]
+        content = "\r\n".join(lines).encode("utf-8")
+        path = self.create_file("f1.tsv", content)
+        for read_size in range(1, 8):
+            file_paths_util.STREAM_READ_SIZE = read_size
+            self.assertEqual(list(file_paths_util.read_file_content_as_lines_stream(path)), ["name\tvalue", "é\tü", "日本語\t€", "😀x\t"])
+
+    def test_read_lines_stream2(self):
+        file_paths_util.STREAM_READ_SIZE = 3
+        content = "name\tvalue\nx\t日本\ny\t2\n".encode("utf-8")
+        for name in ["f1.tsv.gz", "f1.tsv.zip"]:
+            path = self.create_file(name, content)
+            self.assertEqual(file_paths_util.read_file_content_as_lines(path), ["name\tvalue", "x\t日本", "y\t2"])
+
+        # csv is converted to tsv
+        for name in ["f1.csv", "f1.csv.gz", "f1.csv.zip"]:
+            path = self.create_file(name, "name,value\nx,é\n".encode("utf-8"))
+            self.assertEqual(file_paths_util.read_file_content_as_lines(path), ["name\tvalue", "x\té"])
+
+    def test_read_lines_stream3(self):
+        path = self.create_file("f1.tsv", "name\tvalue\nx\t1\n".encode("utf-8"))
+        lines = file_paths_util.read_file_content_as_lines_stream(path)
+        self.assertEqual(next(lines), "name\tvalue")
+        lines.close()
+        self.assertTrue(file_paths_util.has_same_headers([path, self.create_file("f2.tsv.gz", b"name\tvalue\n")]))
+        self.assertFalse(file_paths_util.has_same_headers([path, self.create_file("f3.tsv", b"value\tname\n")]))
+
+    def test_get_file_paths_by_datetime_range1(self):
+        for day, names in DT_FILES.items():
+            os.makedirs(os.path.join(self.tmp_dir, "dt=" + day))
+            for name in names:
+                self.create_file("dt={}/{}".format(day, name), b"")
+
+        paths = file_paths_util.get_file_paths_by_datetime_range(self.tmp_dir, "2024-01-10", "2024-01-11T10:30:00", "data")
+        self.assertEqual(paths, list([self.tmp_dir + "/" + name for name in DT_MATCHING_FILES]))
+        self.assertEqual(file_paths_util.get_file_paths_by_datetime_range(self.tmp_dir, "2024-01-10", "2024-01-11T10:30:00", "data", spillover_window = 0),
+            list([self.tmp_dir + "/" + name for name in DT_MATCHING_FILES[1:]]))
+
+@unittest.skipIf(mock_aws is None, "moto is not installed")
+class TestFilePathsUtilS3(unittest.TestCase):
+    def setUp(self):
+        self.env_patch = mock.patch.dict(os.environ, {"AWS_ACCESS_KEY_ID": "test", "AWS_SECRET_ACCESS_KEY": "test", "AWS_DEFAULT_REGION": S3_REGION})
+        self.env_patch.start()
+        self.mock = mock_aws()
+        self.mock.start()
+        self.s3 = s3_wrapper.get_s3_client_cache(s3_region = S3_REGION)
+        self.s3.create_bucket(Bucket = BUCKET_NAME)
+        for day, names in DT_FILES.items():
+            for name in names:
+                self.s3.put_object(Bucket = BUCKET_NAME, Key = "etl/dt={}/{}".format(day, name), Body = b"")
+        file_paths_util.clear_listing_cache()
+
+    def tearDown(self):
+        file_paths_util.clear_listing_cache()
+        self.mock.stop()
+        self.env_patch.stop()
+
+    # returns the matching paths and the listed keys
+    def get_file_paths(self, start_date_str, end_date_str):
+        listed_keys = []
+        list_keys = s3_wrapper.list_keys
+        def __list_keys__(*args, **kwargs):
+            for key in list_keys(*args, **kwargs):
+                listed_keys.append(key)
+                yield key
+
+        with mock.patch.object(s3_wrapper, "list_keys", __list_keys__):
+            paths = file_paths_util.get_file_paths_by_datetime_range("s3://{}/etl".format(BUCKET_NAME), start_date_str, end_date_str, "data", s3_region = S3_REGION)
+        return paths, listed_keys
+
+    def test_get_file_paths_by_datetime_range1(self):
+        paths, listed_keys = self.get_file_paths("2024-01-10", "2024-01-11T10:30:00")
+        self.assertEqual(paths, list(["s3://{}/etl/{}".format(BUCKET_NAME, name) for name in DT_MATCHING_FILES]))
+
+        # the listing stops at the first file of the last day starting after the end date
+        self.assertEqual(listed_keys[0], "etl/dt=20240109/data-20240109-220000-20240109-225959.tsv")
+        self.assertEqual(listed_keys[-1], "etl/dt=20240112/data-20240112-000000-20240112-005959.tsv")
+
+        # the partial listing of the last day is not cached
+        paths, listed_keys = self.get_file_paths("2024-01-10", "2024-01-11T10:30:00")
+        self.assertEqual(len(paths), 3)
+        self.assertEqual(listed_keys, ["etl/dt=20240112/abc-20240112-000000-20240112-005959.tsv", "etl/dt=20240112/data-20240112-000000-20240112-005959.tsv"])
+
+        # all the days are cached
+        paths, listed_keys = self.get_file_paths("2024-01-10", "2024-01-10")
+        self.assertEqual(paths, list(["s3://{}/etl/{}".format(BUCKET_NAME, name) for name in DT_MATCHING_FILES[0:2]]))
+        self.assertEqual(listed_keys, [])
+
+if __name__ == '__main__':
+    unittest.main()
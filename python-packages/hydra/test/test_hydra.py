@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from omigo_core import dataframe
+from omigo_core.expressions import col
+from omigo_hydra import hydra, file_paths_data_reader
+
+class TestHydra(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors = True)
+
+    def create_file(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, "w") as fh:
+            fh.write(content)
+        return path
+
+    def test_read1(self):
+        # 5 and 4 rows cross the chunk boundary with and without a partial last chunk
+        for num_rows in [5, 4]:
+            rows = list([["x" if (i % 3 == 0) else "y", str(i), "v{}".format(i)] for i in range(num_rows)])
+            path = self.create_file("f{}.tsv".format(num_rows), "\n".join(["name\tcount\tvalue"] + list(["\t".join(fields) for fields in rows])) + "\n")
+            xdf = dataframe.new_with_cols(["name", "count", "value"], data_fields = rows)
+            with mock.patch.object(hydra, "READ_CHUNK_ROWS", 2):
+                self.assertEqual(hydra.read(path).get_data_fields(), rows)
+                for (cols, filter_expr) in [(["value", "name"], None), (None, col("name") == "x"), (["count"], col("name") == "x"), (["count"], col("name") == "z")]:
+                    expected_xdf = xdf.filter(filter_expr) if (filter_expr is not None) else xdf
+                    expected_xdf = expected_xdf.select(cols) if (cols is not None) else expected_xdf
+                    result_xdf = hydra.read(path, cols = cols, filter_expr = filter_expr)
+                    self.assertEqual(result_xdf.get_header_fields(), expected_xdf.get_header_fields())
+                    self.assertEqual(result_xdf.get_data_fields(), list(expected_xdf.get_data_fields()))
+
+    def test_read_chunks1(self):
+        path1 = self.create_file("f1.tsv", "name\tcount\nx\t1\ny\t2\nz\t3\n")
+        path2 = self.create_file("f2.tsv", "count\tname\n4\tw\n")
+        chunks = list(hydra.read_chunks([path1, path2], chunk_rows = 2))
+        self.assertEqual(list([t.get_header_fields() for t in chunks]), [["name", "count"], ["name", "count"]])
+        self.assertEqual(list([t.get_data_fields() for t in chunks]), [[["x", "1"], ["y", "2"]], [["z", "3"], ["w", "4"]]])
+        self.assertEqual(list(hydra.read_chunks(path2, cols = ["name"]))[0].get_data_fields(), [["w"]])
+
+    def test_read_chunks2(self):
+        path1 = self.create_file("f1.tsv", "name\tcount\nx\t1\n")
+        path2 = self.create_file("f2.tsv", "name\tscore\ny\t2\n")
+        with self.assertRaises(Exception):
+            list(hydra.read_chunks([path1, path2]))
+        with self.assertRaises(Exception):
+            list(hydra.read_chunks(path1, chunk_rows = 0))
+
+    def test_read_chunks_otsv1(self):
+        path1 = os.path.join(self.tmp_dir, "f1.otsv")
+        hydra.save_to_file(dataframe.new_with_cols(["count", "name"], data_fields = [["3", "z"], ["1", "é"]]), path1)
+        path2 = self.create_file("f2.tsv", "name\tcount\nx\t2\n")
+        chunks = list(hydra.read_chunks([path2, path1], chunk_rows = 2))
+        self.assertEqual(list([t.get_data_fields() for t in chunks]), [[["x", "2"], ["z", "3"]], [["é", "1"]]])
+        sorted_chunks = list(hydra.read_sorted_chunks([path1, path2], "count", all_numeric = True, cols = ["count"]))
+        self.assertEqual(sorted_chunks[0].get_data_fields(), [["1"], ["2"], ["3"]])
+
+        # line based reader
+        path3 = self.create_file("f3.tsv", "count\tname\n2\tx\n")
+        reader = file_paths_data_reader.FilePathsDataReader([path1, path3], None, None)
+        self.assertEqual(reader.get_header(), "count\tname")
+        self.assertEqual(list([reader.next() for i in range(3)]), ["3\tz", "1\té", "2\tx"])
+        self.assertFalse(reader.has_next())
+
+    def test_file_paths_data_reader1(self):
+        # the header only files are skipped, including the first one
+        path1 = self.create_file("f1.tsv", "name\tcount\n")
+        path2 = self.create_file("f2.tsv", "name\tcount\nx\t1\ny\t2\n")
+        path3 = self.create_file("f3.tsv", "name\tcount\n")
+        path4 = self.create_file("f4.tsv", "name\tcount\nz\t3\n")
+        reader = file_paths_data_reader.FilePathsDataReader([path1, path2, path3, path4, path3], None, None)
+        self.assertEqual(reader.get_header(), "name\tcount")
+        lines = []
+        while (reader.has_next()):
+            lines.append(reader.next())
+        self.assertEqual(lines, ["x\t1", "y\t2", "z\t3"])
+        reader.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from omigo_hydra import s3_wrapper, s3_cache
+
+# moto is optional
+try:
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+S3_REGION = "us-east-1"
+BUCKET_NAME = "bucket1"
+
+@unittest.skipIf(mock_aws is None, "moto is not installed")
+class TestS3Cache(unittest.TestCase):
+    def setUp(self):
+        self.env_patch = mock.patch.dict(os.environ, {"AWS_ACCESS_KEY_ID": "test", "AWS_SECRET_ACCESS_KEY": "test", "AWS_DEFAULT_REGION": S3_REGION})
+        self.env_patch.start()
+        self.mock = mock_aws()
+        self.mock.start()
+        self.s3 = s3_wrapper.get_s3_client_cache(s3_region = S3_REGION)
+        self.s3.create_bucket(Bucket = BUCKET_NAME)
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors = True)
+        self.mock.stop()
+        self.env_patch.stop()
+
+    def put_object(self, key, data):
+        self.s3.put_object(Bucket = BUCKET_NAME, Key = key, Body = data)
+
+    def get_content(self, cache, key):
+        return cache.get_file_content(BUCKET_NAME, key, s3_region = S3_REGION)
+
+    def test_etag1(self):
+        cache = s3_cache.S3Cache(cache_dir = self.cache_dir)
+        self.put_object("data/f1.tsv", b"name\nx\n")
+        self.assertEqual(self.get_content(cache, "data/f1.tsv"), b"name\nx\n")
+        self.assertEqual(self.get_content(cache, "data/f1.tsv"), b"name\nx\n")
+        self.assertEqual((cache.num_hits, cache.num_misses), (1, 1))
+
+        # changed etag is fetched again
+        self.put_object("data/f1.tsv", b"name\ny\n")
+        self.assertEqual(self.get_content(cache, "data/f1.tsv"), b"name\ny\n")
+        self.assertEqual((cache.num_hits, cache.num_misses), (1, 2))
+
+        # the entries are loaded from the cache_dir
+        cache2 = s3_cache.S3Cache(cache_dir = self.cache_dir)
+        self.assertEqual(self.get_content(cache2, "data/f1.tsv"), b"name\ny\n")
+        self.assertEqual((cache2.num_hits, cache2.num_misses), (1, 0))
+
+    def test_immutable1(self):
+        cache = s3_cache.S3Cache(cache_dir = self.cache_dir, immutable_patterns = ["/immutable/"])
+        self.put_object("immutable/f1.tsv", b"name\nx\n")
+        self.assertEqual(self.get_content(cache, "immutable/f1.tsv"), b"name\nx\n")
+
+        # the last cached version is used without checking the etag
+        self.put_object("immutable/f1.tsv", b"name\ny\n")
+        self.assertEqual(self.get_content(cache, "immutable/f1.tsv"), b"name\nx\n")
+        self.assertEqual((cache.num_hits, cache.num_misses), (1, 1))
+
+    def test_eviction1(self):
+        cache = s3_cache.S3Cache(cache_dir = self.cache_dir, max_size = 250)
+        for i in range(3):
+            self.put_object("data/f{}.bin".format(i), bytes([i]) * 100)
+
+        # f0 is used after f1, so f1 is the least recently used when f2 is added
+        self.get_content(cache, "data/f0.bin")
+        self.get_content(cache, "data/f1.bin")
+        self.get_content(cache, "data/f0.bin")
+        self.get_content(cache, "data/f2.bin")
+        self.assertEqual(cache.total_size, 200)
+        self.assertEqual(len([name for name in os.listdir(cache.objects_dir) if (name.startswith(".") == False)]), 2)
+
+        # f1 is fetched again and evicts f0
+        self.assertEqual((cache.num_hits, cache.num_misses), (1, 3))
+        self.assertEqual(self.get_content(cache, "data/f1.bin"), bytes([1]) * 100)
+        self.assertEqual(self.get_content(cache, "data/f2.bin"), bytes([2]) * 100)
+        self.assertEqual((cache.num_hits, cache.num_misses), (2, 4))
+        self.assertEqual(self.get_content(cache, "data/f0.bin"), bytes([0]) * 100)
+        self.assertEqual((cache.num_hits, cache.num_misses), (2, 5))
+
+if __name__ == '__main__':
+    unittest.main()
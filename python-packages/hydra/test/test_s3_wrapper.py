@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from botocore.exceptions import ClientError
+from omigo_hydra import s3_wrapper
+
+# moto is optional
+try:
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+S3_REGION = "us-east-1"
+BUCKET_NAME = "bucket1"
+
+@unittest.skipIf(mock_aws is None, "moto is not installed")
+class TestS3Wrapper(unittest.TestCase):
+    def setUp(self):
+        self.env_patch = mock.patch.dict(os.environ, {"AWS_ACCESS_KEY_ID": "test", "AWS_SECRET_ACCESS_KEY": "test", "AWS_DEFAULT_REGION": S3_REGION})
+        self.env_patch.start()
+        self.mock = mock_aws()
+        self.mock.start()
+        self.s3 = s3_wrapper.get_s3_client_cache(s3_region = S3_REGION)
+        self.s3.create_bucket(Bucket = BUCKET_NAME)
+        self.data = bytes([i % 251 for i in range(100003)])
+        self.s3.put_object(Bucket = BUCKET_NAME, Key = "data.bin", Body = self.data)
+        self.s3.put_object(Bucket = BUCKET_NAME, Key = "empty.bin", Body = b"")
+
+    def tearDown(self):
+        self.mock.stop()
+        self.env_patch.stop()
+
+    def read_all(self, stream, read_size):
+        parts = []
+        while True:
+            data = stream.read(read_size)
+            if (len(data) == 0):
+                break
+            parts.append(data)
+        stream.close()
+        return b"".join(parts)
+
+    def test_get_file_content1(self):
+        # single part, multiple parts and empty object
+        for part_size in [200000, 100003, 10000, 30001]:
+            content = s3_wrapper.get_file_content(BUCKET_NAME, "data.bin", s3_region = S3_REGION, part_size = part_size, num_par = 3)
+            self.assertEqual(type(content), bytes if (part_size >= len(self.data)) else bytearray)
+            self.assertEqual(content, self.data)
+        self.assertEqual(s3_wrapper.get_file_content(BUCKET_NAME, "empty.bin", s3_region = S3_REGION, part_size = 10), b"")
+
+    def test_download_file1(self):
+        output_file = s3_wrapper.download_file(BUCKET_NAME, "data.bin", s3_region = S3_REGION, part_size = 9999, num_par = 4)
+        try:
+            with open(output_file, "rb") as fh:
+                self.assertEqual(fh.read(), self.data)
+        finally:
+            os.remove(output_file)
+
+    def test_download_file2(self):
+        # the download fails if the object does not have the given etag
+        fd, output_file = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            with self.assertRaises(ClientError) as context:
+                s3_wrapper.download_file(BUCKET_NAME, "data.bin", output_file = output_file, s3_region = S3_REGION, part_size = 9999, etag = "\"0123\"")
+            self.assertEqual(context.exception.response["Error"]["Code"], "PreconditionFailed")
+        finally:
+            os.remove(output_file)
+
+    def test_get_file_content_as_stream1(self):
+        # reads that are not aligned with the part boundaries
+        for read_size in [-1, 1000, 9999, 10001, 300000]:
+            stream = s3_wrapper.get_file_content_as_stream(BUCKET_NAME, "data.bin", s3_region = S3_REGION, part_size = 10000, num_par = 2)
+            self.assertEqual(self.read_all(stream, read_size), self.data)
+
+        # small object is read from the response body
+        stream = s3_wrapper.get_file_content_as_stream(BUCKET_NAME, "data.bin", s3_region = S3_REGION, part_size = 200000)
+        self.assertEqual(self.read_all(stream, 4096), self.data)
+
+    def test_get_file_content_as_stream2(self):
+        # the remaining parts are read with the etag of the first part
+        stream = s3_wrapper.get_file_content_as_stream(BUCKET_NAME, "data.bin", s3_region = S3_REGION, part_size = 10000, num_par = 1)
+        self.assertEqual(stream.read(100), self.data[0:100])
+        self.s3.put_object(Bucket = BUCKET_NAME, Key = "data.bin", Body = self.data[::-1])
+        with self.assertRaises(ClientError):
+            try:
+                stream.read()
+            finally:
+                stream.close()
+
+    def test_multipart_writer1(self):
+        # small writes, writes crossing the part boundary and a write of multiple parts
+        part_size = s3_wrapper.MIN_UPLOAD_PART_SIZE
+        writes = list([os.urandom(n) for n in [1000, part_size, 3 * part_size + 7, 10, part_size - 1010]])
+        writer = s3_wrapper.S3MultipartWriter(BUCKET_NAME, "multipart.bin", s3_region = S3_REGION, part_size = part_size)
+        part_sizes = []
+        upload_part = writer.s3.upload_part
+        def __upload_part__(**kwargs):
+            part_sizes.append(len(kwargs["Body"]))
+            return upload_part(**kwargs)
+
+        with mock.patch.object(writer.s3, "upload_part", __upload_part__):
+            for data in writes:
+                self.assertEqual(writer.write(data), len(data))
+                self.assertTrue(len(writer.buffer) < part_size)
+            writer.close()
+        self.assertEqual(part_sizes, [part_size] * 5 + [7])
+        self.assertEqual(s3_wrapper.get_file_content(BUCKET_NAME, "multipart.bin", s3_region = S3_REGION), b"".join(writes))
+
+if __name__ == '__main__':
+    unittest.main()